@@ -1,6 +1,42 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
 
+def _serves_requests():
+    """
+    True solo en un servidor: gunicorn (gunicorn.conf.py exporta
+    GESTURE_WARMUP_POST_FORK y gunicorn SERVER_SOFTWARE), uvicorn o
+    manage.py runserver. Los demás comandos de manage.py, los tests,
+    benchmark.py y otros scripts con django.setup() no cargan los modelos.
+    """
+    if os.environ.get('GESTURE_WARMUP_POST_FORK') == 'True' or 'SERVER_SOFTWARE' in os.environ:
+        return True
+    program = os.path.abspath(sys.argv[0]) if sys.argv and sys.argv[0] else ''
+    # 'uvicorn ...' o 'python -m uvicorn ...' (.../uvicorn/__main__.py)
+    if os.path.basename(program) == 'uvicorn' or os.path.basename(os.path.dirname(program)) == 'uvicorn':
+        return True
+    if os.path.basename(program) != 'manage.py' or sys.argv[1:2] != ['runserver']:
+        return False
+    # runserver con autoreload: solo el proceso hijo atiende requests
+    return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+
+
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+
+        if not getattr(settings, 'GESTURE_WARMUP', True) or not _serves_requests():
+            return
+
+        from .services.warmup import preload, start_warm_up
+
+        # Artefactos de solo lectura: con gunicorn preload_app se cargan antes del fork
+        preload()
+        # Con gunicorn (gunicorn.conf.py) los intérpretes se crean en cada worker después del fork
+        if os.environ.get('GESTURE_WARMUP_POST_FORK') != 'True':
+            start_warm_up()
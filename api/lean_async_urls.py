@@ -0,0 +1,17 @@
+"""
+URLconf del handler ASGI de drf.lean con GESTURE_ASYNC_VIEWS: /api/predict/
+y /api/predict-frames/ (y sus rutas livianas) con las vistas async; el
+resto de las rutas livianas, como en api.lean_urls.
+"""
+from django.urls import path
+
+from . import lean_views
+from .lean_urls import prefix
+
+urlpatterns = [
+    path('api/predict/', lean_views.predict_async, name='predict-async'),
+    path('api/predict-frames/', lean_views.predict_frames_async, name='predict-frames-async'),
+    path(f'{prefix}predict/', lean_views.predict_async, name='lean-predict-async'),
+    path(f'{prefix}predict-frames/', lean_views.predict_frames_async, name='lean-predict-frames-async'),
+    path(f'{prefix}predict-batch/', lean_views.predict_batch, name='lean-predict-batch'),
+]
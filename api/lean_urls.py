@@ -0,0 +1,17 @@
+"""
+URLconf de las rutas livianas (api.lean_views). No se incluye en drf.urls:
+la usan drf.lean.LeanWSGIHandler / LeanASGIHandler para los paths que
+empiezan con GESTURE_LEAN_PREFIX.
+"""
+from django.conf import settings
+from django.urls import path
+
+from . import lean_views
+
+prefix = getattr(settings, 'GESTURE_LEAN_PREFIX', '/api/fast/').strip('/') + '/'
+
+urlpatterns = [
+    path(f'{prefix}predict/', lean_views.predict, name='lean-predict'),
+    path(f'{prefix}predict-frames/', lean_views.predict_frames, name='lean-predict-frames'),
+    path(f'{prefix}predict-batch/', lean_views.predict_batch, name='lean-predict-batch'),
+]
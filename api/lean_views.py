@@ -0,0 +1,209 @@
+"""
+Rutas livianas de inferencia (GESTURE_LEAN_PREFIX, por defecto /api/fast/).
+
+Mismos endpoints y respuestas que /api/predict/, /api/predict-frames/ y
+/api/predict-batch/, como vistas de Django sin DRF: sin negociación de
+contenido, parsers ni renderers, y con JSON vía orjson si está instalado.
+Las atiende drf.lean.LeanWSGIHandler / LeanASGIHandler, que solo corre los
+middlewares de GESTURE_LEAN_MIDDLEWARE (la API no usa sesiones, auth,
+mensajes ni CSRF).
+
+Bajo ASGI, /api/predict/ y /api/predict-frames/ (y sus rutas livianas) se
+atienden con las versiones async (predict_async, predict_frames_async): el
+event loop solo parsea y responde, y la extracción y la inferencia corren en
+el executor acotado de services.executor (api.lean_async_urls).
+"""
+import asyncio
+import functools
+import logging
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .services import json_codec, metrics
+from .services.admission import Overloaded, admit, admit_async, admit_frame, admit_frame_async
+from .services.batching import predict_sequence
+from .services.executor import run_blocking
+from .services.extraction_pool import ExtractionBusy, ExtractionTimeout
+from .services.predictor import get_predictor
+from .services.recognition import process_frame
+from .services.request_data import InvalidRequest, batch_sequences, frame_landmarks, top_k_from
+from .services.sequence_buffer import DEFAULT_SESSION_ID, BufferUnavailable
+from .services.wire_format import WireFormatError, decode_landmarks
+from .views import log_request_summary
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTooLarge(InvalidRequest):
+    status_code = 413
+
+
+def json_response(payload, status=200, headers=None):
+    with metrics.timed("response"):
+        body = json_codec.dumps(payload)
+    response = HttpResponse(body, status=status, content_type="application/json", headers=headers)
+    response.payload = payload
+    return response
+
+
+def parse_body(request):
+    """Cuerpo JSON, binario (application/x-landmarks) o multipart como dict"""
+    with metrics.timed("request_parse"):
+        content_type = request.content_type
+        if content_type in ("multipart/form-data", "application/x-www-form-urlencoded"):
+            return {**request.POST.dict(), **request.FILES.dict()}
+
+        # Leer el stream como los parsers de DRF: request.body aplica DATA_UPLOAD_MAX_MEMORY_SIZE
+        # (2.5 MB), y un predict-batch de 20 secuencias en JSON ya lo supera. El tope propio
+        # se controla antes de leer (Content-Length) y al leer (sin Content-Length o si miente)
+        limit = getattr(settings, "GESTURE_LEAN_MAX_BODY_BYTES", 64 * 1024 * 1024)
+        try:
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            raise InvalidRequest("Content-Length inválido")
+        if length > limit:
+            raise RequestTooLarge(f"El cuerpo supera el máximo de {limit} bytes")
+        body = request.read(limit + 1)
+        if len(body) > limit:
+            raise RequestTooLarge(f"El cuerpo supera el máximo de {limit} bytes")
+        if content_type == "application/x-landmarks":
+            try:
+                frames = decode_landmarks(body)
+            except WireFormatError as e:
+                raise InvalidRequest(f"Landmarks binarios inválidos: {e}")
+            return {"frames": frames}
+
+        try:
+            data = json_codec.loads(body or b"{}")
+        except ValueError as e:
+            raise InvalidRequest(f"JSON inválido: {e}")
+        if not isinstance(data, dict):
+            raise InvalidRequest("El cuerpo debe ser un objeto JSON")
+        return data
+
+
+def error_response(name, error):
+    """Respuesta para una excepción de la vista: 400, 413, 429, 503, 504 o 500"""
+    if isinstance(error, InvalidRequest):
+        return json_response(error.body, status=getattr(error, "status_code", 400))
+    if isinstance(error, Overloaded):
+        return json_response(error.body, status=error.status_code, headers={"Retry-After": str(error.retry_after)})
+    if isinstance(error, ExtractionBusy):
+        logger.warning(f"⏳ {error}")
+        return json_response({"error": str(error), "reintentar_en": error.retry_after}, status=503,
+                             headers={"Retry-After": str(error.retry_after)})
+    if isinstance(error, ExtractionTimeout):
+        logger.warning(f"⏳ {error}")
+        return json_response({"error": str(error)}, status=504)
+    if isinstance(error, BufferUnavailable):
+        logger.error(f"❌ {error}")
+        return json_response({"error": str(error), "reintentar_en": error.retry_after}, status=503,
+                             headers={"Retry-After": str(error.retry_after)})
+    logger.error(f"❌ Error en {name}: {error}", exc_info=error)
+    return json_response({"error": str(error), "detail": "Error al procesar la predicción"}, status=500)
+
+
+def method_not_allowed(request):
+    return json_response({"error": f'Método "{request.method}" no permitido'}, status=405, headers={"Allow": "POST"})
+
+
+def finish(name, start, response):
+    elapsed = time.perf_counter() - start
+    metrics.observe_request(name, response.status_code, elapsed)
+    log_request_summary(name, response.status_code, elapsed, response.payload)
+    return response
+
+
+def lean_endpoint(name):
+    """
+    Solo POST; convierte los errores conocidos en su respuesta (400, 429,
+    503, 504, 500) y registra la latencia y el resumen como las vistas DRF.
+    Sirve para vistas sync y async (`async def`).
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            async def wrapper(request):
+                start = time.perf_counter()
+                if request.method != "POST":
+                    return finish(name, start, method_not_allowed(request))
+                try:
+                    response = json_response(await view(request, parse_body(request)))
+                except Exception as e:
+                    response = error_response(name, e)
+                return finish(name, start, response)
+        else:
+            def wrapper(request):
+                start = time.perf_counter()
+                if request.method != "POST":
+                    return finish(name, start, method_not_allowed(request))
+                try:
+                    response = json_response(view(request, parse_body(request)))
+                except Exception as e:
+                    response = error_response(name, e)
+                return finish(name, start, response)
+        return functools.wraps(view)(wrapper)
+    return decorator
+
+
+def get_session_id(request, data):
+    session_id = data.get("session_id") or request.headers.get("X-Session-ID")
+    if not session_id:
+        return DEFAULT_SESSION_ID
+    return str(session_id)[:128]
+
+
+@lean_endpoint("lean_predict")
+def predict(request, data):
+    """Como /api/predict/: un frame (imagen o landmarks) por request"""
+    session_id = get_session_id(request, data)
+    with admit_frame(data) as data:
+        landmarks = frame_landmarks(data, session_id)
+        mode = data.get("mode") or request.GET.get("mode")
+        return process_frame(session_id, landmarks, mode)
+
+
+@lean_endpoint("lean_predict_frames")
+def predict_frames(request, data):
+    """Como /api/predict-frames/: una secuencia de 65 frames"""
+    frames = data.get("frames")
+    if frames is None:
+        raise InvalidRequest("No frames provided")
+    with admit("predict_frames"):
+        return predict_sequence(frames)
+
+
+@lean_endpoint("lean_predict_batch")
+def predict_batch(request, data):
+    """Como /api/predict-batch/: N secuencias de 65 frames"""
+    sequences = batch_sequences(data)
+    predictor = get_predictor()
+    top_k = top_k_from(data.get("top_k") or request.GET.get("top_k"), len(predictor.classes))
+    with admit("predict_batch"):
+        resultados = predictor.predict_batch(sequences, top_k=top_k)
+    return {"estado": "prediccion", "total": len(resultados), "resultados": resultados}
+
+
+def _predict_frame(session_id, data, mode):
+    return process_frame(session_id, frame_landmarks(data, session_id), mode)
+
+
+@lean_endpoint("predict_async")
+async def predict_async(request, data):
+    """predict() con la decodificación, Holistic y el invoke fuera del event loop"""
+    session_id = get_session_id(request, data)
+    mode = data.get("mode") or request.GET.get("mode")
+    # El turno se espera en el event loop: la cola no ocupa threads del executor
+    async with admit_frame_async(data) as data:
+        return await run_blocking(_predict_frame, session_id, data, mode)
+
+
+@lean_endpoint("predict_frames_async")
+async def predict_frames_async(request, data):
+    """predict_frames() con la inferencia fuera del event loop"""
+    frames = data.get("frames")
+    if frames is None:
+        raise InvalidRequest("No frames provided")
+    async with admit_async("predict_frames"):
+        return await run_blocking(predict_sequence, frames)
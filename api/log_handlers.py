@@ -0,0 +1,94 @@
+"""
+Logging sin bloquear los requests.
+
+AsyncQueueHandler deja cada registro en una cola acotada y un thread
+(QueueListener) lo escribe en los handlers reales (consola, archivo): el
+request solo paga el formateo del mensaje. Con la cola llena el registro se
+descarta y se cuenta, en vez de frenar el request.
+
+RateLimitFilter limita los mensajes repetidos por frame (p. ej. el mismo
+warning de landmarks inválidos a 30 fps): por cada lugar del código deja
+pasar `rate` registros por segundo y agrega al siguiente cuántos se
+suprimieron. ERROR y CRITICAL pasan siempre.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    `handlers`: handlers ya configurados (en LOGGING, 'cfg://handlers.<nombre>';
+    este handler debe ir después de ellos en orden alfabético).
+    """
+
+    def __init__(self, handlers, queue_size=10000):
+        self.queue_size = queue_size
+        # Indexar (no iterar) la lista de dictConfig resuelve los 'cfg://' a los handlers
+        self.targets = [handlers[index] for index in range(len(handlers))]
+        self.dropped = 0
+        super().__init__(queue.Queue(queue_size))
+        self._start()
+        # Con gunicorn preload_app la configuración corre en el maestro: el thread
+        # no sobrevive al fork, cada worker arranca el suyo con una cola nueva
+        os.register_at_fork(after_in_child=self._restart)
+        atexit.register(self.stop)
+
+    def _start(self):
+        self.listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+        self.listener.start()
+
+    def _restart(self):
+        self.queue = queue.Queue(self.queue_size)
+        self._start()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Como máximo `rate` registros por segundo por lugar del código (logger +
+    línea). Los loggers de `exempt` (p. ej. el resumen por request, que ya se
+    muestrea) no se limitan.
+    """
+
+    def __init__(self, rate=5, exempt=()):
+        super().__init__()
+        self.rate = rate
+        self.exempt = tuple(exempt)
+        self._windows = {}  # (logger, línea) -> [segundo, emitidos, suprimidos]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR or record.name.startswith(self.exempt):
+            return True
+
+        key = (record.name, record.lineno)
+        now = int(time.monotonic())
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or window[0] != now:
+                suppressed = window[2] if window is not None else 0
+                window = self._windows[key] = [now, 0, suppressed]
+            if window[1] >= self.rate:
+                window[2] += 1
+                return False
+            window[1] += 1
+            suppressed, window[2] = window[2], 0
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} (+{suppressed} similares suprimidos)"
+            record.args = None
+        return True
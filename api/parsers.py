@@ -0,0 +1,24 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .services.wire_format import WireFormatError, decode_landmarks
+
+
+class LandmarksBinaryParser(BaseParser):
+    """
+    Parser para cuerpos 'application/x-landmarks' (ver services.wire_format).
+
+    Siempre entrega {'frames': array (N, 243)}, también con N == 1: cada
+    vista decide qué hacer con los frames (/api/predict/ toma el único
+    frame, /api/predict-frames/ los agrega al buffer). El session_id y el
+    modo van en el header X-Session-ID y en el query string (?mode=stream).
+    """
+    media_type = 'application/x-landmarks'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            frames = decode_landmarks(stream.read() if stream is not None else b'')
+        except WireFormatError as e:
+            raise ParseError(f'Landmarks binarios inválidos: {e}')
+
+        return {'frames': frames}
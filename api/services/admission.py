@@ -0,0 +1,293 @@
+"""
+Control de admisión por endpoint: cuántos requests caros corren a la vez en
+este proceso y cuántos pueden esperar turno.
+
+Cada endpoint tiene un limitador (GESTURE_ADMISSION_LIMITS): hasta
+`max_concurrent` requests en curso y `max_queue` esperando, en orden de
+llegada, como máximo GESTURE_ADMISSION_QUEUE_TIMEOUT segundos. Con la cola
+llena el request se rechaza al instante con 429; si no le llega el turno a
+tiempo, con 503. Ambos con Retry-After, en vez de acumularse detrás del grafo
+de MediaPipe hasta que gunicorn mate el worker.
+
+Modo degradado (GESTURE_DEGRADE_IMAGES): las imágenes esperan turno como
+cualquier request, pero si no lo consiguen (cola llena o sin turno a
+tiempo) un frame que trae 'image' y 'landmarks' se procesa solo con los
+landmarks (sin extracción), y uno que solo trae 'image' se rechaza marcado
+como degradado. Los frames con landmarks tienen su propio limitador, mucho
+más holgado, y se siguen aceptando.
+
+Sirve a las vistas sync (threads) y async (event loop): cuando se libera un
+lugar pasa directamente al primero de la cola.
+"""
+import asyncio
+import contextlib
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# endpoint -> (max_concurrent, max_queue)
+DEFAULT_LIMITS = {
+    "predict_image": (2, 8),
+    "predict_landmarks": (64, 256),
+    "predict_frames": (4, 16),
+    "predict_batch": (1, 4),
+    "predict_clip": (1, 2),
+}
+
+
+class Overloaded(Exception):
+    """El endpoint no admite más requests; `status_code` 429 (cola llena) o 503"""
+
+    def __init__(self, message, status_code, retry_after, degraded=False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.body = {"error": message, "reintentar_en": retry_after}
+        if degraded:
+            self.body["degradado"] = True
+
+
+class _ThreadWaiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+    def grant(self):
+        self.granted = True
+        self.event.set()
+
+
+class _AsyncWaiter:
+    __slots__ = ("loop", "future", "granted")
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+        self.granted = False
+
+    def grant(self):
+        self.granted = True
+        self.loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdmissionController:
+
+    def __init__(self, endpoint, max_concurrent, max_queue=0, queue_timeout=2.0, retry_after=1):
+        self.endpoint = endpoint
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = deque()
+        self._rejected = 0
+
+    def _reject(self, reason, status_code, message):
+        self._rejected += 1
+        metrics.count_admission_shed(self.endpoint, reason)
+        logger.warning(f"🚦 {self.endpoint}: {message}")
+        return Overloaded(message, status_code, self.retry_after)
+
+    def _enter(self, waiter_class):
+        """None si entró; si no, el waiter encolado (o Overloaded con la cola llena)"""
+        with self._lock:
+            if self._in_flight < self.max_concurrent and not self._waiters:
+                self._in_flight += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                raise self._reject("queue_full", 429, f"Demasiados requests en {self.endpoint}, cola llena")
+            waiter = waiter_class()
+            self._waiters.append(waiter)
+            return waiter
+
+    def _give_up(self, waiter):
+        """Venció la espera; si el lugar llegó entretanto, se queda con él"""
+        with self._lock:
+            if waiter.granted:
+                return
+            self._waiters.remove(waiter)
+            raise self._reject("timeout", 503, f"{self.endpoint} saturado, sin turno en {self.queue_timeout} s")
+
+    def acquire(self):
+        waiter = self._enter(_ThreadWaiter)
+        if waiter is not None and not waiter.event.wait(self.queue_timeout):
+            self._give_up(waiter)
+
+    async def acquire_async(self):
+        waiter = self._enter(_AsyncWaiter)
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._give_up(waiter)
+        except asyncio.CancelledError:
+            # Cliente desconectado mientras esperaba: liberar el lugar si ya lo tenía
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # El lugar pasa al primero de la cola sin volver a contarse
+                self._waiters.popleft().grant()
+            else:
+                self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "en_curso": self._in_flight,
+                "en_cola": len(self._waiters),
+                "max_concurrentes": self.max_concurrent,
+                "max_cola": self.max_queue,
+                "rechazados": self._rejected,
+            }
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def admission_enabled():
+    return getattr(settings, "GESTURE_ADMISSION_ENABLED", True)
+
+
+def get_controller(endpoint):
+    controller = _controllers.get(endpoint)
+    if controller is None:
+        with _controllers_lock:
+            controller = _controllers.get(endpoint)
+            if controller is None:
+                limits = {**DEFAULT_LIMITS, **getattr(settings, "GESTURE_ADMISSION_LIMITS", {})}
+                max_concurrent, max_queue = limits[endpoint]
+                controller = _controllers[endpoint] = AdmissionController(
+                    endpoint,
+                    max_concurrent=max_concurrent,
+                    max_queue=max_queue,
+                    queue_timeout=getattr(settings, "GESTURE_ADMISSION_QUEUE_TIMEOUT", 2.0),
+                    retry_after=getattr(settings, "GESTURE_ADMISSION_RETRY_AFTER", 1),
+                )
+    return controller
+
+
+@contextlib.contextmanager
+def admit(endpoint):
+    """`with admit("predict_batch"): ...` (lanza Overloaded si no hay lugar)"""
+    if not admission_enabled():
+        yield
+        return
+    controller = get_controller(endpoint)
+    controller.acquire()
+    try:
+        yield
+    finally:
+        controller.release()
+
+
+@contextlib.asynccontextmanager
+async def admit_async(endpoint):
+    """Como admit(), esperando el turno sin bloquear el event loop"""
+    if not admission_enabled():
+        yield
+        return
+    controller = get_controller(endpoint)
+    await controller.acquire_async()
+    try:
+        yield
+    finally:
+        controller.release()
+
+
+def _degrade_images(data):
+    return "image" in data and admission_enabled() and getattr(settings, "GESTURE_DEGRADE_IMAGES", True)
+
+
+def _degraded(controller, data, error):
+    """Datos con los que sigue un frame cuya imagen no consiguió lugar, o Overloaded si no trae landmarks"""
+    if "landmarks" in data:
+        metrics.count_admission_shed("predict_image", "degraded_landmarks")
+        return {key: value for key, value in data.items() if key != "image"}
+
+    metrics.count_admission_shed("predict_image", "degraded_rejected")
+    raise Overloaded(
+        "Servidor saturado: solo se aceptan landmarks (extracción de imágenes suspendida)",
+        error.status_code, controller.retry_after, degraded=True,
+    ) from error
+
+
+@contextlib.contextmanager
+def admit_frame(data):
+    """
+    `with admit_frame(data) as data: ...` para un frame de /api/predict/:
+    'predict_image' o 'predict_landmarks'. En modo degradado, si la imagen
+    no consigue lugar (cola llena o sin turno a tiempo), el frame sigue
+    solo con sus landmarks o se rechaza con degradado=True.
+    """
+    if not _degrade_images(data):
+        with admit("predict_image" if "image" in data else "predict_landmarks"):
+            yield data
+        return
+
+    controller = get_controller("predict_image")
+    try:
+        controller.acquire()
+    except Overloaded as e:
+        data = _degraded(controller, data, e)
+        with admit("predict_landmarks"):
+            yield data
+        return
+    try:
+        yield data
+    finally:
+        controller.release()
+
+
+@contextlib.asynccontextmanager
+async def admit_frame_async(data):
+    """Como admit_frame(), esperando el turno sin bloquear el event loop"""
+    if not _degrade_images(data):
+        async with admit_async("predict_image" if "image" in data else "predict_landmarks"):
+            yield data
+        return
+
+    controller = get_controller("predict_image")
+    try:
+        await controller.acquire_async()
+    except Overloaded as e:
+        data = _degraded(controller, data, e)
+        async with admit_async("predict_landmarks"):
+            yield data
+        return
+    try:
+        yield data
+    finally:
+        controller.release()
+
+
+def get_admission_stats():
+    """Requests en curso y en cola por endpoint (solo los que ya recibieron requests)"""
+    if not admission_enabled():
+        return None
+    with _controllers_lock:
+        controllers = dict(_controllers)
+    return {endpoint: controller.stats() for endpoint, controller in sorted(controllers.items())}
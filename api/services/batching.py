@@ -0,0 +1,160 @@
+"""
+Micro-batching delante de GesturePredictor.
+
+Las predicciones concurrentes se acumulan hasta llenar el batch del modelo
+o hasta que pasan `max_latency_ms` desde la primera, y se ejecutan en una
+sola invocación del intérprete; cada llamador recibe su propia fila.
+
+Cada llamador espera como máximo `max_latency_ms` más `invoke_timeout`
+segundos: si el thread del scheduler se traba o muere, los requests fallan
+en vez de quedar colgados.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+from django.conf import settings
+
+from .buffer_backends import NUM_FEATURES, NUM_FRAMES
+from .predictor import get_predictor
+
+logger = logging.getLogger(__name__)
+
+
+class BatchSchedulerError(RuntimeError):
+    """El scheduler no respondió a tiempo o su thread no está vivo"""
+
+
+class BatchScheduler:
+
+    def __init__(self, predictor, max_batch_size=None, max_latency_ms=5, invoke_timeout=10.0):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size or predictor.batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.timeout = self.max_latency + invoke_timeout
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._max_fill = 0
+
+        self._thread = threading.Thread(target=self._run, name="gesture-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, sequence):
+        """Encola una secuencia (65, 243) y retorna un Future con su resultado"""
+        # Validar aquí: una secuencia mal formada no debe romper el batch de otros
+        sequence = np.asarray(sequence, dtype=np.float32).reshape(NUM_FRAMES, NUM_FEATURES)
+        if not self._thread.is_alive():
+            raise BatchSchedulerError("El thread del micro-batching no está activo")
+        future = Future()
+        self._queue.put((sequence, future))
+        return future
+
+    def predict(self, sequence, timeout=None):
+        """Resultado de una secuencia; BatchSchedulerError si no llega en `timeout` (por defecto self.timeout)"""
+        future = self.submit(sequence)
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Si todavía no entró a un batch, no se procesa
+            future.cancel()
+            raise BatchSchedulerError(f"Sin resultado del micro-batching en {timeout:.1f} s")
+
+    def _collect(self):
+        batch = []
+        deadline = None
+        while len(batch) < self.max_batch_size:
+            if deadline is None:
+                item = self._queue.get()
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            # Los llamadores que ya se rindieron (timeout) no ocupan lugar en el batch
+            if item[1].set_running_or_notify_cancel():
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.max_latency
+        return batch
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                batch = self._collect()
+                sequences = np.stack([seq for seq, _ in batch])
+                results = self.predictor.predict_batch(sequences)
+            except Exception as e:
+                # El thread sigue vivo: solo falla este batch
+                logger.error(f"❌ Error en batch de {len(batch)} secuencias: {e}", exc_info=True)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._max_fill = max(self._max_fill, len(batch))
+
+    def stats(self):
+        """Métricas de llenado de los batches ejecutados"""
+        with self._stats_lock:
+            batches, requests = self._batches, self._requests
+            return {
+                "batches": batches,
+                "solicitudes": requests,
+                "batch_size_modelo": self.max_batch_size,
+                "max_latencia_ms": self.max_latency * 1000,
+                "promedio_por_batch": requests / batches if batches else 0.0,
+                "llenado_promedio": requests / (batches * self.max_batch_size) if batches else 0.0,
+                "llenado_maximo": self._max_fill,
+                "en_cola": self._queue.qsize(),
+            }
+
+
+# Instancia global (se crea en el worker, después del fork de gunicorn)
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def batching_enabled():
+    return getattr(settings, "GESTURE_BATCHING_ENABLED", False)
+
+
+def get_batch_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = BatchScheduler(
+                    get_predictor(),
+                    max_batch_size=getattr(settings, "GESTURE_BATCH_MAX_SIZE", 0) or None,
+                    max_latency_ms=getattr(settings, "GESTURE_BATCH_MAX_LATENCY_MS", 5),
+                    invoke_timeout=getattr(settings, "GESTURE_BATCH_TIMEOUT", 10.0),
+                )
+    return _scheduler
+
+
+def get_batching_stats():
+    """Métricas del scheduler, None si el batching está desactivado o no ha arrancado"""
+    return _scheduler.stats() if _scheduler is not None else None
+
+
+def predict_sequence(sequence):
+    """Predice una secuencia de 65 frames, pasando por el scheduler si está activo"""
+    if batching_enabled():
+        return get_batch_scheduler().predict(sequence)
+    return get_predictor().predict(sequence)
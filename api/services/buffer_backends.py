@@ -0,0 +1,459 @@
+"""
+Backends de almacenamiento para los buffers de secuencia por sesión.
+
+- InProcessBackend: ring buffers numpy en la memoria del proceso.
+- SharedMemoryBackend: tabla de ring buffers en multiprocessing.shared_memory,
+  compartida por todos los workers de gunicorn de la misma máquina.
+- RedisBackend: ring buffer en Redis (o cualquier cliente compatible con el
+  protocolo), compartido entre máquinas.
+
+Todos guardan cada frame como 243 float32 contiguos: agregar un frame es O(1)
+y nunca se serializan listas de Python.
+"""
+import contextlib
+import fcntl
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+NUM_FRAMES = 65
+NUM_FEATURES = 243
+FRAME_BYTES = NUM_FEATURES * 4
+
+# Cabecera del segmento de SharedMemoryBackend: magic, max_sessions,
+# frames, features y 4 bytes de relleno (los arrays quedan alineados a 8)
+SHM_MAGIC = b"GBF1"
+SHM_HEADER = struct.Struct("<4sIHH4x")
+
+
+class BufferUnavailable(Exception):
+    """El almacenamiento compartido de los buffers (Redis) no responde"""
+
+    retry_after = 1
+
+
+def _as_frame(landmarks):
+    return np.asarray(landmarks, dtype=np.float32).reshape(NUM_FEATURES)
+
+
+def _ordered(data, pos):
+    """Copia los 65 frames de un ring buffer en orden cronológico"""
+    if pos == 0:
+        return data.copy()
+    return np.concatenate((data[pos:], data[:pos]))
+
+
+class BufferBackend:
+    """Interfaz común de los backends de buffers por sesión"""
+
+    def add_landmarks(self, session_id, landmarks):
+        """Agrega un frame y retorna el número de frames en el buffer"""
+        raise NotImplementedError
+
+    def get_sequence(self, session_id):
+        """Retorna un array (65, 243) en orden cronológico, None si faltan frames"""
+        raise NotImplementedError
+
+    def get_window(self, session_id):
+        """
+        Retorna (ring, pos): una copia del ring (65, 243) del buffer, sin
+        reordenar, y el índice de su frame más antiguo; None si faltan frames.
+        La copia se toma bajo el lock, así un add_landmarks concurrente no
+        cambia la ventana mientras se normaliza.
+        """
+        raise NotImplementedError
+
+    def get_buffer_size(self, session_id):
+        raise NotImplementedError
+
+    def clear_buffer(self, session_id):
+        raise NotImplementedError
+
+    def active_sessions(self):
+        raise NotImplementedError
+
+
+class SequenceRingBuffer:
+    """
+    Ring buffer preasignado de (65, 243) float32 para una sesión.
+    Agregar un frame es O(1) y no crea listas de floats de Python.
+    """
+
+    __slots__ = ("data", "pos", "count", "last_access")
+
+    def __init__(self):
+        self.data = np.zeros((NUM_FRAMES, NUM_FEATURES), dtype=np.float32)
+        self.pos = 0
+        self.count = 0
+        self.last_access = time.monotonic()
+
+    def append(self, landmarks):
+        self.data[self.pos] = _as_frame(landmarks)
+        self.pos = (self.pos + 1) % NUM_FRAMES
+        self.count = min(self.count + 1, NUM_FRAMES)
+
+    def get_sequence(self):
+        """Retorna los 65 frames en orden cronológico, None si faltan frames"""
+        if self.count < NUM_FRAMES:
+            return None
+        return _ordered(self.data, self.pos)
+
+    def clear(self):
+        self.pos = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+
+class InProcessBackend(BufferBackend):
+    """
+    Buffers por sesión con un máximo de sesiones vivas.
+    Las sesiones inactivas más de `ttl` segundos se descartan y, si se
+    llega a `max_sessions`, se recicla el buffer de la menos usada (LRU).
+    """
+
+    def __init__(self, max_sessions=1000, ttl=300):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now):
+        while self._buffers:
+            session_id, buffer = next(iter(self._buffers.items()))
+            if now - buffer.last_access < self.ttl:
+                break
+            del self._buffers[session_id]
+
+    def _get(self, session_id, create=True):
+        now = time.monotonic()
+        self._evict_expired(now)
+        buffer = self._buffers.get(session_id)
+        if buffer is None:
+            if not create:
+                return None
+            if len(self._buffers) >= self.max_sessions:
+                # Reciclar el buffer de la sesión menos usada
+                _, buffer = self._buffers.popitem(last=False)
+                buffer.clear()
+            else:
+                buffer = SequenceRingBuffer()
+            self._buffers[session_id] = buffer
+        else:
+            self._buffers.move_to_end(session_id)
+        buffer.last_access = now
+        return buffer
+
+    def add_landmarks(self, session_id, landmarks):
+        with self._lock:
+            buffer = self._get(session_id)
+            buffer.append(landmarks)
+            return len(buffer)
+
+    def get_sequence(self, session_id):
+        with self._lock:
+            buffer = self._get(session_id, create=False)
+            return buffer.get_sequence() if buffer is not None else None
+
+    def get_window(self, session_id):
+        with self._lock:
+            buffer = self._get(session_id, create=False)
+            if buffer is None or len(buffer) < NUM_FRAMES:
+                return None
+            return buffer.data.copy(), buffer.pos
+
+    def get_buffer_size(self, session_id):
+        with self._lock:
+            buffer = self._get(session_id, create=False)
+            return len(buffer) if buffer is not None else 0
+
+    def clear_buffer(self, session_id):
+        with self._lock:
+            buffer = self._buffers.get(session_id)
+            if buffer is not None:
+                buffer.clear()
+
+    def active_sessions(self):
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            return len(self._buffers)
+
+
+class SharedMemoryBackend(BufferBackend):
+    """
+    Tabla de `max_sessions` ring buffers en un segmento de shared memory.
+
+    Layout del segmento (todo contiguo, sin pickling):
+        cabecera    16 bytes            SHM_MAGIC, max_sessions, 65, 243
+        keys        uint64[S]           hash de la sesión (0 = slot libre)
+        pos, count  int32[S]
+        last_access float64[S]          time.time() del último acceso
+        data        float32[S, 65, 243]
+
+    El acceso entre procesos se serializa con flock sobre un archivo de lock,
+    y entre threads del mismo proceso con un threading.Lock. Un segmento que
+    ya existe se usa solo si su cabecera coincide con esta configuración.
+    """
+
+    def __init__(self, name="gesture_buffers", max_sessions=256, ttl=300):
+        self.name = name
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+
+        S = max_sessions
+        sizes = [SHM_HEADER.size, S * 8, S * 4, S * 4, S * 8, S * NUM_FRAMES * FRAME_BYTES]
+        size = sum(sizes)
+
+        self._thread_lock = threading.Lock()
+        self._lock_file = open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), "a")
+        # Crear o abrir bajo el lock: quien abre nunca ve una cabecera a medio escribir
+        with self._locked():
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                SHM_HEADER.pack_into(self._shm.buf, 0, SHM_MAGIC, S, NUM_FRAMES, NUM_FEATURES)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+                self._check_header(size)
+        # El segmento debe sobrevivir a cualquier worker: sin esto el
+        # resource_tracker lo elimina cuando termina el proceso que lo abrió
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+
+        buf = self._shm.buf
+        offset = sizes[0]
+        self._keys = np.ndarray((S,), dtype=np.uint64, buffer=buf, offset=offset)
+        offset += sizes[1]
+        self._pos = np.ndarray((S,), dtype=np.int32, buffer=buf, offset=offset)
+        offset += sizes[2]
+        self._count = np.ndarray((S,), dtype=np.int32, buffer=buf, offset=offset)
+        offset += sizes[3]
+        self._last_access = np.ndarray((S,), dtype=np.float64, buffer=buf, offset=offset)
+        offset += sizes[4]
+        self._data = np.ndarray((S, NUM_FRAMES, NUM_FEATURES), dtype=np.float32, buffer=buf, offset=offset)
+
+    def _check_header(self, size):
+        """ValueError si el segmento existente fue creado con otra configuración"""
+        expected = (SHM_MAGIC, self.max_sessions, NUM_FRAMES, NUM_FEATURES)
+        found = SHM_HEADER.unpack_from(self._shm.buf) if self._shm.size >= SHM_HEADER.size else None
+        if found != expected or self._shm.size < size:
+            # El segmento es de otro proceso: que el resource_tracker no lo elimine al salir
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+            self._shm.close()
+            self._lock_file.close()
+            raise ValueError(
+                f"El segmento de shared memory '{self.name}' no coincide con la configuración "
+                f"(cabecera {found}, {self._shm.size} bytes; se esperaba {expected}, {size} bytes). "
+                f"Eliminarlo o usar otro nombre"
+            )
+
+    def _locked(self):
+        return _FileLock(self._thread_lock, self._lock_file)
+
+    @staticmethod
+    def _hash(session_id):
+        key = int.from_bytes(hashlib.blake2b(str(session_id).encode(), digest_size=8).digest(), "little")
+        return np.uint64(key or 1)
+
+    def _find(self, key, create):
+        now = time.time()
+        matches = np.flatnonzero(self._keys == key)
+        if matches.size:
+            slot = matches[0]
+            if now - self._last_access[slot] < self.ttl:
+                self._last_access[slot] = now
+                return slot
+            # Sesión expirada: se reutiliza el slot desde cero
+            self._pos[slot] = 0
+            self._count[slot] = 0
+            if not create:
+                self._keys[slot] = 0
+                return None
+            self._last_access[slot] = now
+            return slot
+        if not create:
+            return None
+
+        free = np.flatnonzero(self._keys == 0)
+        if free.size:
+            slot = free[0]
+        else:
+            # Tabla llena: reciclar el slot menos usado (LRU)
+            slot = int(np.argmin(self._last_access))
+        self._keys[slot] = key
+        self._pos[slot] = 0
+        self._count[slot] = 0
+        self._last_access[slot] = now
+        return slot
+
+    def add_landmarks(self, session_id, landmarks):
+        frame = _as_frame(landmarks)
+        key = self._hash(session_id)
+        with self._locked():
+            slot = self._find(key, create=True)
+            pos = self._pos[slot]
+            self._data[slot, pos] = frame
+            self._pos[slot] = (pos + 1) % NUM_FRAMES
+            self._count[slot] = min(self._count[slot] + 1, NUM_FRAMES)
+            return int(self._count[slot])
+
+    def get_sequence(self, session_id):
+        key = self._hash(session_id)
+        with self._locked():
+            slot = self._find(key, create=False)
+            if slot is None or self._count[slot] < NUM_FRAMES:
+                return None
+            return _ordered(self._data[slot], int(self._pos[slot]))
+
+    def get_window(self, session_id):
+        key = self._hash(session_id)
+        with self._locked():
+            slot = self._find(key, create=False)
+            if slot is None or self._count[slot] < NUM_FRAMES:
+                return None
+            return self._data[slot].copy(), int(self._pos[slot])
+
+    def get_buffer_size(self, session_id):
+        key = self._hash(session_id)
+        with self._locked():
+            slot = self._find(key, create=False)
+            return int(self._count[slot]) if slot is not None else 0
+
+    def clear_buffer(self, session_id):
+        key = self._hash(session_id)
+        with self._locked():
+            slot = self._find(key, create=False)
+            if slot is not None:
+                self._pos[slot] = 0
+                self._count[slot] = 0
+
+    def active_sessions(self):
+        with self._locked():
+            alive = (self._keys != 0) & (time.time() - self._last_access < self.ttl)
+            return int(np.count_nonzero(alive))
+
+    def close(self):
+        """Libera las vistas de este proceso (el segmento sigue existiendo)"""
+        del self._keys, self._pos, self._count, self._last_access, self._data
+        self._shm.close()
+        self._lock_file.close()
+
+    def unlink(self):
+        """Elimina el segmento del sistema (usar solo al apagar el servicio)"""
+        resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+
+class _FileLock:
+    def __init__(self, thread_lock, lock_file):
+        self._thread_lock = thread_lock
+        self._lock_file = lock_file
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+class RedisBackend(BufferBackend):
+    """
+    Ring buffer por sesión en Redis.
+
+    Cada sesión usa un string de 65 × 972 bytes escrito con SETRANGE en la
+    posición del frame, y un contador INCR que indica la posición siguiente;
+    un sorted set registra el último acceso para contar sesiones vivas.
+    Las claves expiran a los `ttl` segundos de inactividad.
+
+    `client` puede ser cualquier objeto con la API de redis-py (por ejemplo
+    un stand-in local en pruebas); si no se pasa se crea desde `url`. Los
+    errores de Redis se lanzan como BufferUnavailable (503 en las vistas).
+    """
+
+    def __init__(self, client=None, url="redis://localhost:6379/0", prefix="gesture:", ttl=300):
+        try:
+            import redis
+        except ImportError:
+            if client is None:
+                raise ImportError(
+                    "El backend 'redis' requiere el paquete redis.\n"
+                    "Instálalo con 'pip install redis' o usa GESTURE_BUFFER_BACKEND=memory"
+                )
+            redis = None
+        if client is None:
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._errors = (redis.RedisError,) if redis is not None else ()
+        self.prefix = prefix
+        self.ttl = ttl
+        self._sessions_key = f"{prefix}sessions"
+
+    def _keys(self, session_id):
+        return f"{self.prefix}{session_id}:frames", f"{self.prefix}{session_id}:count"
+
+    @contextlib.contextmanager
+    def _available(self):
+        try:
+            yield
+        except self._errors as e:
+            raise BufferUnavailable(f"Buffers de sesión no disponibles (Redis): {e}") from e
+
+    def add_landmarks(self, session_id, landmarks):
+        frame = _as_frame(landmarks)
+        frames_key, count_key = self._keys(session_id)
+        now = time.time()
+        with self._available():
+            n = int(self.client.incr(count_key))
+            pipe = self.client.pipeline(transaction=False)
+            pipe.setrange(frames_key, ((n - 1) % NUM_FRAMES) * FRAME_BYTES, frame.tobytes())
+            pipe.expire(frames_key, self.ttl)
+            pipe.expire(count_key, self.ttl)
+            pipe.zadd(self._sessions_key, {str(session_id): now})
+            # Podar en cada escritura: el sorted set no crece aunque nadie consulte las sesiones
+            pipe.zremrangebyscore(self._sessions_key, 0, now - self.ttl)
+            pipe.execute()
+        return min(n, NUM_FRAMES)
+
+    def get_window(self, session_id):
+        frames_key, count_key = self._keys(session_id)
+        with self._available():
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(count_key)
+            pipe.get(frames_key)
+            count, data = pipe.execute()
+        if count is None or int(count) < NUM_FRAMES or data is None:
+            return None
+        ring = np.frombuffer(data, dtype=np.float32, count=NUM_FRAMES * NUM_FEATURES)
+        return ring.reshape(NUM_FRAMES, NUM_FEATURES), int(count) % NUM_FRAMES
+
+    def get_sequence(self, session_id):
+        window = self.get_window(session_id)
+        return _ordered(*window) if window is not None else None
+
+    def get_buffer_size(self, session_id):
+        _, count_key = self._keys(session_id)
+        with self._available():
+            count = self.client.get(count_key)
+        return min(int(count), NUM_FRAMES) if count is not None else 0
+
+    def clear_buffer(self, session_id):
+        with self._available():
+            pipe = self.client.pipeline(transaction=False)
+            pipe.delete(*self._keys(session_id))
+            pipe.zrem(self._sessions_key, str(session_id))
+            pipe.execute()
+
+    def active_sessions(self):
+        with self._available():
+            pipe = self.client.pipeline(transaction=False)
+            pipe.zremrangebyscore(self._sessions_key, 0, time.time() - self.ttl)
+            pipe.zcard(self._sessions_key)
+            return int(pipe.execute()[1])
@@ -0,0 +1,141 @@
+"""
+Predicción de un clip completo en un solo request (/api/predict-clip/).
+
+En vez de 65 requests con una imagen cada uno, el cliente sube todos los
+frames juntos: varios JPEG/PNG en un multipart o un video corto. Los frames
+se decodifican de a uno con un generador, pasan por MediaPipe y sus
+keypoints se escriben directo en la secuencia (65, 243); en memoria solo
+hay un frame decodificado a la vez. Con GESTURE_EXTRACTION_WORKERS > 0 los
+frames se decodifican acá y MediaPipe corre en el pool de extracción, como
+los frames de /api/predict/.
+
+Si el clip trae más de 65 frames se toman 65 espaciados uniformemente; con
+menos no se puede predecir.
+"""
+import logging
+import os
+import tempfile
+import uuid
+
+import numpy as np
+
+from .batching import predict_sequence
+from .buffer_backends import NUM_FEATURES, NUM_FRAMES
+from .extraction_pool import end_extraction_session, extract_frame_keypoints
+from .mediapipe_extractor import extractor_options_from_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ClipError(ValueError):
+    pass
+
+
+def sample_indices(total, count=NUM_FRAMES):
+    """Índices de `count` frames espaciados uniformemente entre `total`"""
+    if total < count:
+        raise ClipError(f"El clip tiene {total} frames, se requieren al menos {count}")
+    return np.linspace(0, total - 1, count).round().astype(int)
+
+
+def iter_image_frames(files):
+    """Decodifica de a uno los archivos de imagen seleccionados"""
+    from .image_decoding import decode_image
+
+    options = extractor_options_from_settings()
+    for index in sample_indices(len(files)):
+        upload = files[index]
+        try:
+            yield decode_image(
+                upload.read(),
+                decoder=options["decoder"],
+                max_size=options["max_image_size"],
+                resize_filter=options["resize_filter"],
+            )
+        except Exception as e:
+            raise ClipError(f"No se pudo decodificar el frame {index} ({upload.name}): {e}")
+
+
+def iter_video_frames(path):
+    """
+    Decodifica de a uno los frames seleccionados de un video. Los frames
+    descartados solo se leen con grab(), sin decodificarlos a imagen.
+    """
+    import cv2
+
+    from .image_decoding import CV2_FILTERS
+
+    options = extractor_options_from_settings()
+    max_size = options["max_image_size"]
+    resize_filter = options["resize_filter"] if options["resize_filter"] in CV2_FILTERS else "bilinear"
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ClipError("No se pudo abrir el video")
+
+    try:
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        # Algunos contenedores no informan la cantidad de frames: se usan los primeros 65
+        selected = set(sample_indices(total).tolist()) if total > 0 else set(range(NUM_FRAMES))
+
+        position = 0
+        remaining = len(selected)
+        while remaining and capture.grab():
+            if position in selected:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    raise ClipError(f"No se pudo decodificar el frame {position} del video")
+                height, width = frame.shape[:2]
+                scale = max_size / max(width, height)
+                if scale < 1:
+                    frame = cv2.resize(frame, (round(width * scale), round(height * scale)),
+                                       interpolation=CV2_FILTERS[resize_filter])
+                yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                remaining -= 1
+            position += 1
+
+        if remaining:
+            raise ClipError(f"El video terminó antes de lo esperado ({position} frames)")
+    finally:
+        capture.release()
+
+
+def video_path(upload):
+    """
+    Ruta en disco de un video subido (cv2.VideoCapture necesita un archivo).
+    Retorna (ruta, temporal): si `temporal` es True hay que borrarlo.
+    """
+    if hasattr(upload, "temporary_file_path"):
+        return upload.temporary_file_path(), False
+
+    suffix = os.path.splitext(upload.name or "")[1] or ".mp4"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temporary:
+        for chunk in upload.chunks():
+            temporary.write(chunk)
+    return temporary.name, True
+
+
+def extract_sequence(frames):
+    """Corre MediaPipe sobre un generador de frames RGB y arma la secuencia (65, 243)"""
+    # Sesión propia: con tracking, los frames del clip se siguen entre sí
+    session_id = f"clip-{uuid.uuid4().hex}"
+    sequence = np.empty((NUM_FRAMES, NUM_FEATURES), dtype=np.float32)
+
+    try:
+        count = 0
+        for row, frame in zip(sequence, frames):
+            row[:] = extract_frame_keypoints(frame, session_id).reshape(NUM_FEATURES)
+            count += 1
+    finally:
+        end_extraction_session(session_id)
+
+    if count < NUM_FRAMES:
+        raise ClipError(f"Solo se obtuvieron {count} frames, se requieren {NUM_FRAMES}")
+    return sequence
+
+
+def predict_clip(frames):
+    """Extrae los keypoints de todos los frames y predice el gesto"""
+    sequence = extract_sequence(frames)
+    logger.debug("🔮 Iniciando predicción del clip...")
+    return predict_sequence(sequence)
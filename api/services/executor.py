@@ -0,0 +1,55 @@
+"""
+Executor acotado para el trabajo de CPU de las vistas async y del WebSocket.
+
+Bajo un servidor ASGI (uvicorn) el event loop solo espera: la decodificación,
+Holistic y el invoke corren en GESTURE_ASYNC_WORKERS threads (OpenCV,
+MediaPipe y TFLite sueltan el GIL). Con un número fijo de threads una ráfaga
+no crea decenas de threads compitiendo por los mismos cores e intérpretes:
+los requests que no entran esperan en la cola del executor, sin ocupar el
+event loop.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "GESTURE_ASYNC_WORKERS", 4),
+                    thread_name_prefix="gesture-cpu",
+                )
+    return _executor
+
+
+def _track(delta):
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += delta
+
+
+async def run_blocking(func, *args):
+    """`await run_blocking(f, x)`: f(x) en el executor, sin bloquear el event loop"""
+    _track(1)
+    try:
+        return await sync_to_async(func, thread_sensitive=False, executor=get_executor())(*args)
+    finally:
+        _track(-1)
+
+
+def get_executor_stats():
+    """Llamadas en curso y en cola, None si ninguna vista async lo usó todavía"""
+    if _executor is None:
+        return None
+    workers = _executor._max_workers
+    return {"workers": workers, "en_vuelo": _in_flight, "en_cola": max(0, _in_flight - workers)}
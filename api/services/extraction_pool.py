@@ -0,0 +1,293 @@
+"""
+Extracción de landmarks en procesos separados.
+
+Decodificar la imagen y correr MediaPipe Holistic es trabajo de CPU que,
+dentro del thread del request, queda serializado en un solo grafo por
+worker. Con GESTURE_EXTRACTION_WORKERS > 0 cada proceso del pool tiene su
+propio MediaPipeExtractor y las extracciones corren en paralelo en todos
+los cores.
+
+- Afinidad: con tracking, cada sesión va siempre al mismo proceso, para
+  que Holistic (ver services.holistic_pool) vea sus frames en orden. Los
+  frames sin sesión o de la sesión 'default' (imagen estática, la mayoría
+  de los clientes) van al proceso con menos extracciones pendientes.
+- Cola acotada: con más de `max_pending` extracciones pendientes se
+  rechaza el frame (ExtractionBusy → 503 con Retry-After) en vez de
+  acumular latencia.
+- Timeout por request (ExtractionTimeout → 504). El frame sigue ocupando
+  su lugar en la cola hasta que el proceso termina de procesarlo.
+"""
+import base64
+import binascii
+import logging
+import multiprocessing
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from django.conf import settings
+
+from .keypoint_cache import get_keypoint_cache, image_key
+from .metrics import count_keypoint_cache, timed
+from .mediapipe_extractor import (
+    STATIC_SESSION_IDS,
+    MediaPipeExtractor,
+    extractor_options_from_settings,
+    get_mediapipe_extractor,
+    is_mediapipe_loaded,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionBusy(Exception):
+    """Todos los lugares de la cola de extracción están ocupados"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Extracción saturada, reintentar en {retry_after} s")
+        self.retry_after = retry_after
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Lado del proceso worker
+# ---------------------------------------------------------------------------
+
+_worker_extractor = None
+
+
+def _init_worker(extractor_options):
+    global _worker_extractor
+    _worker_extractor = MediaPipeExtractor(**extractor_options)
+
+
+def _extract(image, session_id):
+    return _extract_with(_worker_extractor, image, session_id)
+
+
+def _extract_with(extractor, image, session_id):
+    """`image`: bytes de la imagen (upload multipart) o texto base64"""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return extractor.extract_keypoints_from_bytes(image, session_id)
+    return extractor.extract_keypoints_from_base64(image, session_id)
+
+
+def _extract_frame(frame, session_id):
+    return _worker_extractor.extract_keypoints(frame, session_id)
+
+
+def _end_session(session_id):
+    _worker_extractor.end_session(session_id)
+
+
+def _warm_up_worker():
+    _worker_extractor.extract_keypoints(np.zeros((240, 320, 3), dtype=np.uint8), "warm-up")
+    _worker_extractor.end_session("warm-up")
+
+
+# ---------------------------------------------------------------------------
+# Lado del servidor
+# ---------------------------------------------------------------------------
+
+class ExtractionPool:
+
+    def __init__(self, workers, max_pending=16, timeout=5.0, retry_after=1, extractor_options=None):
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.extractor_options = extractor_options or {}
+
+        # spawn: los procesos no heredan los threads ni el intérprete TFLite del servidor
+        self._context = multiprocessing.get_context("spawn")
+        # Un executor de un solo proceso por worker para poder fijar la sesión a un proceso
+        self._executors = [self._create_executor() for _ in range(self.workers)]
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._pending_by_worker = [0] * self.workers
+        self._tracking = self.extractor_options.get("tracking", False)
+
+        logger.info(f"✅ Pool de extracción: {self.workers} procesos, cola máxima {self.max_pending}")
+
+    def _create_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self.extractor_options,),
+        )
+
+    def _has_affinity(self, session_id):
+        return self._tracking and session_id not in STATIC_SESSION_IDS
+
+    def _worker_for(self, session_id):
+        """Proceso fijo para una sesión con tracking; si no, el menos cargado (elegido con self._lock)"""
+        if self._has_affinity(session_id):
+            return zlib.crc32(str(session_id).encode()) % self.workers
+        return min(range(self.workers), key=self._pending_by_worker.__getitem__)
+
+    def _release_slot(self, index):
+        with self._lock:
+            self._pending -= 1
+            self._pending_by_worker[index] -= 1
+        self._slots.release()
+
+    def _submit(self, index, func, *args):
+        try:
+            return self._executors[index].submit(func, *args)
+        except BrokenProcessPool:
+            # El proceso murió (p. ej. por falta de memoria): se reemplaza y se reintenta una vez
+            logger.error(f"❌ Proceso de extracción {index} caído, reiniciando")
+            self._executors[index].shutdown(wait=False, cancel_futures=True)
+            self._executors[index] = self._create_executor()
+            return self._executors[index].submit(func, *args)
+
+    def extract(self, image, session_id=None):
+        """Extrae los keypoints (81, 3) de una imagen (bytes o base64); None si falla"""
+        return self._run(session_id, _extract, image, session_id)
+
+    def extract_frame(self, frame, session_id=None):
+        """Keypoints (81, 3) de un frame RGB (H, W, 3) ya decodificado"""
+        return self._run(session_id, _extract_frame, frame, session_id)
+
+    def _run(self, session_id, func, *args):
+        """func(*args) en el proceso de la sesión, con lugar en la cola y timeout"""
+        if not self._slots.acquire(blocking=False):
+            raise ExtractionBusy(self.retry_after)
+        with self._lock:
+            index = self._worker_for(session_id)
+            self._pending += 1
+            self._pending_by_worker[index] += 1
+
+        try:
+            future = self._submit(index, func, *args)
+        except Exception:
+            self._release_slot(index)
+            raise
+        future.add_done_callback(lambda _future: self._release_slot(index))
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise ExtractionTimeout(f"La extracción superó {self.timeout} s")
+
+    def end_session(self, session_id):
+        if not self._has_affinity(session_id):
+            return
+        try:
+            self._submit(self._worker_for(session_id), _end_session, session_id)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo liberar la sesión {session_id} en el pool de extracción: {e}")
+
+    def warm_up(self, timeout=120):
+        """Arranca todos los procesos e inicializa MediaPipe en cada uno"""
+        futures = [self._submit(index, _warm_up_worker) for index in range(self.workers)]
+        for future in futures:
+            future.result(timeout=timeout)
+
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def stats(self):
+        return {
+            "procesos": self.workers,
+            "pendientes": self.pending(),
+            "cola_maxima": self.max_pending,
+        }
+
+    def shutdown(self):
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def extraction_pool_enabled():
+    return getattr(settings, "GESTURE_EXTRACTION_WORKERS", 0) > 0
+
+
+def get_extraction_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ExtractionPool(
+                    workers=getattr(settings, "GESTURE_EXTRACTION_WORKERS", 0),
+                    max_pending=getattr(settings, "GESTURE_EXTRACTION_MAX_PENDING", 16),
+                    timeout=getattr(settings, "GESTURE_EXTRACTION_TIMEOUT", 5.0),
+                    retry_after=getattr(settings, "GESTURE_EXTRACTION_RETRY_AFTER", 1),
+                    extractor_options=extractor_options_from_settings(),
+                )
+    return _pool
+
+
+def get_extraction_stats():
+    if not extraction_pool_enabled() or _pool is None:
+        return None
+    return _pool.stats()
+
+
+def extract_keypoints(image, session_id=None):
+    """
+    Punto de entrada de las vistas: busca en la caché de keypoints y, si no
+    está, extrae con el pool de procesos (si está habilitado) o con el
+    extractor del propio proceso. `image` son los bytes de la imagen o el
+    texto base64.
+    """
+    if not isinstance(image, (bytes, bytearray, memoryview)):
+        try:
+            with timed("base64_decode"):
+                image = base64.b64decode(image)
+        except (binascii.Error, TypeError, ValueError) as e:
+            logger.warning("❌ Base64 inválido: %s", e)
+            return None
+
+    cache = get_keypoint_cache()
+    key = None
+    if cache is not None:
+        key = image_key(image)
+        keypoints = cache.get(key)
+        count_keypoint_cache(keypoints is not None)
+        if keypoints is not None:
+            return keypoints
+
+    # Decodificación + Holistic, incluida la espera en la cola del pool de procesos
+    with timed("extraction"):
+        if extraction_pool_enabled():
+            keypoints = get_extraction_pool().extract(image, session_id)
+        else:
+            keypoints = _extract_with(get_mediapipe_extractor(), image, session_id)
+
+    if cache is not None and keypoints is not None:
+        cache.set(key, keypoints)
+    return keypoints
+
+
+def extract_frame_keypoints(frame, session_id):
+    """
+    Keypoints (81, 3) de un frame RGB ya decodificado (frames de un clip),
+    en el pool de procesos si está habilitado. Sin caché: los frames de un
+    clip no se repiten.
+    """
+    if extraction_pool_enabled():
+        return get_extraction_pool().extract_frame(frame, session_id)
+    return get_mediapipe_extractor().extract_keypoints(frame, session_id)
+
+
+def end_extraction_session(session_id):
+    if extraction_pool_enabled():
+        if _pool is not None:
+            _pool.end_session(session_id)
+        return
+
+    if is_mediapipe_loaded():
+        get_mediapipe_extractor().end_session(session_id)
@@ -0,0 +1,125 @@
+"""
+Instancias de MediaPipe Holistic en modo video, una por sesión.
+
+Con static_image_mode=True cada frame corre la detección completa. Los
+frames de una misma sesión son un video, así que en modo tracking
+(static_image_mode=False) Holistic reutiliza los landmarks del frame
+anterior y solo vuelve a detectar cuando pierde a la persona.
+
+Cada instancia guarda el estado de tracking de una sola sesión y no es
+segura entre threads: se presta en exclusiva. El pool está acotado; las
+sesiones inactivas (TTL) o las menos usadas (LRU) liberan su instancia,
+que se reinicia con reset() y se recicla para otra sesión.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class _Tracker:
+    __slots__ = ("holistic", "in_use", "last_access")
+
+    def __init__(self, holistic):
+        self.holistic = holistic
+        self.in_use = False
+        self.last_access = time.monotonic()
+
+
+class HolisticPool:
+
+    def __init__(self, factory, max_sessions=8, ttl=30):
+        self.factory = factory
+        self.max_sessions = max(1, max_sessions)
+        self.ttl = ttl
+        self._trackers = OrderedDict()  # session_id -> _Tracker, en orden LRU
+        self._free = []  # instancias reiniciadas listas para reciclar
+        self._created = 0
+        self._condition = threading.Condition()
+
+    def _release(self, session_id):
+        tracker = self._trackers.pop(session_id)
+        tracker.holistic.reset()
+        self._free.append(tracker.holistic)
+
+    def _expire(self, now):
+        for session_id, tracker in list(self._trackers.items()):
+            if now - tracker.last_access < self.ttl:
+                break
+            if not tracker.in_use:
+                self._release(session_id)
+
+    def _evict_idle(self):
+        """Libera la sesión inactiva usada hace más tiempo; False si todas están en uso"""
+        for session_id, tracker in self._trackers.items():
+            if not tracker.in_use:
+                self._release(session_id)
+                return True
+        return False
+
+    def _acquire(self, session_id):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+
+                tracker = self._trackers.get(session_id)
+                if tracker is None:
+                    if self._free:
+                        tracker = _Tracker(self._free.pop())
+                    elif self._created < self.max_sessions:
+                        tracker = _Tracker(self.factory())
+                        self._created += 1
+                    elif self._evict_idle():
+                        tracker = _Tracker(self._free.pop())
+                    else:
+                        # Todas las instancias están procesando un frame
+                        self._condition.wait()
+                        continue
+                    self._trackers[session_id] = tracker
+                elif tracker.in_use:
+                    # Frames concurrentes de la misma sesión: se procesan en orden de llegada
+                    self._condition.wait()
+                    continue
+
+                self._trackers.move_to_end(session_id)
+                tracker.in_use = True
+                tracker.last_access = now
+                return tracker
+
+    @contextmanager
+    def checkout(self, session_id):
+        """Presta en exclusiva la instancia con el estado de tracking de la sesión"""
+        tracker = self._acquire(session_id)
+        try:
+            yield tracker.holistic
+        finally:
+            with self._condition:
+                tracker.in_use = False
+                tracker.last_access = time.monotonic()
+                self._condition.notify_all()
+
+    def discard(self, session_id):
+        """Libera la instancia de una sesión terminada (si no está en uso)"""
+        with self._condition:
+            tracker = self._trackers.get(session_id)
+            if tracker is not None and not tracker.in_use:
+                self._release(session_id)
+                self._condition.notify_all()
+
+    def active_sessions(self):
+        with self._condition:
+            return len(self._trackers)
+
+    def close(self):
+        with self._condition:
+            for tracker in self._trackers.values():
+                tracker.holistic.close()
+            for holistic in self._free:
+                holistic.close()
+            self._trackers.clear()
+            self._free.clear()
+            self._created = 0
@@ -0,0 +1,91 @@
+"""
+Decodificación de imágenes para MediaPipe.
+
+Convierte los bytes de una imagen (JPEG/PNG) en un array RGB uint8
+(H, W, 3) no mayor a `max_size` por lado:
+
+- 'cv2': cv2.imdecode directo del buffer. Para JPEG grandes usa
+  IMREAD_REDUCED_COLOR_{2,4,8}, que escala en el dominio DCT.
+- 'pil': PIL con draft() (el mismo escalado DCT del JPEG), luego el resize.
+
+El resize final usa `resize_filter`: 'area' o 'bilinear' cuestan una
+fracción de 'lanczos'. MediaPipe vuelve a escalar la imagen a la entrada
+de sus modelos (256×256 para la pose con model_complexity=0), así que
+no hace falta más resolución que la necesaria para recortar las manos.
+"""
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+DECODERS = ("pil", "cv2")
+
+CV2_FILTERS = {
+    "nearest": cv2.INTER_NEAREST,
+    "area": cv2.INTER_AREA,
+    "bilinear": cv2.INTER_LINEAR,
+    "lanczos": cv2.INTER_LANCZOS4,
+}
+
+PIL_FILTERS = {
+    "nearest": Image.Resampling.NEAREST,
+    "area": Image.Resampling.BOX,
+    "bilinear": Image.Resampling.BILINEAR,
+    "lanczos": Image.Resampling.LANCZOS,
+}
+
+_CV2_REDUCED = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def _fit(width, height, max_size):
+    scale = max_size / max(width, height)
+    if scale >= 1:
+        return width, height
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _decode_cv2(image_bytes, max_size, resize_filter):
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    flags = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+
+    # El header alcanza para conocer el tamaño sin decodificar la imagen
+    header = Image.open(io.BytesIO(image_bytes))
+    if header.format == "JPEG":
+        for factor, reduced in _CV2_REDUCED:
+            if max(header.size) // factor >= max_size:
+                flags = reduced | cv2.IMREAD_IGNORE_ORIENTATION
+                break
+
+    image = cv2.imdecode(buffer, flags)
+    if image is None:
+        raise ValueError("No se pudo decodificar la imagen")
+
+    height, width = image.shape[:2]
+    size = _fit(width, height, max_size)
+    if size != (width, height):
+        image = cv2.resize(image, size, interpolation=CV2_FILTERS[resize_filter])
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def _decode_pil(image_bytes, max_size, resize_filter):
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.format == "JPEG":
+        # draft elige la mayor reducción (1/2, 1/4, 1/8) que no quede por debajo del tamaño pedido
+        image.draft("RGB", _fit(*image.size, max_size))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    size = _fit(*image.size, max_size)
+    if size != image.size:
+        image = image.resize(size, PIL_FILTERS[resize_filter])
+    return np.asarray(image)
+
+
+def decode_image(image_bytes, decoder="pil", max_size=640, resize_filter="bilinear"):
+    """Retorna la imagen como array RGB uint8 (H, W, 3) de a lo sumo max_size por lado"""
+    if decoder == "cv2":
+        return _decode_cv2(image_bytes, max_size, resize_filter)
+    if decoder == "pil":
+        return _decode_pil(image_bytes, max_size, resize_filter)
+    raise ValueError(f"Decodificador desconocido: {decoder} (opciones: {', '.join(DECODERS)})")
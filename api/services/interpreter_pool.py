@@ -0,0 +1,134 @@
+"""
+Pool acotado de intérpretes TFLite.
+
+Un tflite.Interpreter no es seguro para usar desde varios threads a la vez:
+cada intérprete del pool tiene sus propios tensores asignados y se presta a
+un solo thread durante set_tensor / invoke / get_tensor.
+
+Con modelos de batch dinámico, redimensionar el input (resize_tensor_input
++ allocate_tensors) cuesta más que una inferencia chica. Para los tamaños
+de `batch_sizes` el pool mantiene intérpretes ya dimensionados; el resto
+usa intérpretes flexibles que solo se redimensionan cuando el batch cambia.
+"""
+import logging
+import queue
+from contextlib import contextmanager
+
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+class InterpreterPool:
+
+    def __init__(self, model_path, size=1, num_threads=None, batch_sizes=(), sequence_length=None):
+        import tflite_runtime.interpreter as tflite
+
+        self.size = max(1, size)
+        self.num_threads = num_threads
+        self._tflite = tflite
+        self._model_path = model_path
+        # LIFO: el intérprete devuelto más recientemente tiene la caché caliente
+        self._available = queue.LifoQueue()
+        self._batch_sizes = {}  # id(intérprete flexible) -> batch actual
+        self._presized = {}  # batch -> cola de intérpretes ya dimensionados
+
+        self._available.put(self._create_interpreter())
+        with self.checkout() as interpreter:
+            self.input_details = interpreter.get_input_details()
+            self.output_details = interpreter.get_output_details()
+
+        # Modelos exportados con batch dinámico (shape_signature[0] == -1) y,
+        # opcionalmente, largo de secuencia dinámico (shape_signature[1] == -1)
+        signature = self.input_details[0]["shape_signature"]
+        self.dynamic_batch = int(signature[0]) == -1
+        self._shape = [int(dim) for dim in self.input_details[0]["shape"]]
+        if int(signature[1]) == -1:
+            if sequence_length is None:
+                raise ValueError("El modelo tiene largo de secuencia dinámico: falta sequence_length")
+            self._shape[1] = sequence_length
+
+        for _ in range(self.size - 1):
+            self._available.put(self._create_interpreter())
+        if self._shape != [int(dim) for dim in self.input_details[0]["shape"]]:
+            for interpreter in list(self._available.queue):
+                self._resize(interpreter, self._shape[0])
+
+        # Intérpretes pre-dimensionados: `size` por cada batch frecuente
+        if self.dynamic_batch:
+            for batch_size in sorted(set(batch_sizes)):
+                presized = queue.LifoQueue()
+                for _ in range(self.size):
+                    interpreter = self._create_interpreter()
+                    self._resize(interpreter, batch_size)
+                    presized.put(interpreter)
+                self._presized[batch_size] = presized
+
+        logger.info(
+            f"✅ Pool de {self.size} intérpretes TFLite (num_threads={num_threads}"
+            + (f", pre-dimensionados para batch {sorted(self._presized)}" if self._presized else "")
+            + ")"
+        )
+
+    def _create_interpreter(self):
+        # model_path: TFLite mapea el archivo con mmap, las páginas del modelo
+        # se comparten entre intérpretes y workers
+        interpreter = self._tflite.Interpreter(model_path=self._model_path, num_threads=self.num_threads)
+        interpreter.allocate_tensors()
+        return interpreter
+
+    def _resize(self, interpreter, batch_size):
+        shape = list(self._shape)
+        shape[0] = batch_size
+        interpreter.resize_tensor_input(self.input_details[0]["index"], shape)
+        interpreter.allocate_tensors()
+
+    @contextmanager
+    def checkout(self, timeout=None, batch_size=None):
+        """
+        Presta un intérprete en exclusiva; bloquea si todos están en uso. Con
+        `batch_size` pre-dimensionado presta uno de esos intérpretes.
+        """
+        available = self._presized.get(batch_size, self._available)
+        interpreter = available.get(timeout=timeout)
+        try:
+            yield interpreter
+        finally:
+            available.put(interpreter)
+
+    def _ensure_batch(self, interpreter, batch_size):
+        """Redimensiona el input de un modelo con batch dinámico solo si el batch cambia"""
+        if not self.dynamic_batch or batch_size is None or batch_size in self._presized:
+            return
+        if self._batch_sizes.get(id(interpreter), self._shape[0]) == batch_size:
+            return
+        self._resize(interpreter, batch_size)
+        self._batch_sizes[id(interpreter)] = batch_size
+
+    def run(self, input_data):
+        """Ejecuta una inferencia y retorna una copia del output"""
+        with self.checkout(batch_size=len(input_data)) as interpreter:
+            self._ensure_batch(interpreter, len(input_data))
+            interpreter.set_tensor(self.input_details[0]["index"], input_data)
+            with timed("invoke"):
+                interpreter.invoke()
+            return interpreter.get_tensor(self.output_details[0]["index"])
+
+    def infer(self, write_input, read_output, batch_size=None):
+        """
+        Inferencia sin copias intermedias: `write_input(view)` escribe directo
+        en el buffer de entrada del intérprete y `read_output(view)` lee el
+        output en su lugar. Ninguna de las dos debe guardar referencias a la
+        vista: TFLite rechaza invoke() mientras existan. `batch_size` solo
+        se usa con modelos de batch dinámico.
+        """
+        with self.checkout(batch_size=batch_size) as interpreter:
+            self._ensure_batch(interpreter, batch_size)
+            with timed("normalize"):
+                write_input(interpreter.tensor(self.input_details[0]["index"])())
+            with timed("invoke"):
+                interpreter.invoke()
+            return read_output(interpreter.tensor(self.output_details[0]["index"])())
+
+    def available(self):
+        return self._available.qsize() + sum(presized.qsize() for presized in self._presized.values())
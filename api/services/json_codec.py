@@ -0,0 +1,34 @@
+"""
+JSON rápido para las rutas livianas: orjson si está instalado (parseo y
+serialización en C, arrays de numpy sin convertir a listas), si no el
+módulo json de la biblioteca estándar.
+"""
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # opcional: pip install orjson
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"No serializable a JSON: {type(value).__name__}")
+
+
+def loads(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def dumps(value):
+    """Retorna bytes (UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
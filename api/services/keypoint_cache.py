@@ -0,0 +1,242 @@
+"""
+Caché de keypoints por contenido de imagen.
+
+Los reintentos y los frames idénticos (p. ej. la cámara fija antes de que
+empiece la seña) pagan la decodificación y MediaPipe completos. La caché
+guarda los 243 valores extraídos con clave blake2b de los bytes de la
+imagen, acotada por cantidad de entradas (LRU) y por TTL.
+
+- 'memory': por proceso.
+- 'redis': compartida por todos los workers; las entradas expiran solas.
+
+Con tracking por sesión un acierto no avanza el estado de Holistic; para
+frames idénticos el resultado es el mismo.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KEYPOINTS_SHAPE = (81, 3)
+KEYPOINTS_BYTES = 81 * 3 * 4
+
+
+def image_key(image_bytes):
+    """Hash rápido (blake2b de 16 bytes) del contenido de la imagen"""
+    return hashlib.blake2b(image_bytes, digest_size=16).digest()
+
+
+class InProcessKeypointCache:
+
+    def __init__(self, max_entries=4096, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # clave -> (keypoints, expira)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0].copy()
+
+    def set(self, key, keypoints):
+        keypoints = np.array(keypoints, dtype=np.float32).reshape(KEYPOINTS_SHAPE)
+        with self._lock:
+            self._entries[key] = (keypoints, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._entries)
+            hits, misses = self._hits, self._misses
+        total = hits + misses
+        return {
+            "backend": "memory",
+            "aciertos": hits,
+            "fallos": misses,
+            "tasa_aciertos": hits / total if total else 0.0,
+            "entradas": entries,
+            "max_entradas": self.max_entries,
+            # keypoints + clave; sin contar el overhead de los objetos de Python
+            "memoria_bytes": entries * (KEYPOINTS_BYTES + 16),
+        }
+
+
+class RedisKeypointCache:
+    """
+    Caché compartida en Redis: un string de 972 bytes por imagen con EX
+    `ttl`, contadores globales de aciertos/fallos y un sorted set con la
+    hora de escritura para contar las entradas vivas.
+
+    Cada get() y set() es un solo round trip: los aciertos/fallos se
+    acumulan en el proceso y viajan en el pipeline de la siguiente llamada.
+    Si Redis falla la caché no corta el request: get() retorna None, set()
+    no guarda y se registra un warning (limitado por RateLimitFilter).
+    """
+
+    def __init__(self, client=None, url="redis://localhost:6379/0", prefix="gesture:kp:", ttl=60):
+        try:
+            import redis
+        except ImportError:
+            if client is None:
+                raise ImportError(
+                    "La caché 'redis' requiere el paquete redis.\n"
+                    "Instálalo con 'pip install redis' o usa GESTURE_KEYPOINT_CACHE=memory"
+                )
+            redis = None
+        if client is None:
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._errors = (redis.RedisError,) if redis is not None else ()
+        self.prefix = prefix
+        self.ttl = ttl
+        self._hits_key = f"{prefix}stats:hits"
+        self._misses_key = f"{prefix}stats:misses"
+        self._entries_key = f"{prefix}entries"
+        self._pending = [0, 0]  # aciertos y fallos todavía no enviados a Redis
+        self._pending_lock = threading.Lock()
+
+    def _count(self, hit):
+        with self._pending_lock:
+            self._pending[0 if hit else 1] += 1
+
+    def _pipeline(self):
+        """Pipeline con los contadores pendientes; retorna (pipe, pendientes)"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, [0, 0]
+        pipe = self.client.pipeline(transaction=False)
+        if pending[0]:
+            pipe.incrby(self._hits_key, pending[0])
+        if pending[1]:
+            pipe.incrby(self._misses_key, pending[1])
+        return pipe, pending
+
+    def _execute(self, pipe, pending):
+        """Resultados del pipeline sin los INCRBY; si falla, los contadores vuelven a quedar pendientes"""
+        try:
+            results = pipe.execute()
+        except Exception:
+            with self._pending_lock:
+                self._pending[0] += pending[0]
+                self._pending[1] += pending[1]
+            raise
+        return results[bool(pending[0]) + bool(pending[1]):]
+
+    def get(self, key):
+        pipe, pending = self._pipeline()
+        pipe.get(self.prefix + key.hex())
+        try:
+            value, = self._execute(pipe, pending)
+        except self._errors as e:
+            logger.warning(f"⚠️ Caché de keypoints no disponible (Redis): {e}")
+            return None
+        self._count(value is not None)
+        if value is None or len(value) != KEYPOINTS_BYTES:
+            return None
+        return np.frombuffer(value, dtype="<f4").reshape(KEYPOINTS_SHAPE).copy()
+
+    def set(self, key, keypoints):
+        value = np.asarray(keypoints, dtype="<f4").tobytes()
+        now = time.time()
+        pipe, pending = self._pipeline()
+        pipe.set(self.prefix + key.hex(), value, ex=self.ttl)
+        pipe.zadd(self._entries_key, {key.hex(): now})
+        # Sin esto el sorted set crecería con cada imagen distinta hasta el próximo stats()
+        pipe.zremrangebyscore(self._entries_key, 0, now - self.ttl)
+        try:
+            self._execute(pipe, pending)
+        except self._errors as e:
+            logger.warning(f"⚠️ Caché de keypoints no disponible (Redis): {e}")
+
+    def clear(self):
+        with self._pending_lock:
+            self._pending = [0, 0]
+        keys = [self.prefix + member.decode() for member in self.client.zrange(self._entries_key, 0, -1)]
+        self.client.delete(self._entries_key, self._hits_key, self._misses_key, *keys)
+
+    def stats(self):
+        pipe, pending = self._pipeline()
+        pipe.zremrangebyscore(self._entries_key, 0, time.time() - self.ttl)
+        pipe.zcard(self._entries_key)
+        pipe.get(self._hits_key)
+        pipe.get(self._misses_key)
+        _, entries, hits, misses = self._execute(pipe, pending)
+        hits, misses = int(hits or 0), int(misses or 0)
+        total = hits + misses
+        return {
+            "backend": "redis",
+            "aciertos": hits,
+            "fallos": misses,
+            "tasa_aciertos": hits / total if total else 0.0,
+            "entradas": entries,
+            "memoria_bytes": entries * KEYPOINTS_BYTES,
+        }
+
+
+def create_keypoint_cache(name=None):
+    """Crea la caché configurada en GESTURE_KEYPOINT_CACHE (none, memory, redis)"""
+    name = name or getattr(settings, "GESTURE_KEYPOINT_CACHE", "memory")
+    ttl = getattr(settings, "GESTURE_KEYPOINT_CACHE_TTL", 60)
+
+    if name == "none":
+        return None
+    if name == "memory":
+        return InProcessKeypointCache(
+            max_entries=getattr(settings, "GESTURE_KEYPOINT_CACHE_MAX_ENTRIES", 4096),
+            ttl=ttl,
+        )
+    if name == "redis":
+        return RedisKeypointCache(
+            url=getattr(settings, "GESTURE_KEYPOINT_CACHE_REDIS_URL", "redis://localhost:6379/0"),
+            ttl=ttl,
+        )
+    raise ValueError(f"GESTURE_KEYPOINT_CACHE desconocido: {name}")
+
+
+_cache = None
+_cache_created = False
+_cache_lock = threading.Lock()
+
+
+def get_keypoint_cache():
+    """Caché global del proceso; None si está deshabilitada"""
+    global _cache, _cache_created
+    if not _cache_created:
+        with _cache_lock:
+            if not _cache_created:
+                _cache = create_keypoint_cache()
+                _cache_created = True
+    return _cache
+
+
+def get_keypoint_cache_stats():
+    cache = get_keypoint_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.stats()
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudieron leer las estadísticas de la caché de keypoints: {e}")
+        return {"error": str(e)}
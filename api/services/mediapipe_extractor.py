@@ -1,101 +1,231 @@
-import mediapipe as mp
-import cv2
 import numpy as np
-from PIL import Image
-import io
 import base64
+import logging
+import threading
+
+from .holistic_pool import HolisticPool
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# mediapipe, cv2 y PIL se importan al crear el extractor / decodificar la
+# primera imagen: los procesos que solo predicen no pagan su memoria
+
+# Layout de los 81 keypoints (243 valores) que espera el modelo
+NUM_KEYPOINTS = 81
+POSE = slice(0, 33)
+FACE = slice(33, 39)
+LEFT_HAND = slice(39, 60)
+RIGHT_HAND = slice(60, 81)
+FACE_INDICES = (1, 33, 263, 61, 291, 199)
+
+# Memoria aproximada de una instancia de Holistic (grafo + modelos cargados)
+HOLISTIC_INSTANCE_MB = 150
+
+# Sesiones sin tracking propio: frames sueltos o de clientes que no mandan
+# session_id (sequence_buffer.DEFAULT_SESSION_ID), que mezclan personas
+STATIC_SESSION_IDS = (None, "default")
+
+# Cada landmark serializado: tag y largo del registro, y luego x, y, z como
+# (tag de 1 byte + float32) en ese orden; la pose agrega visibility/presence
+_RECORD_TAGS = ((0, 0x0A), (2, 0x0D), (7, 0x15), (12, 0x1D))
+
+
+def _landmarks_into(landmark_list, out):
+    """
+    Copia x, y, z de un NormalizedLandmarkList en `out` (N, 3).
+
+    Leer lm.x / lm.y / lm.z punto por punto cuesta un acceso a protobuf por
+    valor; en su lugar se serializa la lista una vez y se leen los floats
+    con una vista de numpy sobre los bytes. Si los registros no tienen el
+    layout esperado se usa el camino punto por punto.
+    """
+    count = len(out)
+    raw = landmark_list.SerializeToString()
+    size = len(raw) // count if count else 0
+    if (
+        size >= 17
+        and size * count == len(raw)
+        and raw[1] == size - 2
+        and all(raw[offset::size] == bytes((tag,)) * count for offset, tag in _RECORD_TAGS)
+    ):
+        out[:] = np.ndarray((count, 3), dtype="<f4", buffer=raw, offset=3, strides=(size, 5))
+        return
+    out[:] = [(lm.x, lm.y, lm.z) for lm in landmark_list.landmark]
+
+
+def tracking_sessions_for_budget(max_sessions, memory_budget_mb):
+    """
+    Instancias de tracking que entran en `memory_budget_mb`, reservando una
+    para la instancia estática; 0 si no alcanza para ninguna.
+    """
+    if memory_budget_mb is None:
+        return max_sessions
+    return max(0, min(max_sessions, memory_budget_mb // HOLISTIC_INSTANCE_MB - 1))
+
 
 class MediaPipeExtractor:
-    def __init__(self):
+    def __init__(self, tracking=False, model_complexity=0, max_sessions=1, session_ttl=30,
+                 decoder="pil", max_image_size=640, resize_filter="bilinear", memory_budget_mb=None):
+        """
+        tracking=False: una instancia global en static_image_mode (detección
+        completa en cada frame). tracking=True: además, una instancia en modo
+        video por sesión (ver services.holistic_pool), como máximo
+        max_sessions y las que entren en memory_budget_mb junto con la
+        estática (~150 MB cada una; en settings, 300 MB = estática + 1);
+        la sesión por defecto y los frames sin sesión siempre usan la
+        instancia estática. decoder / max_image_size / resize_filter: ver
+        services.image_decoding.
+        """
+        if tracking:
+            budget_sessions = tracking_sessions_for_budget(max_sessions, memory_budget_mb)
+            if budget_sessions == 0:
+                logger.warning(
+                    f"⚠️ {memory_budget_mb} MB no alcanzan para instancias de tracking "
+                    f"(~{HOLISTIC_INSTANCE_MB} MB cada una): se usa imagen estática"
+                )
+                tracking = False
+            elif budget_sessions < max_sessions:
+                logger.info(f"Pool de Holistic limitado a {budget_sessions} sesiones por presupuesto de memoria")
+            max_sessions = budget_sessions
+
+        self.tracking = tracking
+        self.model_complexity = model_complexity
+        self.decoder = decoder
+        self.max_image_size = max_image_size
+        self.resize_filter = resize_filter
         try:
+            import mediapipe as mp
+
             self.mpHolistic = mp.solutions.holistic
-            self.holistic = self.mpHolistic.Holistic(
-                static_image_mode=True,
-                model_complexity=0,
-                min_detection_confidence=0.5,
-                min_tracking_confidence=0.5
-            )
-            print("✅ MediaPipe inicializado")
+            if tracking:
+                self.holistic_pool = HolisticPool(
+                    lambda: self._create_holistic(static_image_mode=False),
+                    max_sessions=max_sessions,
+                    ttl=session_ttl,
+                )
+                # La instancia estática se crea con el primer frame sin sesión
+                self.holistic = None
+            else:
+                self.holistic = self._create_holistic(static_image_mode=True)
+            self._holistic_lock = threading.Lock()
+            logger.info(f"✅ MediaPipe inicializado ({'tracking por sesión' if tracking else 'imagen estática'})")
         except Exception as e:
-            print(f"❌ Error inicializando MediaPipe: {e}")
+            logger.error(f"❌ Error inicializando MediaPipe: {e}")
             raise
-    
-    def extract_keypoints_from_base64(self, image_base64: str):
+
+    def _create_holistic(self, static_image_mode):
+        return self.mpHolistic.Holistic(
+            static_image_mode=static_image_mode,
+            model_complexity=self.model_complexity,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+
+    def extract_keypoints_from_base64(self, image_base64: str, session_id=None):
         try:
-            # Decodificar imagen
             image_bytes = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Redimensionar para mejor rendimiento
-            image.thumbnail((640, 640), Image.Resampling.LANCZOS)
-            
-            # Convertir a numpy array
-            img_array = np.array(image)
-            
-            # Asegurarse de que es RGB
-            if len(img_array.shape) == 2:
-                img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2RGB)
-            elif img_array.shape[2] == 4:
-                img_array = cv2.cvtColor(img_array, cv2.COLOR_RGBA2RGB)
-            
-            # Procesar con MediaPipe
-            results = self.holistic.process(img_array)
-            
-            # Extraer keypoints
-            keypoints = self._extract_keypoints(results)
-            
-            return keypoints
+        except Exception as e:
+            logger.warning("❌ Base64 inválido: %s", e)
+            return None
+        return self.extract_keypoints_from_bytes(image_bytes, session_id)
+
+    def extract_keypoints_from_bytes(self, image_bytes, session_id=None):
+        """Imagen codificada (JPEG/PNG, p. ej. un upload multipart) → keypoints (81, 3)"""
+        from .image_decoding import decode_image
+
+        try:
+            with timed("image_decode"):
+                img_array = decode_image(
+                    image_bytes,
+                    decoder=self.decoder,
+                    max_size=self.max_image_size,
+                    resize_filter=self.resize_filter,
+                )
+            return self.extract_keypoints(img_array, session_id)
             
         except Exception as e:
-            print(f"❌ Error extrayendo keypoints: {e}")
-            import traceback
-            traceback.print_exc()
+            # Imagen corrupta o formato no soportado: el traceback solo en DEBUG
+            logger.warning("❌ Error extrayendo keypoints: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return None
+
+    def extract_keypoints(self, img_array, session_id=None):
+        """Procesa una imagen RGB (H, W, 3) y retorna los keypoints (81, 3)"""
+        if self.tracking and session_id not in STATIC_SESSION_IDS:
+            with self.holistic_pool.checkout(session_id) as holistic, timed("holistic"):
+                results = holistic.process(img_array)
+        else:
+            with self._holistic_lock:
+                if self.holistic is None:
+                    self.holistic = self._create_holistic(static_image_mode=True)
+                with timed("holistic"):
+                    results = self.holistic.process(img_array)
+        return self._extract_keypoints(results)
+
+    def end_session(self, session_id):
+        """Libera el estado de tracking de una sesión terminada"""
+        if self.tracking and session_id not in STATIC_SESSION_IDS:
+            self.holistic_pool.discard(session_id)
     
-    def _extract_keypoints(self, results):
-        keypoints = []
-        
-        # Pose: 33 puntos × 3 = 99 valores
-        if results.pose_landmarks:
-            for lm in results.pose_landmarks.landmark:
-                keypoints.extend([lm.x, lm.y, lm.z])
+    def _extract_keypoints(self, results, out=None):
+        """
+        Escribe los 81 keypoints (x, y, z) en un array float32 (81, 3).
+        Las partes no detectadas quedan en cero.
+        """
+        if out is None:
+            out = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
         else:
-            keypoints.extend([0.0] * 99)
-        
-        # Cara: 6 puntos × 3 = 18 valores
+            out.fill(0.0)
+
+        # Pose: 33 puntos
+        if results.pose_landmarks:
+            _landmarks_into(results.pose_landmarks, out[POSE])
+
+        # Cara: 6 puntos de los 468
         if results.face_landmarks:
-            face_indices = [1, 33, 263, 61, 291, 199]
-            for idx in face_indices:
-                lm = results.face_landmarks.landmark[idx]
-                keypoints.extend([lm.x, lm.y, lm.z])
-        else:
-            keypoints.extend([0.0] * 18)
-        
-        # Mano izquierda: 21 puntos × 3 = 63 valores
+            landmark = results.face_landmarks.landmark
+            out[FACE] = [(lm.x, lm.y, lm.z) for lm in (landmark[idx] for idx in FACE_INDICES)]
+
+        # Manos: 21 puntos cada una
         if results.left_hand_landmarks:
-            for lm in results.left_hand_landmarks.landmark:
-                keypoints.extend([lm.x, lm.y, lm.z])
-        else:
-            keypoints.extend([0.0] * 63)
-        
-        # Mano derecha: 21 puntos × 3 = 63 valores
+            _landmarks_into(results.left_hand_landmarks, out[LEFT_HAND])
         if results.right_hand_landmarks:
-            for lm in results.right_hand_landmarks.landmark:
-                keypoints.extend([lm.x, lm.y, lm.z])
-        else:
-            keypoints.extend([0.0] * 63)
-        
-        return keypoints
-    
+            _landmarks_into(results.right_hand_landmarks, out[RIGHT_HAND])
+
+        return out
+
     def close(self):
-        if hasattr(self, 'holistic'):
+        if getattr(self, 'holistic', None) is not None:
             self.holistic.close()
+        if hasattr(self, 'holistic_pool'):
+            self.holistic_pool.close()
 
 # Instancia global
 _extractor = None
+_extractor_lock = threading.Lock()
 
 def get_mediapipe_extractor():
     global _extractor
     if _extractor is None:
-        _extractor = MediaPipeExtractor()
-    return _extractor
\ No newline at end of file
+        with _extractor_lock:
+            if _extractor is None:
+                _extractor = MediaPipeExtractor(**extractor_options_from_settings())
+    return _extractor
+
+def extractor_options_from_settings():
+    """Opciones de MediaPipeExtractor según settings (también para los procesos de extracción)"""
+    from django.conf import settings
+
+    return {
+        "tracking": getattr(settings, "GESTURE_MEDIAPIPE_TRACKING", False),
+        "model_complexity": getattr(settings, "GESTURE_MEDIAPIPE_MODEL_COMPLEXITY", 0),
+        "max_sessions": getattr(settings, "GESTURE_MEDIAPIPE_MAX_SESSIONS", 1),
+        "memory_budget_mb": getattr(settings, "GESTURE_MEDIAPIPE_MEMORY_BUDGET_MB", 300),
+        "session_ttl": getattr(settings, "GESTURE_MEDIAPIPE_SESSION_TTL", 30),
+        "decoder": getattr(settings, "GESTURE_IMAGE_DECODER", "pil"),
+        "max_image_size": getattr(settings, "GESTURE_IMAGE_MAX_SIZE", 640),
+        "resize_filter": getattr(settings, "GESTURE_IMAGE_RESIZE_FILTER", "bilinear"),
+    }
+
+def is_mediapipe_loaded():
+    return _extractor is not None
@@ -0,0 +1,224 @@
+"""
+Métricas del camino caliente en formato de texto de Prometheus (/api/metrics).
+
+Histogramas de latencia por etapa del request (parseo, base64, decodificación
+de la imagen, Holistic, buffer, normalización, invoke, top-k, respuesta) y
+por endpoint, más contadores de errores y de la caché de keypoints, y los
+requests en curso y en cola del control de admisión por endpoint. Sin
+dependencias: cada observación es un bisect y una suma bajo un lock.
+
+Las métricas son por proceso: con varios workers de gunicorn cada scrape
+lo responde un worker distinto. Las etapas que corren en el pool de
+extracción (decodificación y Holistic en otro proceso) quedan dentro de
+'extraction', medida desde el servidor.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+# Segundos: de 0.5 ms (buffer, top-k) a 5 s (Holistic en frío, clips)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Frames en el buffer de la sesión después de agregar uno
+BUFFER_FILL_BUCKETS = (1, 8, 16, 32, 48, 64, 65)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Valores instantáneos por label, fijados al momento del scrape"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [conteo por bucket (+Inf al final), suma]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "gesture_stage_seconds", "Latencia por etapa del procesamiento de un frame o secuencia", ("stage",)
+)
+REQUEST_SECONDS = Histogram(
+    "gesture_request_seconds", "Latencia total por endpoint (vista + render de la respuesta)", ("endpoint", "status")
+)
+ERRORS_TOTAL = Counter("gesture_errors_total", "Respuestas con status >= 400 por endpoint", ("endpoint", "status"))
+KEYPOINT_CACHE_TOTAL = Counter("gesture_keypoint_cache_total", "Búsquedas en la caché de keypoints", ("result",))
+BUFFER_FILL = Histogram(
+    "gesture_buffer_fill_frames", "Frames en el buffer de la sesión después de agregar uno",
+    buckets=BUFFER_FILL_BUCKETS,
+)
+ADMISSION_SHED_TOTAL = Counter(
+    "gesture_admission_shed_total",
+    "Requests rechazados (queue_full, timeout, degraded_rejected) o degradados a landmarks por endpoint",
+    ("endpoint", "reason"),
+)
+ADMISSION_IN_FLIGHT = Gauge("gesture_admission_in_flight", "Requests en curso por endpoint", ("endpoint",))
+ADMISSION_QUEUE = Gauge("gesture_admission_queue", "Requests esperando turno por endpoint", ("endpoint",))
+
+REGISTRY = (
+    STAGE_SECONDS, REQUEST_SECONDS, ERRORS_TOTAL, KEYPOINT_CACHE_TOTAL, BUFFER_FILL,
+    ADMISSION_SHED_TOTAL, ADMISSION_IN_FLIGHT, ADMISSION_QUEUE,
+)
+
+
+_enabled = None
+
+
+def metrics_enabled():
+    global _enabled
+    if _enabled is None:
+        # Fuera de Django (procesos del pool de extracción, benchmarks) se miden igual
+        _enabled = getattr(settings, "GESTURE_METRICS", True) if settings.configured else True
+    return _enabled
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.stage)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(stage):
+    """`with timed("invoke"): ...` registra la duración del bloque en gesture_stage_seconds"""
+    return _Timer(stage) if metrics_enabled() else _NULL_TIMER
+
+
+def observe_request(endpoint, status_code, seconds):
+    if not metrics_enabled():
+        return
+    REQUEST_SECONDS.observe(seconds, endpoint, str(status_code))
+    if status_code >= 400:
+        ERRORS_TOTAL.inc(endpoint, str(status_code))
+
+
+def observe_buffer_fill(frames):
+    if metrics_enabled():
+        BUFFER_FILL.observe(frames)
+
+
+def count_keypoint_cache(hit):
+    if metrics_enabled():
+        KEYPOINT_CACHE_TOTAL.inc("hit" if hit else "miss")
+
+
+def count_admission_shed(endpoint, reason):
+    if metrics_enabled():
+        ADMISSION_SHED_TOTAL.inc(endpoint, reason)
+
+
+def render(gauges=()):
+    """
+    Texto de exposición de Prometheus. `gauges`: (nombre, ayuda, valor) de
+    valores instantáneos leídos al momento del scrape; los None se omiten.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    for name, documentation, value in gauges:
+        if value is None:
+            continue
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -2,6 +2,11 @@ import numpy as np
 import pickle
 import os
 import logging
+import threading
+
+from .buffer_backends import NUM_FRAMES
+from .interpreter_pool import InterpreterPool
+from .metrics import timed
 
 logger = logging.getLogger(__name__)
 
@@ -12,29 +17,120 @@ MODEL_TFLITE = os.path.join(BASE_DIR, "ml", "modelo.tflite")
 MODEL_KERAS = os.path.join(BASE_DIR, "ml", "best_model_sin_patron_ceros.keras")
 LABEL_ENCODER_PATH = os.path.join(BASE_DIR, "ml", "label_encoder.pkl")
 NORMALIZER_PATH = os.path.join(BASE_DIR, "ml", "normalizacion_sin_patron.pkl")
+# Variantes cuantizadas (convert_to_tflite.py --variantes), elegidas con GESTURE_MODEL_VARIANT
+MODEL_VARIANTS = {
+    "float32": MODEL_TFLITE,
+    "dynamic_int8": os.path.join(BASE_DIR, "ml", "modelo_dynamic_int8.tflite"),
+    "int8": os.path.join(BASE_DIR, "ml", "modelo_int8.tflite"),
+    "float16": os.path.join(BASE_DIR, "ml", "modelo_float16.tflite"),
+}
+# Clases + media/desviación en arrays planos (generado por convert_to_tflite.py)
+ARTIFACTS_PATH = os.path.join(BASE_DIR, "ml", "artefactos.npz")
+
+# Batch por invocación para modelos sin batch fijo (Keras o TFLite con batch dinámico)
+DEFAULT_MAX_BATCH_SIZE = 64
+
+
+def model_variant_path(variant):
+    """
+    Ruta del modelo TFLite de la variante pedida. Si el archivo no existe
+    se usa el modelo float32, para que un despliegue sin las variantes
+    generadas siga funcionando.
+    """
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(
+            f"Variante de modelo desconocida: {variant} (opciones: {', '.join(MODEL_VARIANTS)})"
+        )
+    path = MODEL_VARIANTS[variant]
+    if variant != "float32" and not os.path.exists(path):
+        logger.warning(f"⚠️  No existe {path}, usando el modelo float32")
+        return MODEL_TFLITE
+    return path
+
+
+_artifacts = None
+_artifacts_lock = threading.Lock()
+
+
+def _load_pickled_artifacts():
+    """Fallback sin artefactos.npz: los pickles originales (requiere scikit-learn)"""
+    # Load label encoder
+    logger.info(f"Cargando label encoder desde {LABEL_ENCODER_PATH}")
+    with open(LABEL_ENCODER_PATH, "rb") as f:
+        label_encoder = pickle.load(f)
+    logger.info(f"✅ Label encoder cargado: {len(label_encoder.classes_)} clases")
+
+    # Load normalizer
+    logger.info(f"Cargando normalizer desde {NORMALIZER_PATH}")
+    with open(NORMALIZER_PATH, "rb") as f:
+        normalizer = pickle.load(f)
+    logger.info("✅ Normalizer cargado exitosamente")
+
+    return {"classes": np.asarray(label_encoder.classes_), "normalizer": normalizer}
+
+
+def load_artifacts():
+    """
+    Carga una sola vez por proceso las clases y la normalización. Con
+    artefactos.npz (ver convert_to_tflite.py) son arrays de numpy y no hace
+    falta importar scikit-learn; si no existe se usan los pickles.
+
+    Llamado antes del fork (gunicorn preload_app), los workers heredan estos
+    objetos de solo lectura copy-on-write. El modelo no se lee acá: TFLite
+    lo mapea con mmap desde el archivo, así que sus páginas son compartidas
+    por todos los workers vía el page cache; los intérpretes, que tienen
+    threads y estado propio, se crean después del fork.
+    """
+    global _artifacts
+    if _artifacts is None:
+        with _artifacts_lock:
+            if _artifacts is None:
+                if os.path.exists(ARTIFACTS_PATH):
+                    logger.info(f"Cargando clases y normalización desde {ARTIFACTS_PATH}")
+                    with np.load(ARTIFACTS_PATH, allow_pickle=False) as data:
+                        _artifacts = {
+                            "classes": data["classes"],
+                            "normalizer": {"mean": float(data["mean"]), "std": float(data["std"])},
+                        }
+                    logger.info(f"✅ Artefactos cargados: {len(_artifacts['classes'])} clases")
+                else:
+                    _artifacts = _load_pickled_artifacts()
+    return _artifacts
 
 
 class GesturePredictor:
 
-    def __init__(self):
-        self.interpreter = None
+    def __init__(self, pool_size=1, num_threads=None, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 variant="float32", batch_sizes=None):
+        self.max_batch_size = max_batch_size
+        self.model_path = model_variant_path(variant)
+        self.interpreter_pool = None
         self.model = None
         self.input_details = None
         self.output_details = None
-        self.label_encoder = None
+        self.classes = None
+        self.labels = None
         self.normalizer = None
         self.use_tflite = False
 
         try:
             # PRODUCCIÓN: Solo usar TFLite (liviano, ~200MB RAM)
             # NOTA: TensorFlow completo requiere ~2GB RAM y no funciona en Render Free Tier
-            if os.path.exists(MODEL_TFLITE):
-                logger.info(f"Cargando modelo TFLite desde {MODEL_TFLITE}")
-                import tflite_runtime.interpreter as tflite
-                self.interpreter = tflite.Interpreter(model_path=MODEL_TFLITE)
-                self.interpreter.allocate_tensors()
-                self.input_details = self.interpreter.get_input_details()
-                self.output_details = self.interpreter.get_output_details()
+            if os.path.exists(self.model_path):
+                logger.info(f"Cargando modelo TFLite desde {self.model_path}")
+                # Con batch dinámico: intérpretes ya dimensionados para una secuencia
+                # (predict, streaming) y para un batch lleno (predict_batch, micro-batching)
+                if batch_sizes is None:
+                    batch_sizes = (1, max_batch_size)
+                self.interpreter_pool = InterpreterPool(
+                    self.model_path,
+                    size=pool_size,
+                    num_threads=num_threads,
+                    batch_sizes=batch_sizes,
+                    sequence_length=NUM_FRAMES,
+                )
+                self.input_details = self.interpreter_pool.input_details
+                self.output_details = self.interpreter_pool.output_details
                 self.use_tflite = True
                 logger.info("✅ Modelo TFLite cargado exitosamente")
                 logger.info(f"   Input shape: {self.input_details[0]['shape']}")
@@ -69,17 +165,11 @@ class GesturePredictor:
                     f"4. Haz commit: git add api/ml/modelo.tflite\n"
                 )
 
-            # Load label encoder
-            logger.info(f"Cargando label encoder desde {LABEL_ENCODER_PATH}")
-            with open(LABEL_ENCODER_PATH, "rb") as f:
-                self.label_encoder = pickle.load(f)
-            logger.info(f"✅ Label encoder cargado: {len(self.label_encoder.classes_)} clases")
-
-            # Load normalizer
-            logger.info(f"Cargando normalizer desde {NORMALIZER_PATH}")
-            with open(NORMALIZER_PATH, "rb") as f:
-                self.normalizer = pickle.load(f)
-            logger.info("✅ Normalizer cargado exitosamente")
+            artifacts = load_artifacts()
+            self.classes = artifacts["classes"]
+            self.normalizer = artifacts["normalizer"]
+            # Etiquetas como str de Python, indexadas una sola vez al armar las respuestas
+            self.labels = [str(label) for label in self.classes]
 
         except Exception as e:
             logger.error(f"❌ Error inicializando GesturePredictor: {e}", exc_info=True)
@@ -91,83 +181,240 @@ class GesturePredictor:
         Cada frame debe ser un vector del mismo tamaño que usaste en training.
         """
         try:
-            logger.info(f"Prediciendo secuencia de {len(sequence_65_frames)} frames")
+            logger.debug("Prediciendo secuencia de %d frames", len(sequence_65_frames))
+
+            if self.use_tflite and isinstance(self.normalizer, dict):
+                result = self._predict_zero_copy(sequence_65_frames)
+            else:
+                result = self._predict_with_copies(sequence_65_frames)
+
+            logger.debug("✅ Predicción: %s (confianza: %.2f)", result['gesto'], result['confianza'])
+            return result
+
+        except Exception as e:
+            logger.error(f"❌ Error en predicción: {e}", exc_info=True)
+            raise
+
+    def _normalize_into(self, seqs, view):
+        """
+        Normaliza (B, 65, 243) directo en las primeras B filas del tensor de
+        entrada. Las filas restantes de un batch fijo conservan datos de
+        invocaciones anteriores: sus salidas se descartan.
+        """
+        rows = view[:len(seqs)]
+        np.subtract(seqs, self.normalizer['mean'], out=rows)
+        np.divide(rows, self.normalizer['std'], out=rows)
+
+    def _predict_zero_copy(self, sequence_65_frames):
+        """Fast path: sin arrays intermedios, usando las vistas de tensores del intérprete"""
+        seq = np.asarray(sequence_65_frames, dtype=np.float32).reshape(1, 65, -1)
+        return self.interpreter_pool.infer(
+            lambda view: self._normalize_into(seq, view),
+            lambda output: self.format_result(output[0]),
+            batch_size=1,
+        )
+
+    def _predict_with_copies(self, sequence_65_frames):
+        return self.format_result(self._probabilities_with_copies(sequence_65_frames))
+
+    def _probabilities_with_copies(self, sequence_65_frames):
+        seq = np.array(sequence_65_frames, dtype=np.float32)
+        logger.debug("Shape antes de normalizar: %s", seq.shape)
+
+        # Normalizar manualmente usando mean y std
+        if isinstance(self.normalizer, dict):
+            # El normalizer es un diccionario con 'mean' y 'std'
+            mean = self.normalizer['mean']
+            std = self.normalizer['std']
+            seq_reshaped = seq.reshape(65, -1)
+            seq_norm = (seq_reshaped - mean) / std
+            logger.debug("Normalización manual con mean=%.4f, std=%.4f", mean, std)
+        else:
+            # Fallback: usar .transform() si es un objeto sklearn
+            seq_norm = self.normalizer.transform(seq.reshape(65, -1))
+
+        logger.debug("Shape después de normalizar: %s", seq_norm.shape)
+
+        # Expandir a batch de 1
+        input_data = np.expand_dims(seq_norm, axis=0).astype(np.float32)
+        logger.debug("Shape input antes de ajustar batch: %s", input_data.shape)
+
+        # Predecir según el tipo de modelo
+        if self.use_tflite:
+            # TFLite: con batch dinámico el pool redimensiona a 1; con batch fijo hay que completarlo
+            expected_batch_size = 1 if self.interpreter_pool.dynamic_batch else self.input_details[0]['shape'][0]
+
+            if expected_batch_size > 1 and input_data.shape[0] == 1:
+                # El modelo espera un batch size fijo mayor que 1: completar con ceros
+                # (exportar con batch dinámico evita este cómputo desperdiciado)
+                logger.debug("⚠️  Modelo espera batch_size=%d, ajustando...", expected_batch_size)
+                padding = np.zeros((expected_batch_size - 1,) + input_data.shape[1:], dtype=np.float32)
+                input_data = np.concatenate((input_data, padding))
+                logger.debug("Shape input después de ajustar batch: %s", input_data.shape)
+
+            output_data = self.interpreter_pool.run(input_data)
+
+            # Si repetimos la secuencia, tomar solo la primera predicción
+            if expected_batch_size > 1:
+                output_data = output_data[0:1]
+                logger.debug("Tomando primera predicción del batch: %s", output_data.shape)
+        else:
+            # Keras
+            output_data = self.model.predict(input_data, verbose=0)
+
+        # Output es (1, num_classes), aplanar
+        probabilities = output_data[0]
+        logger.debug("Probabilidades shape: %s", probabilities.shape)
+
+        return probabilities
+
+    def predict_window(self, ring, pos):
+        """
+        Probabilidades de la ventana de 65 frames guardada en un ring buffer
+        (`pos` = índice del frame más antiguo). Las dos mitades del ring se
+        normalizan directo en el tensor de entrada, sin reordenar la ventana.
+        """
+        if not (self.use_tflite and isinstance(self.normalizer, dict)):
+            return self._probabilities_with_copies(np.concatenate((ring[pos:], ring[:pos])))
+
+        def write_input(view):
+            seq = view[0]
+            head = len(ring) - pos
+            np.subtract(ring[pos:], self.normalizer['mean'], out=seq[:head])
+            np.subtract(ring[:pos], self.normalizer['mean'], out=seq[head:])
+            np.divide(seq, self.normalizer['std'], out=seq)
+
+        return self.interpreter_pool.infer(write_input, lambda output: output[0].copy(), batch_size=1)
+
+    @property
+    def batch_size(self):
+        """Secuencias por invocación: el batch fijo del modelo TFLite, o max_batch_size"""
+        if self.use_tflite and not self.interpreter_pool.dynamic_batch:
+            return int(self.input_details[0]['shape'][0])
+        return self.max_batch_size
+
+    def predict_batch(self, sequences, top_k=3):
+        """
+        sequences = array (N, 65, 243) o lista de N secuencias de 65 frames.
+        Llena cada batch del modelo con secuencias reales (con batch dinámico
+        el último se redimensiona a su tamaño real) y retorna un resultado
+        con el top-k por secuencia.
+        """
+        try:
+            seqs = np.asarray(sequences, dtype=np.float32).reshape(len(sequences), 65, -1)
 
-            seq = np.array(sequence_65_frames, dtype=np.float32)
-            logger.info(f"Shape antes de normalizar: {seq.shape}")
+            if self.use_tflite and isinstance(self.normalizer, dict):
+                batch_size = self.batch_size
+                results = []
+                for start in range(0, len(seqs), batch_size):
+                    chunk = seqs[start:start + batch_size]
+                    results.extend(self.interpreter_pool.infer(
+                        lambda view: self._normalize_into(chunk, view),
+                        lambda output: self.format_results(output[:len(chunk)], top_k),
+                        batch_size=len(chunk),
+                    ))
+                return results
 
-            # Normalizar manualmente usando mean y std
             if isinstance(self.normalizer, dict):
-                # El normalizer es un diccionario con 'mean' y 'std'
-                mean = self.normalizer['mean']
-                std = self.normalizer['std']
-                seq_reshaped = seq.reshape(65, -1)
-                seq_norm = (seq_reshaped - mean) / std
-                logger.info(f"Normalización manual con mean={mean:.4f}, std={std:.4f}")
+                seqs_norm = ((seqs - self.normalizer['mean']) / self.normalizer['std']).astype(np.float32)
             else:
-                # Fallback: usar .transform() si es un objeto sklearn
-                seq_norm = self.normalizer.transform(seq.reshape(65, -1))
-
-            logger.info(f"Shape después de normalizar: {seq_norm.shape}")
-
-            # Expandir a batch de 1
-            input_data = np.expand_dims(seq_norm, axis=0).astype(np.float32)
-            logger.info(f"Shape input antes de ajustar batch: {input_data.shape}")
-
-            # Predecir según el tipo de modelo
-            if self.use_tflite:
-                # TFLite: Verificar batch size esperado
-                expected_batch_size = self.input_details[0]['shape'][0]
-
-                if expected_batch_size > 1 and input_data.shape[0] == 1:
-                    # El modelo espera un batch size fijo mayor que 1
-                    # Repetir la secuencia para llenar el batch
-                    logger.warning(f"⚠️  Modelo espera batch_size={expected_batch_size}, ajustando...")
-                    input_data = np.repeat(input_data, expected_batch_size, axis=0)
-                    logger.info(f"Shape input después de ajustar batch: {input_data.shape}")
-
-                self.interpreter.set_tensor(self.input_details[0]["index"], input_data)
-                self.interpreter.invoke()
-                output_data = self.interpreter.get_tensor(self.output_details[0]["index"])
-
-                # Si repetimos la secuencia, tomar solo la primera predicción
-                if expected_batch_size > 1:
-                    output_data = output_data[0:1]
-                    logger.info(f"Tomando primera predicción del batch: {output_data.shape}")
-            else:
-                # Keras
-                output_data = self.model.predict(input_data, verbose=0)
-
-            # Output es (1, num_classes), aplanar
-            probabilities = output_data[0]
-            logger.info(f"Probabilidades shape: {probabilities.shape}")
-
-            # Top 3 predicciones
-            top_3_indices = np.argsort(probabilities)[-3:][::-1]
-            top_3_labels = self.label_encoder.inverse_transform(top_3_indices)
-            top_3_probs = probabilities[top_3_indices]
-
-            top_3 = [
-                {
-                    "gesto": label,
-                    "probabilidad": float(prob)
-                }
-                for label, prob in zip(top_3_labels, top_3_probs)
-            ]
-
-            # Mejor predicción
-            pred_index = np.argmax(probabilities)
-            pred_label = self.label_encoder.inverse_transform([pred_index])[0]
-            confidence = float(np.max(probabilities))
-
-            logger.info(f"✅ Predicción: {pred_label} (confianza: {confidence:.2f})")
-
-            return {
-                "gesto": pred_label,
-                "confianza": confidence,
-                "top_3": top_3
-            }
+                seqs_norm = self.normalizer.transform(
+                    seqs.reshape(-1, seqs.shape[-1])
+                ).reshape(seqs.shape).astype(np.float32)
+
+            if not self.use_tflite:
+                outputs = self.model.predict(seqs_norm, batch_size=self.batch_size, verbose=0)
+                return self.format_results(outputs, top_k)
+
+            batch_size = self.batch_size
+            outputs = []
+            for start in range(0, len(seqs_norm), batch_size):
+                chunk = seqs_norm[start:start + batch_size]
+                real = len(chunk)
+                if real < batch_size and not self.interpreter_pool.dynamic_batch:
+                    padding = np.zeros((batch_size - real,) + chunk.shape[1:], dtype=np.float32)
+                    chunk = np.concatenate((chunk, padding))
+
+                output_data = self.interpreter_pool.run(chunk)
+                outputs.append(output_data[:real])
+
+            return self.format_results(np.concatenate(outputs), top_k)
 
         except Exception as e:
-            logger.error(f"❌ Error en predicción: {e}", exc_info=True)
-            raise
\ No newline at end of file
+            logger.error(f"❌ Error en predicción por batch: {e}", exc_info=True)
+            raise
+
+    def format_result(self, probabilities, top_k=3):
+        """Gesto, confianza y top-k (clave 'top_<k>') a partir del vector de probabilidades"""
+        return self.format_results(np.asarray(probabilities)[np.newaxis], top_k)[0]
+
+    def format_results(self, outputs, top_k=3):
+        """
+        Igual que format_result para un batch de probabilidades (B, C), en una
+        sola pasada vectorizada: argpartition elige las k mayores de cada fila
+        sin ordenar las C clases, y solo esas k se ordenan.
+        """
+        with timed("top_k"):
+            return self._format_results(np.asarray(outputs), top_k)
+
+    def _format_results(self, outputs, top_k):
+        rows = np.arange(len(outputs))[:, np.newaxis]
+        num_classes = outputs.shape[1]
+        top_k = min(top_k, num_classes)
+
+        if top_k < num_classes:
+            top_indices = np.argpartition(outputs, num_classes - top_k, axis=1)[:, num_classes - top_k:]
+            # Empates en el corte: argpartition elige cualquiera de las clases empatadas.
+            # Esas filas (raras) usan el orden completo, que desempata por índice
+            cutoff = outputs[rows, top_indices].min(axis=1)
+            tied = np.count_nonzero(outputs >= cutoff[:, np.newaxis], axis=1) > top_k
+            if tied.any():
+                top_indices[tied] = np.argsort(-outputs[tied], axis=1, kind="stable")[:, :top_k]
+            top_indices = np.sort(top_indices, axis=1)
+        else:
+            top_indices = np.broadcast_to(np.arange(num_classes), outputs.shape)
+        # Ordenar las k elegidas de mayor a menor (empates por índice): la primera es la predicción
+        top_probs = outputs[rows, top_indices]
+        order = np.argsort(-top_probs, axis=1, kind="stable")
+        top_indices = top_indices[rows, order]
+        top_probs = top_probs[rows, order].tolist()
+
+        labels = self.labels
+        key = f"top_{top_k}"
+        results = []
+        for indices, probs in zip(top_indices.tolist(), top_probs):
+            top = [{"gesto": labels[index], "probabilidad": prob} for index, prob in zip(indices, probs)]
+            results.append({"gesto": top[0]["gesto"], "confianza": top[0]["probabilidad"], key: top})
+        return results
+
+
+# Instancia global (lazy loading para evitar que crashee todo si falla)
+_predictor = None
+_predictor_lock = threading.Lock()
+
+def get_predictor():
+    """Obtiene la instancia del predictor (lazy loading)"""
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                from django.conf import settings
+
+                logger.info("Inicializando GesturePredictor...")
+                try:
+                    _predictor = GesturePredictor(
+                        pool_size=getattr(settings, "GESTURE_INTERPRETER_POOL_SIZE", 1),
+                        num_threads=getattr(settings, "GESTURE_INTERPRETER_NUM_THREADS", None),
+                        max_batch_size=getattr(settings, "GESTURE_MAX_BATCH_SIZE", DEFAULT_MAX_BATCH_SIZE),
+                        variant=getattr(settings, "GESTURE_MODEL_VARIANT", "float32"),
+                        batch_sizes=getattr(settings, "GESTURE_INTERPRETER_BATCH_SIZES", None),
+                    )
+                    logger.info("✅ GesturePredictor inicializado exitosamente")
+                except Exception as e:
+                    logger.error(f"❌ Error inicializando GesturePredictor: {e}", exc_info=True)
+                    raise
+    return _predictor
+
+def is_predictor_loaded():
+    """True si el predictor ya fue inicializado (sin inicializarlo)"""
+    return _predictor is not None
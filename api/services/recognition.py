@@ -0,0 +1,69 @@
+"""
+Flujo de reconocimiento por frame, compartido por el endpoint HTTP
+/api/predict/ y el endpoint WebSocket /ws/predict/.
+"""
+import logging
+
+from .batching import predict_sequence
+from .buffer_backends import NUM_FRAMES
+from .metrics import observe_buffer_fill, timed
+from .sequence_buffer import add_landmarks, clear_buffer, get_buffer_size, get_sequence
+from .streaming import process_stream_frame
+
+logger = logging.getLogger(__name__)
+
+
+def waiting_response(session_id, buffer_size):
+    return {
+        'estado': f'esperando {NUM_FRAMES - buffer_size} frames más',
+        'session_id': session_id,
+        'frames_actuales': buffer_size,
+        'frames_requeridos': NUM_FRAMES
+    }
+
+
+def process_frame(session_id, landmarks, mode=None):
+    """
+    Agrega un frame de 243 valores al buffer de la sesión y, si corresponde,
+    predice. Retorna el cuerpo de la respuesta (progreso o predicción).
+    """
+    # Guardar frame en el buffer de la sesión
+    with timed("buffer_append"):
+        buffer_size = add_landmarks(landmarks, session_id)
+    observe_buffer_fill(buffer_size)
+
+    # Modo continuo: predicción cada N frames sobre la ventana deslizante
+    if mode == 'stream':
+        return process_stream_frame(session_id, buffer_size)
+
+    # Verificar si tenemos 65 frames
+    logger.debug("📦 Buffer size [%s]: %d/65 frames", session_id, buffer_size)
+
+    if buffer_size < NUM_FRAMES:
+        return waiting_response(session_id, buffer_size)
+
+    # Obtener secuencia completa
+    sequence = get_sequence(session_id)
+
+    if sequence is None:
+        # Otro request de la misma sesión vació el buffer entretanto
+        logger.warning("❌ No hay suficientes frames en buffer")
+        return waiting_response(session_id, get_buffer_size(session_id))
+
+    # Predecir con el modelo
+    logger.debug("🔮 Iniciando predicción...")
+    resultado = predict_sequence(sequence)
+
+    logger.debug("✅ Predicción exitosa: %s (confianza: %.2f)", resultado.get('gesto', 'N/A'), resultado.get('confianza', 0))
+
+    # Limpiar buffer después de predicción exitosa
+    clear_buffer(session_id)
+    logger.debug("🧹 Buffer limpiado")
+
+    return {
+        'estado': 'prediccion',
+        'session_id': session_id,
+        'gesto': resultado['gesto'],
+        'confianza': resultado['confianza'],
+        'top_3': resultado.get('top_3', [])
+    }
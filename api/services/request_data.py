@@ -0,0 +1,100 @@
+"""
+Validación del cuerpo de los requests de predicción, compartida por las
+vistas DRF (api.views) y las rutas livianas (api.lean_views).
+
+Cada función recibe el cuerpo ya parseado (dict) y retorna los datos listos
+para el modelo, o lanza InvalidRequest con el cuerpo de la respuesta 400.
+"""
+import logging
+
+import numpy as np
+from django.conf import settings
+
+from .buffer_backends import NUM_FEATURES, NUM_FRAMES
+from .extraction_pool import extract_keypoints
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidRequest(ValueError):
+
+    def __init__(self, message, **extra):
+        super().__init__(message)
+        self.body = {'error': message, **extra}
+
+
+def frame_landmarks(data, session_id):
+    """
+    Los 243 valores de un frame de /api/predict/: 'image' (archivo subido,
+    bytes o base64, pasa por MediaPipe), 'landmarks' directos o 'frames'
+    con un único frame (cuerpo binario)
+    """
+    if 'image' in data:
+        image = data['image']
+        if hasattr(image, 'read'):
+            logger.debug("🖼️ Procesando imagen subida (%d bytes)", image.size)
+            image = image.read()
+        else:
+            logger.debug("🖼️ Procesando imagen en base64")
+
+        # Extraer landmarks con MediaPipe (en el pool de procesos si está habilitado)
+        landmarks = extract_keypoints(image, session_id)
+        if landmarks is None:
+            logger.warning("❌ No se pudieron extraer landmarks de la imagen")
+            raise InvalidRequest('No se pudieron extraer landmarks de la imagen')
+
+        # El extractor siempre entrega un array (81, 3) = 243 valores
+        logger.debug("✅ Landmarks extraídos: %d valores", landmarks.size)
+        return landmarks
+
+    if 'landmarks' in data:
+        landmarks = data['landmarks']
+        if len(landmarks) != NUM_FEATURES:
+            logger.warning(f"❌ Landmarks incorrectos: {len(landmarks)} valores (esperado: {NUM_FEATURES})")
+            raise InvalidRequest(f'Se esperan {NUM_FEATURES} valores, se recibieron {len(landmarks)}')
+        logger.debug("✅ Landmarks recibidos: %d valores", len(landmarks))
+        return landmarks
+
+    if 'frames' in data:
+        frames = data['frames']
+        if len(frames) != 1:
+            logger.warning(f"❌ Se recibieron {len(frames)} frames en /api/predict/")
+            raise InvalidRequest(f'Se espera un frame, se recibieron {len(frames)} (usar /api/predict-frames/)')
+        return frame_landmarks({'landmarks': frames[0]}, session_id)
+
+    logger.warning("❌ No se proporcionó 'image' ni 'landmarks'")
+    raise InvalidRequest('Se requiere "image" o "landmarks"')
+
+
+def batch_sequences(data):
+    """Array (N, 65, 243) de /api/predict-batch/: 'sequences' (JSON) o 'frames' (binario, N × 65 frames)"""
+    sequences = data.get('sequences', data.get('frames'))
+    if sequences is None:
+        logger.warning("❌ No se proporcionaron secuencias")
+        raise InvalidRequest('Se requiere "sequences"')
+
+    try:
+        sequences = np.asarray(sequences, dtype=np.float32)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"❌ Secuencias inválidas: {e}")
+        raise InvalidRequest(f'Secuencias inválidas: {e}')
+
+    if sequences.ndim == 2 and sequences.shape[0] % NUM_FRAMES == 0:
+        sequences = sequences.reshape(-1, NUM_FRAMES, sequences.shape[1])
+    if sequences.ndim != 3 or sequences.shape[1:] != (NUM_FRAMES, NUM_FEATURES):
+        logger.warning(f"❌ Secuencias incorrectas: {sequences.shape}")
+        raise InvalidRequest(f'Secuencias incorrectas: {sequences.shape}', esperado='(N, 65, 243)')
+
+    max_sequences = getattr(settings, 'GESTURE_BATCH_MAX_SEQUENCES', 1024)
+    if len(sequences) > max_sequences:
+        raise InvalidRequest(f'Máximo {max_sequences} secuencias por request, se recibieron {len(sequences)}')
+    return sequences
+
+
+def top_k_from(value, num_classes, default=3):
+    """top_k pedido por el cliente, acotado a [1, num_classes]"""
+    try:
+        top_k = int(value or default)
+    except (TypeError, ValueError):
+        raise InvalidRequest(f'top_k inválido: {value}')
+    return max(1, min(top_k, num_classes))
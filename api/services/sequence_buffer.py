@@ -1,22 +1,69 @@
-from collections import deque
+import threading
 
-# Buffer global que guarda los últimos 65 frames
-sequence_buffer = deque(maxlen=65)
+from django.conf import settings
 
-def add_landmarks(landmarks):
-    """Agrega un frame de landmarks al buffer"""
-    sequence_buffer.append(landmarks)
+from .buffer_backends import (
+    NUM_FEATURES, NUM_FRAMES, BufferUnavailable, InProcessBackend, RedisBackend, SharedMemoryBackend
+)
 
-def get_sequence():
-    """Retorna la secuencia completa si hay 65 frames, None si no"""
-    if len(sequence_buffer) < 65:
-        return None
-    return list(sequence_buffer)
+DEFAULT_SESSION_ID = "default"
 
-def get_buffer_size():
-    """Retorna el tamaño actual del buffer"""
-    return len(sequence_buffer)
+# Backend global (uno por proceso; 'shared_memory' y 'redis' comparten los datos)
+_backend = None
+_backend_lock = threading.Lock()
 
-def clear_buffer():
-    """Limpia el buffer (útil para resetear)"""
-    sequence_buffer.clear()
\ No newline at end of file
+
+def create_buffer_backend(name=None):
+    """Crea el backend configurado en GESTURE_BUFFER_BACKEND (memory, shared_memory, redis)"""
+    name = name or getattr(settings, "GESTURE_BUFFER_BACKEND", "memory")
+    max_sessions = getattr(settings, "GESTURE_BUFFER_MAX_SESSIONS", 1000)
+    ttl = getattr(settings, "GESTURE_BUFFER_SESSION_TTL", 300)
+
+    if name == "memory":
+        return InProcessBackend(max_sessions=max_sessions, ttl=ttl)
+    if name == "shared_memory":
+        return SharedMemoryBackend(
+            name=getattr(settings, "GESTURE_BUFFER_SHM_NAME", "gesture_buffers"),
+            max_sessions=max_sessions,
+            ttl=ttl,
+        )
+    if name == "redis":
+        return RedisBackend(
+            url=getattr(settings, "GESTURE_BUFFER_REDIS_URL", "redis://localhost:6379/0"),
+            ttl=ttl,
+        )
+    raise ValueError(f"GESTURE_BUFFER_BACKEND desconocido: {name}")
+
+
+def get_buffer_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_buffer_backend()
+    return _backend
+
+
+def add_landmarks(landmarks, session_id=DEFAULT_SESSION_ID):
+    """Agrega un frame de landmarks al buffer de la sesión y retorna su tamaño"""
+    return get_buffer_backend().add_landmarks(session_id, landmarks)
+
+def get_sequence(session_id=DEFAULT_SESSION_ID):
+    """Retorna la secuencia (65, 243) si hay 65 frames, None si no"""
+    return get_buffer_backend().get_sequence(session_id)
+
+def get_window(session_id=DEFAULT_SESSION_ID):
+    """Retorna (ring, pos) con una copia del ring sin reordenar, None si faltan frames"""
+    return get_buffer_backend().get_window(session_id)
+
+def get_buffer_size(session_id=DEFAULT_SESSION_ID):
+    """Retorna el tamaño actual del buffer de la sesión"""
+    return get_buffer_backend().get_buffer_size(session_id)
+
+def clear_buffer(session_id=DEFAULT_SESSION_ID):
+    """Limpia el buffer de la sesión (útil para resetear)"""
+    get_buffer_backend().clear_buffer(session_id)
+
+def get_active_sessions():
+    """Retorna el número de sesiones con buffer vivo"""
+    return get_buffer_backend().active_sessions()
@@ -0,0 +1,192 @@
+"""
+Reconocimiento continuo (modo 'stream' de /api/predict/).
+
+En lugar de esperar 65 frames, predecir y vaciar el buffer, se predice cada
+`stride` frames sobre los últimos 65 del ring buffer, se suavizan las
+probabilidades con una media exponencial y se detecta el inicio y fin de
+cada gesto con dos umbrales (histéresis), de modo que cada gesto se reporta
+una sola vez aunque cruce el borde de una ventana.
+
+El estado de cada sesión vive en el proceso: con varios workers la sesión
+debe llegar siempre al mismo worker.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from .buffer_backends import NUM_FRAMES
+from .predictor import get_predictor
+from .sequence_buffer import get_window
+
+
+class StreamingRecognizer:
+    """
+    Estado de reconocimiento continuo de una sesión. Dos requests de la misma
+    sesión pueden llegar a la vez (threads de gunicorn, ASGI): el estado se
+    modifica solo bajo el lock del recognizer, y la inferencia queda afuera.
+    """
+
+    def __init__(self, stride=5, smoothing=0.5, on_threshold=0.6, off_threshold=0.4):
+        self.stride = max(1, stride)
+        self.smoothing = smoothing
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+
+        self.frames_until_prediction = 0
+        self.smoothed = None
+        self.active_index = None
+        self.last_access = time.monotonic()
+        self._lock = threading.Lock()
+
+    def frame_added(self):
+        """Registra un frame nuevo; retorna los frames que faltan para predecir (0: predecir en este)"""
+        with self._lock:
+            if self.frames_until_prediction > 0:
+                self.frames_until_prediction -= 1
+                return self.frames_until_prediction + 1
+            self.frames_until_prediction = self.stride - 1
+            return 0
+
+    def update(self, probabilities):
+        """
+        Suaviza las probabilidades y retorna (evento, índice del gesto, copia
+        de las probabilidades suavizadas): 'inicio' cuando un gesto supera
+        on_threshold, 'fin' cuando el gesto activo baja de off_threshold (o lo
+        reemplaza otro), evento None si no hay cambio.
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float32)
+        with self._lock:
+            event, index = self._update(probabilities)
+            return event, index, self.smoothed.copy()
+
+    def _update(self, probabilities):
+        if self.smoothed is None:
+            self.smoothed = probabilities.copy()
+        else:
+            self.smoothed *= 1.0 - self.smoothing
+            self.smoothed += self.smoothing * probabilities
+
+        best = int(np.argmax(self.smoothed))
+        confidence = float(self.smoothed[best])
+
+        if self.active_index is None:
+            if confidence >= self.on_threshold:
+                self.active_index = best
+                return "inicio", best
+            return None, None
+
+        if self.smoothed[self.active_index] < self.off_threshold or (
+            best != self.active_index and confidence >= self.on_threshold
+        ):
+            ended, self.active_index = self.active_index, None
+            return "fin", ended
+        return None, None
+
+    def reset(self):
+        with self._lock:
+            self.frames_until_prediction = 0
+            self.smoothed = None
+            self.active_index = None
+
+
+class StreamingSessions:
+    """Recognizers por sesión, acotados con LRU y TTL como los buffers"""
+
+    def __init__(self, max_sessions=1000, ttl=300, **recognizer_options):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.recognizer_options = recognizer_options
+        self._recognizers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            while self._recognizers:
+                oldest_id, oldest = next(iter(self._recognizers.items()))
+                if now - oldest.last_access < self.ttl:
+                    break
+                del self._recognizers[oldest_id]
+
+            recognizer = self._recognizers.get(session_id)
+            if recognizer is None:
+                if len(self._recognizers) >= self.max_sessions:
+                    self._recognizers.popitem(last=False)
+                recognizer = StreamingRecognizer(**self.recognizer_options)
+                self._recognizers[session_id] = recognizer
+            else:
+                self._recognizers.move_to_end(session_id)
+            recognizer.last_access = now
+            return recognizer
+
+    def discard(self, session_id):
+        with self._lock:
+            self._recognizers.pop(session_id, None)
+
+
+_sessions = None
+_sessions_lock = threading.Lock()
+
+
+def get_streaming_sessions():
+    global _sessions
+    if _sessions is None:
+        with _sessions_lock:
+            if _sessions is None:
+                _sessions = StreamingSessions(
+                    max_sessions=getattr(settings, "GESTURE_BUFFER_MAX_SESSIONS", 1000),
+                    ttl=getattr(settings, "GESTURE_BUFFER_SESSION_TTL", 300),
+                    stride=getattr(settings, "GESTURE_STREAM_STRIDE", 5),
+                    smoothing=getattr(settings, "GESTURE_STREAM_SMOOTHING", 0.5),
+                    on_threshold=getattr(settings, "GESTURE_STREAM_ON_THRESHOLD", 0.6),
+                    off_threshold=getattr(settings, "GESTURE_STREAM_OFF_THRESHOLD", 0.4),
+                )
+    return _sessions
+
+
+def process_stream_frame(session_id, buffer_size):
+    """
+    Avanza el reconocimiento continuo después de agregar un frame al buffer
+    de la sesión y retorna el cuerpo de la respuesta.
+    """
+    if buffer_size < NUM_FRAMES:
+        return {
+            'estado': f'esperando {NUM_FRAMES - buffer_size} frames más',
+            'session_id': session_id,
+            'frames_actuales': buffer_size,
+            'frames_requeridos': NUM_FRAMES,
+        }
+
+    recognizer = get_streaming_sessions().get(session_id)
+    remaining = recognizer.frame_added()
+    if remaining:
+        return {
+            'estado': 'streaming',
+            'session_id': session_id,
+            'frames_hasta_prediccion': remaining,
+        }
+
+    window = get_window(session_id)
+    if window is None:
+        # El buffer se vació o expiró entre el append y la lectura
+        recognizer.reset()
+        return {'estado': 'streaming', 'session_id': session_id, 'frames_actuales': 0}
+
+    predictor = get_predictor()
+    event, index, smoothed = recognizer.update(predictor.predict_window(*window))
+    resultado = predictor.format_result(smoothed)
+
+    return {
+        'estado': 'streaming',
+        'session_id': session_id,
+        'evento': {
+            'tipo': event,
+            'gesto': predictor.labels[index],
+        } if event else None,
+        'gesto': resultado['gesto'],
+        'confianza': resultado['confianza'],
+        'top_3': resultado['top_3'],
+    }
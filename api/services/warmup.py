@@ -0,0 +1,179 @@
+"""
+Carga anticipada y warm-up de los modelos.
+
+Sin esto, el primer request de cada worker paga la carga de TFLite, de los
+pickles y del grafo de MediaPipe. El arranque queda en dos fases:
+
+1. preload(): en el proceso maestro, antes del fork (AppConfig.ready con
+   gunicorn preload_app). Solo lee las clases y la normalización; los
+   workers las comparten copy-on-write (el modelo lo mapea TFLite con mmap
+   y se comparte vía el page cache). No crea threads ni intérpretes, así
+   que es seguro hacer fork después.
+2. warm_up(): en cada worker (post_fork de gunicorn, o al arrancar con
+   otros servidores). Crea los intérpretes, corre una inferencia de prueba
+   y, si corresponde, inicializa MediaPipe con un frame vacío.
+
+/api/ready/ responde 200 cuando el predictor de este worker está listo:
+con eso ya se sirven landmarks. MediaPipe se informa por separado y, si
+falla, las imágenes lo vuelven a inicializar en el primer request. Cada
+componente se reintenta con espera creciente (GESTURE_WARMUP_RETRIES) y,
+si aun así falla, /api/ready/ relanza el warm-up cada
+GESTURE_WARMUP_RETRY_INTERVAL segundos.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .buffer_backends import NUM_FEATURES, NUM_FRAMES
+
+logger = logging.getLogger(__name__)
+
+NOT_STARTED = "not_initialized"
+WARMING_UP = "warming_up"
+READY = "ready"
+ERROR = "error"
+DISABLED = "disabled"
+
+# Estado por componente: el predictor decide /api/ready/ (alcanza para servir
+# landmarks); MediaPipe solo hace falta para las imágenes y se informa aparte
+_components = {
+    "predictor": {"estado": NOT_STARTED, "error": None},
+    "mediapipe": {"estado": NOT_STARTED, "error": None},
+}
+_state = {"duracion_s": None, "ultimo_fallo": None}
+_state_lock = threading.Lock()
+_warm_up_lock = threading.Lock()  # un warm-up a la vez
+_warm_up_thread = None
+
+
+def preload():
+    """Carga los artefactos de solo lectura (seguro antes del fork)"""
+    from .predictor import load_artifacts
+
+    start = time.perf_counter()
+    load_artifacts()
+    logger.info(f"✅ Artefactos del modelo precargados en {time.perf_counter() - start:.2f} s")
+
+
+def _warm_up_predictor():
+    from .batching import predict_sequence
+
+    # Crea el predictor (y el scheduler si hay micro-batching) y ejercita el camino completo
+    predict_sequence(np.zeros((NUM_FRAMES, NUM_FEATURES), dtype=np.float32))
+
+
+def _warm_up_mediapipe():
+    from .extraction_pool import extraction_pool_enabled, get_extraction_pool
+    from .mediapipe_extractor import get_mediapipe_extractor
+
+    if extraction_pool_enabled():
+        get_extraction_pool().warm_up()
+        return
+
+    extractor = get_mediapipe_extractor()
+    # La instancia de la sesión de warm-up se recicla para la primera sesión real
+    extractor.extract_keypoints(np.zeros((240, 320, 3), dtype=np.uint8), session_id="warm-up")
+    extractor.end_session("warm-up")
+
+
+def _set(name, **values):
+    with _state_lock:
+        _components[name].update(values)
+
+
+def _warm_up_component(name, func):
+    """func() con hasta GESTURE_WARMUP_RETRIES intentos y espera creciente entre ellos"""
+    with _state_lock:
+        if _components[name]["estado"] == READY:
+            return True
+        _components[name].update(estado=WARMING_UP, error=None)
+
+    retries = max(1, getattr(settings, "GESTURE_WARMUP_RETRIES", 3))
+    delay = 1
+    for attempt in range(1, retries + 1):
+        try:
+            func()
+        except Exception as e:
+            logger.error(f"❌ Error en el warm-up de {name} (intento {attempt}/{retries}): {e}",
+                         exc_info=attempt == retries)
+            if attempt < retries:
+                time.sleep(delay)
+                delay *= 2
+                continue
+            with _state_lock:
+                _components[name].update(estado=ERROR, error=str(e))
+                _state["ultimo_fallo"] = time.monotonic()
+            return False
+        _set(name, estado=READY, error=None)
+        return True
+
+
+def warm_up():
+    """Inicializa en este proceso lo que todavía no está listo: predictor y MediaPipe"""
+    if not _warm_up_lock.acquire(blocking=False):
+        return
+    try:
+        start = time.perf_counter()
+        predictor_ready = _warm_up_component("predictor", _warm_up_predictor)
+
+        if getattr(settings, "GESTURE_WARMUP_MEDIAPIPE", True):
+            _warm_up_component("mediapipe", _warm_up_mediapipe)
+        else:
+            _set("mediapipe", estado=DISABLED)
+
+        elapsed = time.perf_counter() - start
+        if predictor_ready:
+            with _state_lock:
+                if _state["duracion_s"] is None:
+                    _state["duracion_s"] = round(elapsed, 3)
+            logger.info(f"🔥 Warm-up completo en {elapsed:.2f} s")
+    finally:
+        _warm_up_lock.release()
+
+
+def start_warm_up():
+    """Lanza warm_up() en un thread para no demorar el arranque del worker"""
+    global _warm_up_thread
+    with _state_lock:
+        if _warm_up_thread is not None and _warm_up_thread.is_alive():
+            return
+        _warm_up_thread = threading.Thread(target=warm_up, name="gesture-warm-up", daemon=True)
+    _warm_up_thread.start()
+
+
+def retry_failed_warm_up():
+    """
+    Relanza el warm-up de los componentes que fallaron, como mucho cada
+    GESTURE_WARMUP_RETRY_INTERVAL segundos (lo llama /api/ready/)
+    """
+    interval = getattr(settings, "GESTURE_WARMUP_RETRY_INTERVAL", 30)
+    with _state_lock:
+        failed = any(component["estado"] == ERROR for component in _components.values())
+        due = _state["ultimo_fallo"] is not None and time.monotonic() - _state["ultimo_fallo"] >= interval
+    if failed and due:
+        logger.info("🔁 Reintentando el warm-up")
+        start_warm_up()
+
+
+def warm_up_status():
+    """
+    Estado del warm-up de este worker: 'estado' y 'error' son los del
+    predictor (sin warm-up, 'ready' una vez cargado) y 'mediapipe' el de la
+    extracción de imágenes
+    """
+    from .predictor import is_predictor_loaded
+
+    with _state_lock:
+        predictor = dict(_components["predictor"])
+        mediapipe = dict(_components["mediapipe"])
+        duration = _state["duracion_s"]
+    if predictor["estado"] == NOT_STARTED and is_predictor_loaded():
+        predictor["estado"] = READY
+    return {**predictor, "duracion_s": duration, "mediapipe": mediapipe}
+
+
+def is_ready():
+    return warm_up_status()["estado"] == READY
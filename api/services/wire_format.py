@@ -0,0 +1,113 @@
+"""
+Formato binario compacto para frames y secuencias de landmarks.
+
+Cabecera de 16 bytes (little-endian) seguida de los valores:
+
+    magic        4s   b'LMK1'
+    dtype        B    0 = float32, 1 = float16, 2 = int16 cuantizado
+    reservado    B
+    num_frames   H
+    num_features H    243 para los landmarks de MediaPipe
+    reservado    H
+    scale        f    solo int16: valor = int16 * scale
+
+LMK1 admite hasta 65535 frames (1008 secuencias de 65). Para cuerpos más
+grandes (p. ej. un predict-batch de GESTURE_BATCH_MAX_SEQUENCES=1024) la
+versión 2 usa num_frames de 32 bits, con la cabecera también de 16 bytes:
+
+    magic        4s   b'LMK2'
+    dtype        B
+    reservado    B
+    num_features H
+    num_frames   I
+    scale        f
+
+encode_landmarks escribe LMK1 mientras alcance y decode_landmarks lee ambas.
+
+Una secuencia de 65 × 243 ocupa 63 KB en float32 (31.6 KB en float16/int16)
+contra ~300 KB en JSON, y se decodifica con np.frombuffer sin crear floats
+de Python.
+"""
+import struct
+
+import numpy as np
+
+MAGIC = b"LMK1"
+HEADER = struct.Struct("<4sBBHHHf")
+MAGIC_V2 = b"LMK2"
+HEADER_V2 = struct.Struct("<4sBBHIf")
+HEADER_SIZE = HEADER.size
+MAGICS = (MAGIC, MAGIC_V2)
+
+MAX_FRAMES_V1 = 0xFFFF
+MAX_FRAMES = 0xFFFFFFFF
+
+FLOAT32 = 0
+FLOAT16 = 1
+INT16 = 2
+
+DTYPES = {
+    FLOAT32: np.dtype("<f4"),
+    FLOAT16: np.dtype("<f2"),
+    INT16: np.dtype("<i2"),
+}
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def encode_landmarks(frames, dtype=FLOAT32):
+    """Codifica un array (N, F) o (F,) en el formato binario"""
+    frames = np.asarray(frames, dtype=np.float32)
+    if frames.ndim == 1:
+        frames = frames[np.newaxis]
+    num_frames, num_features = frames.shape
+    if num_frames > MAX_FRAMES:
+        raise WireFormatError(f"Máximo {MAX_FRAMES} frames por cuerpo, se recibieron {num_frames}")
+
+    scale = 0.0
+    if dtype == INT16:
+        peak = float(np.abs(frames).max()) if frames.size else 0.0
+        scale = peak / 32767 if peak > 0 else 1.0
+        payload = np.round(frames / scale).astype(DTYPES[INT16])
+    else:
+        payload = frames.astype(DTYPES[dtype])
+
+    if num_frames > MAX_FRAMES_V1:
+        header = HEADER_V2.pack(MAGIC_V2, dtype, 0, num_features, num_frames, scale)
+    else:
+        header = HEADER.pack(MAGIC, dtype, 0, num_frames, num_features, 0, scale)
+    return header + payload.tobytes()
+
+
+def decode_landmarks(body):
+    """Decodifica el formato binario a un array float32 (num_frames, num_features)"""
+    if len(body) < HEADER_SIZE:
+        raise WireFormatError(f"Cuerpo de {len(body)} bytes, la cabecera ocupa {HEADER_SIZE}")
+
+    magic = bytes(body[:4])
+    if magic == MAGIC:
+        _, dtype, _, num_frames, num_features, _, scale = HEADER.unpack_from(body)
+    elif magic == MAGIC_V2:
+        _, dtype, _, num_features, num_frames, scale = HEADER_V2.unpack_from(body)
+    else:
+        raise WireFormatError("Cabecera inválida: se esperaba LMK1 o LMK2")
+    if dtype not in DTYPES:
+        raise WireFormatError(f"Tipo de dato desconocido: {dtype}")
+
+    count = num_frames * num_features
+    expected = HEADER_SIZE + count * DTYPES[dtype].itemsize
+    if len(body) != expected:
+        raise WireFormatError(
+            f"Se esperaban {expected} bytes para {num_frames}×{num_features}, se recibieron {len(body)}"
+        )
+
+    values = np.frombuffer(body, dtype=DTYPES[dtype], count=count, offset=HEADER_SIZE)
+    if dtype == FLOAT32:
+        frames = values
+    elif dtype == FLOAT16:
+        frames = values.astype(np.float32)
+    else:
+        frames = np.multiply(values, scale, dtype=np.float32)
+    return frames.reshape(num_frames, num_features)
@@ -1,3 +1,816 @@
-from django.test import TestCase
+import io
+import os
+import sys
+import threading
+import time
+import types
+import unittest
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .lean_views import RequestTooLarge, parse_body
+from .parsers import LandmarksBinaryParser
+from .services import admission, json_codec
+from .services.admission import Overloaded, admit_frame
+from .services.batching import BatchScheduler, BatchSchedulerError
+from .services.buffer_backends import (
+    NUM_FEATURES, NUM_FRAMES, BufferUnavailable, InProcessBackend, RedisBackend, SharedMemoryBackend
+)
+from .services.extraction_pool import ExtractionPool
+from .services.interpreter_pool import InterpreterPool
+from .services.streaming import StreamingRecognizer
+from .services.predictor import GesturePredictor, get_predictor
+from .services.keypoint_cache import RedisKeypointCache, image_key
+from .services.mediapipe_extractor import tracking_sessions_for_budget
+from .services.wire_format import (
+    FLOAT16, MAGIC, MAGIC_V2, MAX_FRAMES_V1, WireFormatError, decode_landmarks, encode_landmarks
+)
+
+try:
+    import fakeredis
+except ImportError:  # opcional: pip install fakeredis
+    fakeredis = None
+
+
+def _connection_refused(*args, **kwargs):
+    import redis
+    raise redis.ConnectionError("Connection refused")
+
+
+class DownRedis:
+    """Cliente de Redis caído: cada comando falla; los pipelines fallan en execute()"""
+
+    def __getattr__(self, name):
+        return _connection_refused
+
+    def pipeline(self, transaction=True):
+        return DownPipeline()
+
+
+class DownPipeline:
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    execute = staticmethod(_connection_refused)
+
+
+class BufferBackendConformance:
+    """
+    Comportamiento común de los backends de buffers por sesión. Cada
+    subclase define make_backend(max_sessions) para su backend.
+    """
+
+    supports_max_sessions = True
+
+    def make_backend(self, max_sessions=100):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.backend = self.make_backend()
+        self.frames = np.random.default_rng(0).random((NUM_FRAMES + 10, NUM_FEATURES), dtype=np.float32)
+
+    def fill(self, session_id, frames, backend=None):
+        backend = backend or self.backend
+        for frame in frames:
+            size = backend.add_landmarks(session_id, frame)
+        return size
+
+    def test_new_session_is_empty(self):
+        self.assertEqual(self.backend.get_buffer_size("a"), 0)
+        self.assertIsNone(self.backend.get_sequence("a"))
+        self.assertIsNone(self.backend.get_window("a"))
+
+    def test_no_sequence_before_65_frames(self):
+        size = self.fill("a", self.frames[:NUM_FRAMES - 1])
+        self.assertEqual(size, NUM_FRAMES - 1)
+        self.assertEqual(self.backend.get_buffer_size("a"), NUM_FRAMES - 1)
+        self.assertIsNone(self.backend.get_sequence("a"))
+
+    def test_sequence_in_order(self):
+        self.fill("a", self.frames[:NUM_FRAMES - 1])
+        # También acepta listas de floats
+        size = self.backend.add_landmarks("a", self.frames[NUM_FRAMES - 1].tolist())
+        self.assertEqual(size, NUM_FRAMES)
+
+        sequence = self.backend.get_sequence("a")
+        self.assertEqual(sequence.shape, (NUM_FRAMES, NUM_FEATURES))
+        self.assertEqual(sequence.dtype, np.float32)
+        np.testing.assert_array_equal(sequence, self.frames[:NUM_FRAMES])
+
+    def test_wrap_around_keeps_last_65_frames(self):
+        size = self.fill("a", self.frames)
+        self.assertEqual(size, NUM_FRAMES)
+        np.testing.assert_array_equal(self.backend.get_sequence("a"), self.frames[10:])
+
+        ring, pos = self.backend.get_window("a")
+        np.testing.assert_array_equal(np.concatenate((ring[pos:], ring[:pos])), self.frames[10:])
+
+    def test_window_is_a_snapshot(self):
+        self.fill("a", self.frames[:NUM_FRAMES])
+        ring, pos = self.backend.get_window("a")
+        self.backend.add_landmarks("a", self.frames[NUM_FRAMES])
+        np.testing.assert_array_equal(np.concatenate((ring[pos:], ring[:pos])), self.frames[:NUM_FRAMES])
+
+    def test_clear_buffer(self):
+        self.fill("a", self.frames)
+        self.backend.clear_buffer("a")
+        self.assertEqual(self.backend.get_buffer_size("a"), 0)
+        self.assertIsNone(self.backend.get_sequence("a"))
+
+        self.fill("a", self.frames[:NUM_FRAMES])
+        np.testing.assert_array_equal(self.backend.get_sequence("a"), self.frames[:NUM_FRAMES])
+
+    def test_sessions_are_isolated(self):
+        self.fill("a", self.frames[:NUM_FRAMES])
+        self.fill("b", self.frames[NUM_FRAMES:])
+        self.assertEqual(self.backend.get_buffer_size("a"), NUM_FRAMES)
+        self.assertEqual(self.backend.get_buffer_size("b"), 10)
+        self.assertGreaterEqual(self.backend.active_sessions(), 2)
+
+        self.backend.clear_buffer("b")
+        np.testing.assert_array_equal(self.backend.get_sequence("a"), self.frames[:NUM_FRAMES])
+
+    def test_max_sessions_evicts_least_recently_used(self):
+        if not self.supports_max_sessions:
+            self.skipTest("el backend no limita sesiones (expiran por TTL)")
+        backend = self.make_backend(max_sessions=2)
+        self.fill("a", self.frames[:3], backend)
+        self.fill("b", self.frames[:2], backend)
+        backend.get_buffer_size("a")  # 'a' pasa a ser la más reciente
+        self.fill("c", self.frames[:1], backend)
+
+        self.assertEqual(backend.get_buffer_size("a"), 3)
+        self.assertEqual(backend.get_buffer_size("b"), 0)
+        self.assertEqual(backend.get_buffer_size("c"), 1)
+        self.assertEqual(backend.active_sessions(), 2)
+
+    def test_rejects_wrong_frame_size(self):
+        with self.assertRaises(ValueError):
+            self.backend.add_landmarks("a", self.frames[0][:100])
+
+
+class InProcessBackendTests(BufferBackendConformance, TestCase):
+
+    def make_backend(self, max_sessions=100):
+        return InProcessBackend(max_sessions=max_sessions, ttl=300)
+
+
+class SharedMemoryBackendTests(BufferBackendConformance, TestCase):
+
+    def make_backend(self, max_sessions=100):
+        # Un segmento por backend: cada test arranca con la tabla vacía
+        name = f"gesture_buffers_test_{os.getpid()}_{len(self._segments)}"
+        backend = SharedMemoryBackend(name=name, max_sessions=max_sessions, ttl=300)
+        self._segments.append(backend)
+        return backend
+
+    def setUp(self):
+        self._segments = []
+        super().setUp()
+
+    def tearDown(self):
+        for backend in self._segments:
+            backend.close()
+            backend.unlink()
+
+    def test_reopening_with_another_configuration_fails(self):
+        backend = self.make_backend(max_sessions=4)
+        # Mismo tamaño total no basta: la cabecera guarda max_sessions
+        with self.assertRaises(ValueError):
+            SharedMemoryBackend(name=backend.name, max_sessions=2)
+
+        reopened = SharedMemoryBackend(name=backend.name, max_sessions=4)
+        backend.add_landmarks("a", np.ones(NUM_FEATURES))
+        self.assertEqual(reopened.get_buffer_size("a"), 1)
+        reopened.close()
+
+
+@unittest.skipIf(fakeredis is None, "requiere fakeredis")
+class RedisBackendTests(BufferBackendConformance, TestCase):
+
+    supports_max_sessions = False
+
+    def make_backend(self, max_sessions=100):
+        return RedisBackend(client=self.client, prefix=f"test{os.getpid()}:", ttl=300)
+
+    def setUp(self):
+        self.client = fakeredis.FakeRedis()
+        self.client.flushall()
+        super().setUp()
+
+    def test_clear_buffer_removes_session(self):
+        self.fill("a", self.frames[:3])
+        self.fill("b", self.frames[:3])
+        self.backend.clear_buffer("a")
+        self.assertEqual(self.backend.active_sessions(), 1)
+
+    def test_writes_prune_expired_sessions(self):
+        backend = RedisBackend(client=self.client, prefix="prune:", ttl=300)
+        self.client.zadd(backend._sessions_key, {"vieja": 1.0})
+        backend.add_landmarks("a", self.frames[0])
+        self.assertEqual(self.client.zrange(backend._sessions_key, 0, -1), [b"a"])
+
+    def test_redis_errors_raise_buffer_unavailable(self):
+        backend = RedisBackend(client=DownRedis())
+        for call in (lambda: backend.add_landmarks("a", self.frames[0]), lambda: backend.get_sequence("a"),
+                     lambda: backend.get_buffer_size("a"), lambda: backend.clear_buffer("a"),
+                     backend.active_sessions):
+            with self.assertRaises(BufferUnavailable):
+                call()
+
+
+class HolisticBudgetTests(TestCase):
+
+    def test_budget_reserves_the_static_instance(self):
+        self.assertEqual(tracking_sessions_for_budget(8, 450), 2)
+        self.assertEqual(tracking_sessions_for_budget(1, 450), 1)
+        self.assertEqual(tracking_sessions_for_budget(8, 299), 0)
+        self.assertEqual(tracking_sessions_for_budget(8, None), 8)
+
+
+@unittest.skipIf(fakeredis is None, "requiere fakeredis")
+class RedisKeypointCacheTests(TestCase):
+
+    def setUp(self):
+        self.client = fakeredis.FakeRedis()
+        self.client.flushall()
+        self.cache = RedisKeypointCache(client=self.client, ttl=60)
+        self.keypoints = np.random.default_rng(0).random((81, 3), dtype=np.float32)
+
+    def test_hit_and_miss_counters(self):
+        key = image_key(b"frame")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.set(key, self.keypoints)
+        np.testing.assert_array_equal(self.cache.get(key), self.keypoints)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["aciertos"], stats["fallos"], stats["entradas"]), (1, 1, 1))
+
+    def test_set_prunes_expired_entries(self):
+        self.client.zadd(self.cache._entries_key, {"vieja": 1.0})
+        self.cache.set(image_key(b"frame"), self.keypoints)
+        self.assertEqual(self.client.zcard(self.cache._entries_key), 1)
+
+    def test_redis_errors_fail_open(self):
+        cache = RedisKeypointCache(client=DownRedis())
+        with self.assertLogs("api.services.keypoint_cache", "WARNING"):
+            self.assertIsNone(cache.get(image_key(b"frame")))
+            cache.set(image_key(b"frame"), self.keypoints)
+
+
+@override_settings(
+    GESTURE_ADMISSION_ENABLED=True, GESTURE_DEGRADE_IMAGES=True, GESTURE_ADMISSION_QUEUE_TIMEOUT=0.2,
+    GESTURE_ADMISSION_LIMITS={"predict_image": (1, 1), "predict_landmarks": (4, 4)},
+)
+class FrameAdmissionTests(TestCase):
+
+    def setUp(self):
+        admission._controllers.clear()
+        self.addCleanup(admission._controllers.clear)
+        self.image = admission.get_controller("predict_image")
+
+    def test_image_waits_for_its_turn_instead_of_degrading(self):
+        self.image.acquire()
+        served = []
+
+        def frame():
+            with admit_frame({"image": "...", "landmarks": [0.0] * NUM_FEATURES}) as data:
+                served.append(data)
+
+        thread = threading.Thread(target=frame)
+        thread.start()
+        while not self.image.stats()["en_cola"]:
+            time.sleep(0.01)
+        self.image.release()
+        thread.join()
+        self.assertIn("image", served[0])
+
+    def test_degrades_when_the_queue_is_full(self):
+        self.image.acquire()
+        self.image.max_queue = 0
+        self.addCleanup(self.image.release)
+
+        with admit_frame({"image": "...", "landmarks": [0.0] * NUM_FEATURES}) as data:
+            self.assertNotIn("image", data)
+        with self.assertRaises(Overloaded) as raised:
+            with admit_frame({"image": "..."}):
+                pass
+        self.assertEqual(raised.exception.status_code, 429)
+        self.assertTrue(raised.exception.body["degradado"])
+
+    def test_degrades_when_the_wait_times_out(self):
+        self.image.acquire()
+        self.addCleanup(self.image.release)
+
+        with self.assertRaises(Overloaded) as raised:
+            with admit_frame({"image": "..."}):
+                pass
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertTrue(raised.exception.body["degradado"])
+
+
+class ExtractionPoolRoutingTests(TestCase):
+
+    def make_pool(self, tracking):
+        # Los procesos se crean recién con el primer submit: acá no arranca ninguno
+        pool = ExtractionPool(3, extractor_options={"tracking": tracking})
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def test_static_frames_go_to_the_least_loaded_process(self):
+        pool = self.make_pool(tracking=True)
+        pool._pending_by_worker = [2, 0, 1]
+        self.assertEqual(pool._worker_for("default"), 1)
+        self.assertEqual(pool._worker_for(None), 1)
+
+    def test_tracking_sessions_keep_their_process(self):
+        pool = self.make_pool(tracking=True)
+        index = pool._worker_for("persona-1")
+        pool._pending_by_worker[index] = 10
+        self.assertEqual(pool._worker_for("persona-1"), index)
+
+    def test_without_tracking_every_session_is_balanced(self):
+        pool = self.make_pool(tracking=False)
+        pool._pending_by_worker = [1, 1, 0]
+        self.assertEqual(pool._worker_for("persona-1"), 2)
+
+
+class WireFormatTests(TestCase):
+
+    def test_small_bodies_keep_lmk1(self):
+        frames = np.random.default_rng(0).random((NUM_FRAMES, NUM_FEATURES), dtype=np.float32)
+        body = encode_landmarks(frames)
+        self.assertEqual(body[:4], MAGIC)
+        np.testing.assert_array_equal(decode_landmarks(body), frames)
+
+    def test_more_than_65535_frames_use_lmk2(self):
+        # GESTURE_BATCH_MAX_SEQUENCES=1024 secuencias son 66560 frames: no caben en el uint16 de LMK1
+        frames = np.random.default_rng(0).random((1024 * NUM_FRAMES, NUM_FEATURES), dtype=np.float32)
+        body = encode_landmarks(frames, FLOAT16)
+        self.assertEqual(body[:4], MAGIC_V2)
+        decoded = decode_landmarks(body)
+        self.assertEqual(decoded.shape, frames.shape)
+        np.testing.assert_allclose(decoded, frames, atol=1e-3)
+
+    def test_boundary_and_truncated_body(self):
+        frames = np.zeros((MAX_FRAMES_V1 + 1, 3), dtype=np.float32)
+        body = encode_landmarks(frames)
+        self.assertEqual(decode_landmarks(body).shape, frames.shape)
+        with self.assertRaises(WireFormatError):
+            decode_landmarks(body[:-1])
+
+
+class SingleFrameBinaryTests(TestCase):
+    """Un cuerpo binario de un frame llega como 'frames' y cada vista decide qué hacer"""
+
+    def setUp(self):
+        self.frame = np.random.default_rng(0).random((1, NUM_FEATURES), dtype=np.float32)
+        self.body = encode_landmarks(self.frame)
+
+    def test_parsers_keep_the_frames_key(self):
+        parsed = LandmarksBinaryParser().parse(io.BytesIO(self.body))
+        np.testing.assert_array_equal(parsed["frames"], self.frame)
+
+        request = RequestFactory().post("/api/fast/predict/", self.body, content_type="application/x-landmarks")
+        self.assertEqual(list(parse_body(request)), ["frames"])
+
+    def test_predict_takes_the_single_frame(self):
+        response = APIClient().post(
+            "/api/predict/", self.body, content_type="application/x-landmarks", HTTP_X_SESSION_ID="un-frame"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["frames_actuales"], 1)
+
+        body = encode_landmarks(np.zeros((2, NUM_FEATURES), dtype=np.float32))
+        response = APIClient().post("/api/predict/", body, content_type="application/x-landmarks")
+        self.assertEqual(response.status_code, 400)
+
+
+
+class FakeBatchPredictor:
+    """predict_batch que responde el primer valor de cada secuencia y registra el tamaño de cada batch"""
+
+    batch_size = 4
+
+    def __init__(self, release=None):
+        self.batches = []
+        self.release = release
+
+    def predict_batch(self, sequences):
+        if self.release is not None:
+            self.release.wait()
+        self.batches.append(len(sequences))
+        return [{"id": float(sequence[0, 0])} for sequence in sequences]
+
+
+class BatchSchedulerTests(TestCase):
+
+    def sequence(self, value):
+        return np.full((NUM_FRAMES, NUM_FEATURES), value, dtype=np.float32)
+
+    def test_each_caller_gets_its_own_row(self):
+        release = threading.Event()
+        predictor = FakeBatchPredictor(release)
+        scheduler = BatchScheduler(predictor, max_latency_ms=200)
+        futures = [scheduler.submit(self.sequence(value)) for value in range(10)]
+        release.set()
+
+        self.assertEqual([future.result(timeout=5)["id"] for future in futures], list(range(10)))
+        self.assertLessEqual(max(predictor.batches), 4)
+        self.assertEqual(sum(predictor.batches), 10)
+
+    def test_max_latency_flushes_a_partial_batch(self):
+        predictor = FakeBatchPredictor()
+        scheduler = BatchScheduler(predictor, max_latency_ms=20)
+        start = time.monotonic()
+        self.assertEqual(scheduler.predict(self.sequence(7), timeout=5)["id"], 7)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(predictor.batches, [1])
+
+    def test_stalled_predictor_times_out(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        scheduler = BatchScheduler(FakeBatchPredictor(release), max_latency_ms=1, invoke_timeout=0.1)
+        with self.assertRaises(BatchSchedulerError):
+            scheduler.predict(self.sequence(1))
+
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "ml", "modelo.tflite")
+
+try:
+    import tflite_runtime  # noqa: F401
+except ImportError:
+    tflite_runtime = None
+
+
+class FakeInterpreter:
+    """Intérprete con batch dinámico (shape_signature[0] == -1) que registra cada resize"""
+
+    def __init__(self, model_path=None, num_threads=None):
+        self.resizes = []
+
+    def allocate_tensors(self):
+        pass
+
+    def get_input_details(self):
+        return [{"index": 0, "shape": np.array([1, NUM_FRAMES, NUM_FEATURES]),
+                 "shape_signature": np.array([-1, NUM_FRAMES, NUM_FEATURES])}]
+
+    def get_output_details(self):
+        return [{"index": 1, "shape": np.array([1, 21])}]
+
+    def resize_tensor_input(self, index, shape):
+        self.resizes.append(shape[0])
+
+
+@unittest.skipIf(tflite_runtime is None, "requiere tflite_runtime")
+class InterpreterPoolTests(TestCase):
+
+    def batch(self, seed):
+        return np.random.default_rng(seed).random((16, NUM_FRAMES, NUM_FEATURES), dtype=np.float32)
+
+    def test_concurrent_clients_get_their_own_outputs(self):
+        pool = InterpreterPool(MODEL_PATH, size=3)
+        inputs = [self.batch(seed) for seed in range(4)]
+        expected = [pool.run(batch).copy() for batch in inputs]
+        outputs = [[] for _ in inputs]
+
+        def client(i):
+            for _ in range(5):
+                outputs[i].append(pool.run(inputs[i]).copy())
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(len(inputs))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i, results in enumerate(outputs):
+            self.assertEqual(len(results), 5)
+            for result in results:
+                np.testing.assert_allclose(result, expected[i], rtol=1e-5, atol=1e-6)
+
+    def test_borrowed_interpreters_are_exclusive(self):
+        pool = InterpreterPool(MODEL_PATH, size=2)
+        in_use, peak, errors = set(), [0], []
+        lock = threading.Lock()
+
+        def borrower():
+            for _ in range(20):
+                with pool.checkout(timeout=5) as interpreter:
+                    with lock:
+                        if id(interpreter) in in_use:
+                            errors.append(id(interpreter))
+                        in_use.add(id(interpreter))
+                        peak[0] = max(peak[0], len(in_use))
+                    time.sleep(0.001)
+                    with lock:
+                        in_use.discard(id(interpreter))
+
+        threads = [threading.Thread(target=borrower) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(peak[0], 2)
+        self.assertEqual(pool.available(), 2)
+
+
+class InterpreterPoolResizeTests(TestCase):
+
+    def make_pool(self, **kwargs):
+        fake = types.ModuleType("tflite_runtime.interpreter")
+        fake.Interpreter = FakeInterpreter
+        package = types.ModuleType("tflite_runtime")
+        package.interpreter = fake
+        with mock.patch.dict(sys.modules, {"tflite_runtime": package, "tflite_runtime.interpreter": fake}):
+            return InterpreterPool("modelo.tflite", **kwargs)
+
+    def test_ensure_batch_resizes_only_when_the_batch_changes(self):
+        pool = self.make_pool(size=1)
+        self.assertTrue(pool.dynamic_batch)
+        with pool.checkout() as interpreter:
+            for batch_size in (3, 3, 5, 5, 1, 1):
+                pool._ensure_batch(interpreter, batch_size)
+            self.assertEqual(interpreter.resizes, [3, 5, 1])
+
+    def test_presized_batches_skip_the_resize(self):
+        pool = self.make_pool(size=2, batch_sizes=(16,))
+        with pool.checkout(batch_size=16) as interpreter:
+            self.assertEqual(interpreter.resizes, [16])
+            pool._ensure_batch(interpreter, 16)
+            self.assertEqual(interpreter.resizes, [16])
+        self.assertEqual(pool.available(), 4)
+
+
+@unittest.skipIf(tflite_runtime is None, "requiere tflite_runtime")
+class ZeroCopyPredictionTests(TestCase):
+    """El fast path (normalización en el tensor de entrada) da las mismas probabilidades que el camino con copias"""
+
+    def setUp(self):
+        self.predictor = get_predictor()
+        if not (self.predictor.use_tflite and isinstance(self.predictor.normalizer, dict)):
+            self.skipTest("el fast path requiere TFLite y normalizer como dict")
+        self.rng = np.random.default_rng(0)
+        # Probabilidades crudas en lugar del top-k formateado
+        self.enterContext(mock.patch.object(self.predictor, "format_result", lambda p, top_k=3: np.array(p)))
+        self.enterContext(mock.patch.object(self.predictor, "format_results", lambda p, top_k=3: list(np.array(p))))
+
+    def sequences(self, count):
+        return self.rng.normal(size=(count, NUM_FRAMES, NUM_FEATURES)).astype(np.float32)
+
+    def test_single_sequence(self):
+        for sequence in self.sequences(3):
+            np.testing.assert_allclose(
+                self.predictor._predict_zero_copy(sequence),
+                self.predictor._probabilities_with_copies(sequence),
+                rtol=1e-5, atol=1e-6,
+            )
+
+    def test_batches_not_multiple_of_the_model_batch(self):
+        for count in (1, 5, 17):
+            sequences = self.sequences(count)
+            expected = np.stack([self.predictor._probabilities_with_copies(sequence) for sequence in sequences])
+            outputs = np.stack(self.predictor.predict_batch(sequences))
+            self.assertEqual(outputs.shape, expected.shape)
+            np.testing.assert_allclose(outputs, expected, rtol=1e-5, atol=1e-6)
+
+
+@unittest.skipIf(tflite_runtime is None, "requiere tflite_runtime")
+class PredictBatchTests(TestCase):
+
+    def setUp(self):
+        self.predictor = get_predictor()
+        self.client = APIClient()
+        self.rng = np.random.default_rng(0)
+
+    def sequences(self, count):
+        return self.rng.normal(size=(count, NUM_FRAMES, NUM_FEATURES)).astype(np.float32)
+
+    def test_chunks_fill_the_model_batch(self):
+        sequences = self.sequences(self.predictor.batch_size + 1)
+        with mock.patch.object(
+            self.predictor.interpreter_pool, "infer", wraps=self.predictor.interpreter_pool.infer
+        ) as infer:
+            results = self.predictor.predict_batch(sequences)
+        self.assertEqual([call.kwargs["batch_size"] for call in infer.call_args_list], [self.predictor.batch_size, 1])
+        self.assertEqual(len(results), len(sequences))
+
+    def test_partial_batch_ignores_the_unused_rows(self):
+        # Las filas que sobran del batch fijo conservan la invocación anterior: no deben influir
+        last = self.sequences(1)
+        alone = self.predictor.predict_batch(last)
+        self.predictor.predict_batch(self.sequences(self.predictor.batch_size))
+        self.assertEqual(self.predictor.predict_batch(last), alone)
+        self.assertEqual(self.predictor.predict_batch(np.concatenate([self.sequences(self.predictor.batch_size), last]))[-1], alone[0])
+
+    def test_json_response(self):
+        response = self.client.post(
+            "/api/predict-batch/?top_k=5", {"sequences": self.sequences(3).tolist()}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["estado"], body["total"]), ("prediccion", 3))
+        self.assertEqual([len(result["top_5"]) for result in body["resultados"]], [5, 5, 5])
+
+    def test_binary_frames_are_split_into_sequences(self):
+        body = encode_landmarks(self.sequences(2).reshape(-1, NUM_FEATURES))
+        response = self.client.post("/api/predict-batch/", body, content_type="application/x-landmarks")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], 2)
+
+    def test_validation_errors(self):
+        cases = [
+            {},
+            {"sequences": np.zeros((2, NUM_FRAMES - 1, NUM_FEATURES)).tolist()},
+            {"sequences": np.zeros((1, NUM_FRAMES, NUM_FEATURES - 1)).tolist()},
+            {"sequences": [[1, 2], [3]]},
+            {"sequences": np.zeros((1, NUM_FRAMES, NUM_FEATURES)).tolist(), "top_k": "muchos"},
+        ]
+        for data in cases:
+            response = self.client.post("/api/predict-batch/", data, format="json")
+            self.assertEqual(response.status_code, 400, data.keys())
+            self.assertIn("error", response.json())
+
+    @override_settings(GESTURE_BATCH_MAX_SEQUENCES=2)
+    def test_more_than_max_sequences(self):
+        response = self.client.post(
+            "/api/predict-batch/", {"sequences": np.zeros((3, NUM_FRAMES, NUM_FEATURES)).tolist()}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Máximo 2", response.json()["error"])
+
+
+class TopKTests(TestCase):
+    """format_results (argpartition) frente al orden completo con argsort"""
+
+    def setUp(self):
+        # Solo se usan las etiquetas: sin cargar el modelo
+        self.predictor = GesturePredictor.__new__(GesturePredictor)
+        self.predictor.labels = [f"gesto_{i}" for i in range(21)]
+        rng = np.random.default_rng(0)
+        self.outputs = rng.random((64, 21), dtype=np.float32)
+        # Redondeadas a un decimal: casi todas las filas tienen empates, también en el corte del top-k
+        self.tied = np.round(self.outputs, 1)
+
+    def expected(self, outputs, top_k):
+        order = np.argsort(-outputs, axis=1, kind="stable")[:, :top_k]
+        return [[self.predictor.labels[i] for i in row] for row in order.tolist()]
+
+    def test_same_labels_and_order_as_argsort(self):
+        for outputs in (self.outputs, self.tied):
+            for top_k in (1, 3, 5, 20, 21, 30):
+                results = self.predictor.format_results(outputs, top_k)
+                key = f"top_{min(top_k, 21)}"
+                labels = [[entry["gesto"] for entry in result[key]] for result in results]
+                self.assertEqual(labels, self.expected(outputs, top_k), (top_k, outputs is self.tied))
+                self.assertEqual([result["gesto"] for result in results], [row[0] for row in labels])
+
+    def test_single_row(self):
+        result = self.predictor.format_result(self.tied[0], top_k=3)
+        self.assertEqual([entry["gesto"] for entry in result["top_3"]], self.expected(self.tied[:1], 3)[0])
+        self.assertEqual(result["confianza"], result["top_3"][0]["probabilidad"])
+
+
+class StreamingRecognizerTests(TestCase):
+
+    def probabilities(self, **by_index):
+        probabilities = np.zeros(4, dtype=np.float32)
+        for index, value in by_index.items():
+            probabilities[int(index[1:])] = value
+        return probabilities
+
+    def test_hysteresis_reports_each_gesture_once(self):
+        recognizer = StreamingRecognizer(smoothing=1.0, on_threshold=0.6, off_threshold=0.4)
+        events = [recognizer.update(self.probabilities(**values))[:2] for values in (
+            {"g1": 0.5},   # bajo on_threshold
+            {"g1": 0.7},   # inicio
+            {"g1": 0.5},   # entre umbrales: sigue activo
+            {"g1": 0.3},   # fin
+            {"g1": 0.5},   # entre umbrales sin gesto activo: nada
+        )]
+        self.assertEqual(events, [(None, None), ("inicio", 1), (None, None), ("fin", 1), (None, None)])
+
+    def test_another_gesture_ends_the_active_one(self):
+        recognizer = StreamingRecognizer(smoothing=1.0)
+        self.assertEqual(recognizer.update(self.probabilities(g1=0.9))[:2], ("inicio", 1))
+        self.assertEqual(recognizer.update(self.probabilities(g1=0.3, g2=0.7))[:2], ("fin", 1))
+        self.assertEqual(recognizer.update(self.probabilities(g2=0.7))[:2], ("inicio", 2))
+
+    def test_smoothing_and_returned_copy(self):
+        recognizer = StreamingRecognizer(smoothing=0.5)
+        recognizer.update(self.probabilities(g0=1.0))
+        _, _, smoothed = recognizer.update(self.probabilities(g1=1.0))
+        np.testing.assert_allclose(smoothed, [0.5, 0.5, 0.0, 0.0])
+        recognizer.update(self.probabilities(g2=1.0))
+        np.testing.assert_allclose(smoothed, [0.5, 0.5, 0.0, 0.0])
+
+    def test_stride(self):
+        recognizer = StreamingRecognizer(stride=3)
+        self.assertEqual([recognizer.frame_added() for _ in range(7)], [0, 2, 1, 0, 2, 1, 0])
+        recognizer.reset()
+        self.assertEqual(recognizer.frame_added(), 0)
+        self.assertEqual([StreamingRecognizer(stride=0).frame_added() for _ in range(2)], [0, 0])
+
+    def test_concurrent_frames_predict_once_per_stride(self):
+        recognizer = StreamingRecognizer(stride=5, smoothing=0.1)
+        predictions = []
+
+        def client():
+            for _ in range(200):
+                if recognizer.frame_added() == 0:
+                    predictions.append(recognizer.update(self.probabilities(g0=1.0)))
+
+        threads = [threading.Thread(target=client) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(predictions), 800 // 5)
+        self.assertEqual([event for event, _, _ in predictions].count("inicio"), 1)
+
+
+def wsgi_post(path, body, content_type, session_id="tests"):
+    """POST en proceso contra drf.wsgi.application (incluye las rutas livianas); retorna (status, json)"""
+    import json
+    from drf.wsgi import application
+
+    environ = {
+        "REQUEST_METHOD": "POST", "PATH_INFO": path, "QUERY_STRING": "", "SCRIPT_NAME": "",
+        "SERVER_NAME": "testserver", "SERVER_PORT": "80", "HTTP_HOST": "testserver",
+        "CONTENT_TYPE": content_type, "CONTENT_LENGTH": str(len(body)), "HTTP_X_SESSION_ID": session_id,
+        "wsgi.input": io.BytesIO(body), "wsgi.url_scheme": "http", "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False, "wsgi.multiprocess": False, "wsgi.run_once": False,
+    }
+    status = []
+    response = application(environ, lambda code, headers, exc_info=None: status.append(int(code.split()[0])))
+    try:
+        content = b"".join(response)
+    finally:
+        getattr(response, "close", lambda: None)()
+    return status[0], json.loads(content)
+
+
+class LeanRoutesTests(TestCase):
+
+    def setUp(self):
+        from drf.lean import lean_prefix
+        self.prefix = lean_prefix()
+        self.frame = np.random.default_rng(0).random(NUM_FEATURES, dtype=np.float32)
+        self.bodies = {
+            "json": (json_codec.dumps({"landmarks": self.frame.tolist()}), "application/json"),
+            "binario": (encode_landmarks(self.frame), "application/x-landmarks"),
+        }
+
+    def test_same_status_and_keys_as_drf(self):
+        # Menos de 65 frames por sesión: ninguna ruta llega a invocar el modelo
+        for name, (body, content_type) in self.bodies.items():
+            drf = wsgi_post("/api/predict/", body, content_type, f"drf-{name}")
+            lean = wsgi_post(f"{self.prefix}predict/", body, content_type, f"lean-{name}")
+            self.assertEqual(drf[0], 200, name)
+            self.assertEqual(lean[0], drf[0], name)
+            self.assertEqual(lean[1].keys(), drf[1].keys(), name)
+
+        body = json_codec.dumps({"otra": 1})
+        for path in ("predict/", "predict-frames/", "predict-batch/"):
+            drf = wsgi_post(f"/api/{path}", body, "application/json")
+            lean = wsgi_post(f"{self.prefix}{path}", body, "application/json")
+            self.assertEqual((lean[0], lean[1].keys()), (drf[0], drf[1].keys()), path)
+
+    def test_json_and_binary_bodies(self):
+        responses = [
+            wsgi_post(f"{self.prefix}predict/", body, content_type, f"lean-cuerpo-{name}")
+            for name, (body, content_type) in self.bodies.items()
+        ]
+        self.assertEqual([status for status, _ in responses], [200, 200])
+        self.assertEqual([payload["frames_actuales"] for _, payload in responses], [1, 1])
+
+        for body, content_type in (
+            (b"{no es json", "application/json"),
+            (b"[1, 2, 3]", "application/json"),
+            (self.bodies["binario"][0][:-1], "application/x-landmarks"),
+        ):
+            status, payload = wsgi_post(f"{self.prefix}predict/", body, content_type)
+            self.assertEqual(status, 400, body[:12])
+            self.assertIn("error", payload)
+
+    def test_body_over_the_limit_is_413(self):
+        for name, (body, content_type) in self.bodies.items():
+            with override_settings(GESTURE_LEAN_MAX_BODY_BYTES=len(body) - 1):
+                status, payload = wsgi_post(f"{self.prefix}predict/", body, content_type)
+                self.assertEqual(status, 413, name)
+                self.assertIn("error", payload)
+            with override_settings(GESTURE_LEAN_MAX_BODY_BYTES=len(body)):
+                self.assertEqual(wsgi_post(f"{self.prefix}predict/", body, content_type, f"lean-limite-{name}")[0], 200)
+
+    def test_parse_body_checks_what_it_reads(self):
+        # Sin Content-Length (chunked) el tope se aplica al leer
+        request = RequestFactory().post(f"{self.prefix}predict/", b"x" * 2048, content_type="application/json")
+        del request.META["CONTENT_LENGTH"]
+        with override_settings(GESTURE_LEAN_MAX_BODY_BYTES=1024):
+            with self.assertRaises(RequestTooLarge):
+                parse_body(request)
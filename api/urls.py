@@ -1,8 +1,13 @@
 from django.urls import path
-from .views import PredictGestureAPI, GesturePredictView, health_check
+from .views import PredictGestureAPI, PredictBatchAPI, PredictClipAPI, GesturePredictView, health_check, readiness_check, metrics_view
 
 urlpatterns = [
     path('health/', health_check, name='health'),  # ✅ Health check endpoint
+    path('ready/', readiness_check, name='ready'),  # Readiness: 200 después del warm-up
+    path('metrics', metrics_view, name='metrics'),  # Métricas de Prometheus (texto)
+    path('metrics/', metrics_view),
     path('predict/', GesturePredictView.as_view(), name='predict'),  # ✅ Endpoint nuevo con MediaPipe
     path('predict-frames/', PredictGestureAPI.as_view(), name='predict-frames'),  # Endpoint anterior
+    path('predict-batch/', PredictBatchAPI.as_view(), name='predict-batch'),  # N secuencias por request
+    path('predict-clip/', PredictClipAPI.as_view(), name='predict-clip'),  # Clip completo: imágenes o video
 ]
\ No newline at end of file
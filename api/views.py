@@ -1,54 +1,131 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ParseError
 from rest_framework.decorators import api_view
+from django.conf import settings
+from django.http import HttpResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from .services.predictor import GesturePredictor
-from .services.sequence_buffer import add_landmarks, get_buffer_size, get_sequence, clear_buffer
-from .services.mediapipe_extractor import get_mediapipe_extractor
+from .services.predictor import get_predictor
+from .services.batching import get_batching_stats, predict_sequence
+from .services.executor import get_executor_stats
+from .services.recognition import process_frame
+from .services.clips import ClipError, iter_image_frames, iter_video_frames, predict_clip, video_path
+from .services.sequence_buffer import DEFAULT_SESSION_ID, BufferUnavailable, get_active_sessions, get_buffer_size
+from .services.extraction_pool import ExtractionBusy, ExtractionTimeout, get_extraction_stats
+from .services.keypoint_cache import get_keypoint_cache_stats
+from .services.admission import Overloaded, admit, admit_frame, get_admission_stats
+from .services.request_data import InvalidRequest, batch_sequences, frame_landmarks, top_k_from
+from .services.warmup import retry_failed_warm_up, warm_up_status
+from .services import metrics
 import logging
+import os
+import random
+import time
 
 logger = logging.getLogger(__name__)
+# Una línea de resumen por request (ver InstrumentedAPIView)
+request_logger = logging.getLogger("api.requests")
 
-# Lazy loading del predictor para evitar que crashee todo si falla
-_predictor = None
+# Campos de la respuesta que van en la línea de resumen
+SUMMARY_FIELDS = ('session_id', 'estado', 'gesto', 'confianza', 'total', 'error')
 
-def get_predictor():
-    """Obtiene la instancia del predictor (lazy loading)"""
-    global _predictor
-    if _predictor is None:
-        logger.info("Inicializando GesturePredictor...")
-        try:
-            _predictor = GesturePredictor()
-            logger.info("✅ GesturePredictor inicializado exitosamente")
-        except Exception as e:
-            logger.error(f"❌ Error inicializando GesturePredictor: {e}", exc_info=True)
-            raise
-    return _predictor
+
+def get_session_id(request):
+    """Identificador de sesión del cliente: campo 'session_id' o header X-Session-ID"""
+    session_id = request.data.get('session_id') or request.headers.get('X-Session-ID')
+    if not session_id:
+        return DEFAULT_SESSION_ID
+    return str(session_id)[:128]
+
+
+def parse_body(request):
+    """request.data, midiendo el parseo (DRF lo hace recién al primer acceso)"""
+    with metrics.timed("request_parse"):
+        return request.data
+
+
+def overloaded_response(e):
+    """429/503 del control de admisión, con Retry-After"""
+    return Response(e.body, status=e.status_code, headers={'Retry-After': str(e.retry_after)})
+
+
+def log_request_summary(endpoint, status_code, elapsed, data):
+    """
+    Una línea key=value por request en INFO (los detalles van en DEBUG).
+    Los 2xx se muestrean con GESTURE_LOG_SUMMARY_SAMPLE; los errores siempre.
+    """
+    if not request_logger.isEnabledFor(logging.INFO):
+        return
+    if status_code < 400 and random.random() >= getattr(settings, 'GESTURE_LOG_SUMMARY_SAMPLE', 1.0):
+        return
+
+    fields = [f"endpoint={endpoint}", f"status={status_code}", f"duracion_ms={elapsed * 1000:.1f}"]
+    if isinstance(data, dict):
+        for name in SUMMARY_FIELDS:
+            value = data.get(name)
+            if value is None:
+                continue
+            if isinstance(value, float):
+                value = f"{value:.3f}"
+            elif isinstance(value, str) and (' ' in value or not value):
+                value = '"' + value.replace('"', "'") + '"'
+            fields.append(f"{name}={value}")
+    level = logging.WARNING if status_code >= 500 else logging.INFO
+    request_logger.log(level, " ".join(fields))
+
+
+class InstrumentedAPIView(APIView):
+    """
+    APIView que registra la latencia total y el status de cada request en
+    /api/metrics, y escribe la línea de resumen del request
+    """
+
+    metrics_endpoint = None
+
+    def dispatch(self, request, *args, **kwargs):
+        start = time.perf_counter()
+        response = super().dispatch(request, *args, **kwargs)
+        # Renderizar acá (Django lo haría después) para incluir la serialización
+        with metrics.timed("response"):
+            response.render()
+        elapsed = time.perf_counter() - start
+        metrics.observe_request(self.metrics_endpoint, response.status_code, elapsed)
+        log_request_summary(self.metrics_endpoint, response.status_code, elapsed, getattr(response, 'data', None))
+        return response
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class PredictGestureAPI(APIView):
+class PredictGestureAPI(InstrumentedAPIView):
     """Endpoint que recibe frames directamente (método anterior)"""
 
+    metrics_endpoint = "predict_frames"
+
     def post(self, request):
         try:
-            logger.info("📥 POST /api/predict-frames/ - Recibiendo request")
-            frames = request.data.get("frames", None)
+            logger.debug("📥 POST /api/predict-frames/ - Recibiendo request")
+            with admit("predict_frames"):
+                frames = parse_body(request).get("frames", None)
 
-            if frames is None:
-                logger.warning("❌ No se proporcionaron frames")
-                return Response({"error": "No frames provided"}, status=status.HTTP_400_BAD_REQUEST)
+                if frames is None:
+                    logger.warning("❌ No se proporcionaron frames")
+                    return Response({"error": "No frames provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-            logger.info(f"✅ Frames recibidos: {len(frames)}")
+                logger.debug("✅ Frames recibidos: %d", len(frames))
 
-            predictor = get_predictor()
-            result = predictor.predict(frames)
+                result = predict_sequence(frames)
 
-            logger.info(f"✅ Predicción exitosa: {result.get('gesto', 'N/A')}")
+            logger.debug("✅ Predicción exitosa: %s", result.get('gesto', 'N/A'))
             return Response(result, status=status.HTTP_200_OK)
 
+        except ParseError as e:
+            logger.warning(f"❌ Cuerpo inválido: {e.detail}")
+            return Response({'error': str(e.detail)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Overloaded as e:
+            return overloaded_response(e)
+
         except Exception as e:
             logger.error(f"❌ Error en PredictGestureAPI: {e}", exc_info=True)
             return Response(
@@ -58,97 +135,81 @@ class PredictGestureAPI(APIView):
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class GesturePredictView(APIView):
-    """Endpoint que recibe imagen en base64 y usa MediaPipe (NUEVO)"""
+class PredictBatchAPI(InstrumentedAPIView):
+    """Endpoint que recibe N secuencias de 65 frames y las predice por batches"""
+
+    metrics_endpoint = "predict_batch"
 
     def post(self, request):
         try:
-            logger.info("📥 POST /api/predict/ - Recibiendo request")
-            data = request.data
+            logger.debug("📥 POST /api/predict-batch/ - Recibiendo request")
+            with admit("predict_batch"):
+                data = parse_body(request)
 
-            # OPCIÓN 1: Recibir imagen en base64
-            if 'image' in data:
-                logger.info("🖼️ Procesando imagen en base64")
-                image_base64 = data['image']
+                # JSON: {"sequences": [...]}; binario: N × 65 frames consecutivos
+                sequences = batch_sequences(data)
 
-                # Extraer landmarks con MediaPipe
-                extractor = get_mediapipe_extractor()
-                landmarks = extractor.extract_keypoints_from_base64(image_base64)
+                predictor = get_predictor()
+                top_k = top_k_from(data.get('top_k') or request.query_params.get('top_k'), len(predictor.classes))
 
-                if landmarks is None:
-                    logger.warning("❌ No se pudieron extraer landmarks de la imagen")
-                    return Response(
-                        {'error': 'No se pudieron extraer landmarks de la imagen'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+                logger.debug("✅ Secuencias recibidas: %d (top_k=%d)", len(sequences), top_k)
+                resultados = predictor.predict_batch(sequences, top_k=top_k)
 
-                # Verificar que tenemos 243 valores (81 puntos × 3)
-                if len(landmarks) != 243:
-                    logger.warning(f"❌ Landmarks incorrectos: {len(landmarks)} valores (esperado: 243)")
-                    return Response(
-                        {
-                            'error': f'Landmarks incorrectos: {len(landmarks)} valores',
-                            'esperado': 243
-                        },
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                logger.info(f"✅ Landmarks extraídos: {len(landmarks)} valores")
+            return Response({
+                'estado': 'prediccion',
+                'total': len(resultados),
+                'resultados': resultados
+            }, status=status.HTTP_200_OK)
 
-            # OPCIÓN 2: Recibir landmarks directamente
-            elif 'landmarks' in data:
-                logger.info("📊 Recibiendo landmarks directamente")
-                landmarks = data['landmarks']
+        except ParseError as e:
+            logger.warning(f"❌ Cuerpo inválido: {e.detail}")
+            return Response({'error': str(e.detail)}, status=status.HTTP_400_BAD_REQUEST)
 
-                if len(landmarks) != 243:
-                    logger.warning(f"❌ Landmarks incorrectos: {len(landmarks)} valores (esperado: 243)")
+        except InvalidRequest as e:
+            return Response(e.body, status=status.HTTP_400_BAD_REQUEST)
+
+        except Overloaded as e:
+            return overloaded_response(e)
+
+        except Exception as e:
+            logger.error(f"❌ Error en PredictBatchAPI: {e}", exc_info=True)
+            return Response(
+                {'error': str(e), 'detail': 'Error al procesar la predicción'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class PredictClipAPI(InstrumentedAPIView):
+    """Endpoint que recibe un clip completo: varias imágenes (multipart) o un video"""
+
+    metrics_endpoint = "predict_clip"
+
+    def post(self, request):
+        path, temporary = None, False
+        try:
+            logger.debug("📥 POST /api/predict-clip/ - Recibiendo request")
+            with admit("predict_clip"):
+                parse_body(request)
+                images = request.FILES.getlist('frames')
+                video = request.FILES.get('video')
+
+                if images:
+                    logger.debug("🖼️ Clip de %d imágenes", len(images))
+                    frames = iter_image_frames(images)
+                elif video is not None:
+                    logger.debug("🎞️ Clip de video (%d bytes)", video.size)
+                    path, temporary = video_path(video)
+                    frames = iter_video_frames(path)
+                else:
+                    logger.warning("❌ No se proporcionó 'frames' ni 'video'")
                     return Response(
-                        {
-                            'error': f'Se esperan 243 valores, se recibieron {len(landmarks)}'
-                        },
+                        {'error': 'Se requieren archivos "frames" (imágenes) o un archivo "video" (multipart/form-data)'},
                         status=status.HTTP_400_BAD_REQUEST
                     )
-                logger.info(f"✅ Landmarks recibidos: {len(landmarks)} valores")
-            else:
-                logger.warning("❌ No se proporcionó 'image' ni 'landmarks'")
-                return Response(
-                    {'error': 'Se requiere "image" o "landmarks"'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Guardar frame en el buffer
-            add_landmarks(landmarks)
-
-            # Verificar si tenemos 65 frames
-            buffer_size = get_buffer_size()
-            logger.info(f"📦 Buffer size: {buffer_size}/65 frames")
-
-            if buffer_size < 65:
-                return Response({
-                    'estado': f'esperando {65 - buffer_size} frames más',
-                    'frames_actuales': buffer_size,
-                    'frames_requeridos': 65
-                })
-
-            # Obtener secuencia completa
-            sequence = get_sequence()
-
-            if sequence is None:
-                logger.warning("❌ No hay suficientes frames en buffer")
-                return Response(
-                    {'error': 'No hay suficientes frames en buffer'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Predecir con el modelo
-            logger.info("🔮 Iniciando predicción...")
-            predictor = get_predictor()
-            resultado = predictor.predict(sequence)
-
-            logger.info(f"✅ Predicción exitosa: {resultado.get('gesto', 'N/A')} (confianza: {resultado.get('confianza', 0):.2f})")
-
-            # Limpiar buffer después de predicción exitosa
-            clear_buffer()
-            logger.info("🧹 Buffer limpiado")
+
+                resultado = predict_clip(frames)
+            logger.debug("✅ Predicción exitosa: %s", resultado.get('gesto', 'N/A'))
 
             return Response({
                 'estado': 'prediccion',
@@ -157,6 +218,92 @@ class GesturePredictView(APIView):
                 'top_3': resultado.get('top_3', [])
             }, status=status.HTTP_200_OK)
 
+        except ClipError as e:
+            logger.warning(f"❌ Clip inválido: {e}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except ParseError as e:
+            logger.warning(f"❌ Cuerpo inválido: {e.detail}")
+            return Response({'error': str(e.detail)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Overloaded as e:
+            return overloaded_response(e)
+
+        except ExtractionBusy as e:
+            logger.warning(f"⏳ {e}")
+            return Response(
+                {'error': str(e), 'reintentar_en': e.retry_after},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(e.retry_after)}
+            )
+
+        except ExtractionTimeout as e:
+            logger.warning(f"⏳ {e}")
+            return Response({'error': str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+
+        except Exception as e:
+            logger.error(f"❌ Error en PredictClipAPI: {e}", exc_info=True)
+            return Response(
+                {'error': str(e), 'detail': 'Error al procesar la predicción'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        finally:
+            if temporary:
+                os.remove(path)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class GesturePredictView(InstrumentedAPIView):
+    """Endpoint que recibe imagen (base64 o archivo multipart) y usa MediaPipe (NUEVO)"""
+
+    metrics_endpoint = "predict"
+
+    def post(self, request):
+        try:
+            logger.debug("📥 POST /api/predict/ - Recibiendo request")
+            data = parse_body(request)
+            session_id = get_session_id(request)
+
+            # Imágenes y landmarks se admiten por separado (en modo degradado, solo landmarks)
+            with admit_frame(data) as data:
+                # Imagen en base64 o como archivo (multipart/form-data), o landmarks directos
+                landmarks = frame_landmarks(data, session_id)
+
+                mode = data.get('mode') or request.query_params.get('mode')
+                resultado = process_frame(session_id, landmarks, mode)
+            return Response(resultado, status=status.HTTP_200_OK)
+
+        except ParseError as e:
+            logger.warning(f"❌ Cuerpo inválido: {e.detail}")
+            return Response({'error': str(e.detail)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except InvalidRequest as e:
+            return Response(e.body, status=status.HTTP_400_BAD_REQUEST)
+
+        except Overloaded as e:
+            return overloaded_response(e)
+
+        except ExtractionBusy as e:
+            logger.warning(f"⏳ {e}")
+            return Response(
+                {'error': str(e), 'reintentar_en': e.retry_after},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(e.retry_after)}
+            )
+
+        except ExtractionTimeout as e:
+            logger.warning(f"⏳ {e}")
+            return Response({'error': str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+
+        except BufferUnavailable as e:
+            logger.error(f"❌ {e}")
+            return Response(
+                {'error': str(e), 'reintentar_en': e.retry_after},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(e.retry_after)}
+            )
+
         except Exception as e:
             logger.error(f"❌ Error en GesturePredictView: {e}", exc_info=True)
             return Response(
@@ -172,30 +319,41 @@ def health_check(request):
     Endpoint de health check para verificar que el servidor está funcionando
     """
     try:
-        logger.info("💚 GET /api/health/ - Health check")
+        logger.debug("💚 GET /api/health/ - Health check")
 
-        # Verificar estado del predictor (sin inicializarlo si no está listo)
-        predictor_status = "not_initialized"
-        if _predictor is not None:
-            predictor_status = "ready"
+        # Estado del predictor y de MediaPipe (sin inicializarlos si no están listos): 'ready' tras el warm-up
+        warm_up = warm_up_status()
+        predictor_status = warm_up["estado"]
 
-        # Verificar buffer
+        # Verificar buffers
         buffer_size = get_buffer_size()
+        active_sessions = get_active_sessions()
 
         response_data = {
             "status": "healthy",
             "service": "Django REST Framework - Gesture Recognition API",
             "version": "1.4",
             "predictor": predictor_status,
+            "mediapipe": warm_up["mediapipe"]["estado"],
             "buffer_size": buffer_size,
+            "sesiones_activas": active_sessions,
+            "batching": get_batching_stats(),
+            "executor": get_executor_stats(),
+            "admision": get_admission_stats(),
+            "extraccion": get_extraction_stats(),
+            "cache_keypoints": get_keypoint_cache_stats(),
             "endpoints": {
                 "predict": "/api/predict/",
                 "predict_frames": "/api/predict-frames/",
-                "health": "/api/health/"
+                "predict_batch": "/api/predict-batch/",
+                "predict_clip": "/api/predict-clip/",
+                "health": "/api/health/",
+                "ready": "/api/ready/",
+                "metrics": "/api/metrics"
             }
         }
 
-        logger.info(f"✅ Health check OK - Predictor: {predictor_status}")
+        logger.debug("✅ Health check OK - Predictor: %s", predictor_status)
         return Response(response_data, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -206,4 +364,51 @@ def health_check(request):
                 "error": str(e)
             },
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+@api_view(['GET'])
+@csrf_exempt
+def readiness_check(request):
+    """
+    Readiness: 200 cuando el predictor de este worker está listo (modelo e
+    intérpretes cargados, inferencia de prueba hecha), aunque MediaPipe no
+    lo esté: los landmarks ya se pueden servir. 503 mientras tanto.
+    """
+    state = warm_up_status()
+    if state["estado"] == "ready":
+        return Response(state, status=status.HTTP_200_OK)
+    retry_failed_warm_up()
+    return Response(state, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+
+
+def metrics_view(request):
+    """
+    Métricas de este worker en formato de texto de Prometheus. Vista de
+    Django sin DRF: el scrape no pasa por la negociación de contenido.
+    """
+    if not metrics.metrics_enabled():
+        raise Http404("Métricas deshabilitadas (GESTURE_METRICS=False)")
+
+    extraction = get_extraction_stats() or {}
+    cache = get_keypoint_cache_stats() or {}
+    batching = get_batching_stats() or {}
+    executor = get_executor_stats() or {}
+    warm_up = warm_up_status()
+    try:
+        sessions = get_active_sessions()
+    except BufferUnavailable:
+        sessions = None
+    for endpoint, stats in (get_admission_stats() or {}).items():
+        metrics.ADMISSION_IN_FLIGHT.set(stats["en_curso"], endpoint)
+        metrics.ADMISSION_QUEUE.set(stats["en_cola"], endpoint)
+    body = metrics.render([
+        ("gesture_ready", "1 si el predictor de este worker terminó el warm-up", int(warm_up["estado"] == "ready")),
+        ("gesture_mediapipe_ready", "1 si MediaPipe terminó el warm-up", int(warm_up["mediapipe"]["estado"] == "ready")),
+        ("gesture_buffer_sessions", "Sesiones con frames en el buffer", sessions),
+        ("gesture_extraction_pending", "Extracciones pendientes en el pool de procesos", extraction.get("pendientes")),
+        ("gesture_keypoint_cache_entries", "Entradas en la caché de keypoints", cache.get("entradas")),
+        ("gesture_batching_queue", "Secuencias esperando en el micro-batching", batching.get("en_cola")),
+        ("gesture_executor_in_flight", "Llamadas de las vistas async en el executor", executor.get("en_vuelo")),
+        ("gesture_executor_queue", "Llamadas de las vistas async esperando un thread", executor.get("en_cola")),
+    ])
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
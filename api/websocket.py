@@ -0,0 +1,134 @@
+"""
+Endpoint WebSocket /ws/predict/ (ASGI, servido desde drf/asgi.py).
+
+Una conexión por persona: cada mensaje es un frame y no paga el parseo HTTP,
+DRF ni el middleware. Mensajes aceptados:
+
+- binario: 243 float32 little-endian (972 bytes) = landmarks de un frame,
+  o un frame en el formato de services.wire_format (float32/float16/int16)
+- texto JSON: {"landmarks": [...243 valores]} o {"image": "<base64>"}
+
+Parámetros de la URL: ?session_id=...&mode=stream (opcionales). Por cada
+frame se responde con el mismo JSON que /api/predict/ (progreso o predicción).
+La extracción y la inferencia corren fuera del event loop, en el executor
+acotado de services.executor, y cada frame pasa por el mismo control de
+admisión que /api/predict/ (services.admission).
+"""
+import json
+import logging
+import uuid
+from urllib.parse import parse_qs
+
+import numpy as np
+from .services.admission import Overloaded, admit_frame_async
+from .services.buffer_backends import FRAME_BYTES, NUM_FEATURES
+from .services.executor import run_blocking
+from .services.extraction_pool import ExtractionBusy, ExtractionTimeout, end_extraction_session, extract_keypoints
+from .services.recognition import process_frame
+from .services.sequence_buffer import BufferUnavailable, clear_buffer
+from .services.streaming import get_streaming_sessions
+from .services.wire_format import MAGICS, WireFormatError, decode_landmarks
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_PATH = "/ws/predict/"
+
+
+class FrameError(ValueError):
+    pass
+
+
+def _parse_frame(message):
+    """Retorna el frame del mensaje como dict con 'landmarks' y/o 'image'"""
+    if message.get("bytes") is not None:
+        payload = message["bytes"]
+        if payload[:4] in MAGICS:
+            try:
+                frames = decode_landmarks(payload)
+            except WireFormatError as e:
+                raise FrameError(str(e))
+            if frames.shape != (1, NUM_FEATURES):
+                raise FrameError(f"Se espera un frame de 243 valores, se recibió {frames.shape}")
+            return {"landmarks": frames[0]}
+        if len(payload) != FRAME_BYTES:
+            raise FrameError(f"Se esperan {FRAME_BYTES} bytes (243 float32), se recibieron {len(payload)}")
+        return {"landmarks": np.frombuffer(payload, dtype="<f4")}
+
+    try:
+        data = json.loads(message.get("text") or "")
+    except ValueError:
+        raise FrameError("Mensaje JSON inválido")
+    if not isinstance(data, dict):
+        raise FrameError("El mensaje debe ser un objeto JSON")
+
+    if "landmarks" in data:
+        landmarks = data["landmarks"]
+        if not isinstance(landmarks, list) or len(landmarks) != NUM_FEATURES:
+            size = len(landmarks) if isinstance(landmarks, list) else type(landmarks).__name__
+            raise FrameError(f"Se esperan 243 valores, se recibieron {size}")
+    if "image" not in data and "landmarks" not in data:
+        raise FrameError('Se requiere "image" o "landmarks"')
+    return {key: data[key] for key in ("image", "landmarks") if key in data}
+
+
+def _handle_frame(session_id, mode, frame):
+    if "image" in frame:
+        landmarks = extract_keypoints(frame["image"], session_id)
+        if landmarks is None:
+            return {'error': 'No se pudieron extraer landmarks de la imagen'}
+    else:
+        landmarks = frame["landmarks"]
+    return process_frame(session_id, landmarks, mode)
+
+
+def _close_session(session_id):
+    try:
+        clear_buffer(session_id)
+    except BufferUnavailable as e:
+        # El buffer expira solo (TTL); no impedir el resto de la limpieza
+        logger.warning(f"⚠️ {e}")
+    get_streaming_sessions().discard(session_id)
+    end_extraction_session(session_id)
+
+
+async def predict_websocket(scope, receive, send):
+    query = parse_qs(scope.get("query_string", b"").decode())
+    session_id = (query.get("session_id") or [f"ws-{uuid.uuid4().hex}"])[0][:128]
+    mode = (query.get("mode") or [None])[0]
+
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+    logger.info(f"🔌 WebSocket conectado [{session_id}]")
+
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message["type"] != "websocket.receive":
+                continue
+
+            try:
+                async with admit_frame_async(_parse_frame(message)) as frame:
+                    response = await run_blocking(_handle_frame, session_id, mode, frame)
+            except FrameError as e:
+                response = {'error': str(e)}
+            except Overloaded as e:
+                response = e.body
+            except ExtractionBusy as e:
+                response = {'error': str(e), 'reintentar_en': e.retry_after}
+            except ExtractionTimeout as e:
+                response = {'error': str(e)}
+            except BufferUnavailable as e:
+                logger.error(f"❌ {e}")
+                response = {'error': str(e), 'reintentar_en': e.retry_after}
+            except Exception as e:
+                logger.error(f"❌ Error en WebSocket [{session_id}]: {e}", exc_info=True)
+                response = {'error': str(e), 'detail': 'Error al procesar la predicción'}
+
+            await send({"type": "websocket.send", "text": json.dumps(response)})
+    finally:
+        await run_blocking(_close_session, session_id)
+        logger.info(f"🔌 WebSocket desconectado [{session_id}]")
@@ -0,0 +1,828 @@
+"""
+Benchmarks de rendimiento de la API de reconocimiento de gestos
+
+Uso:
+    python benchmark.py <benchmark> [opciones]
+    python benchmark.py --help
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "drf.settings")
+
+NUM_FRAMES = 65
+NUM_FEATURES = 243
+
+
+def _setup_django():
+    import django
+
+    # Sin warm-up en segundo plano: no compite por CPU con lo que se mide
+    os.environ["GESTURE_WARMUP"] = "False"
+    django.setup()
+
+
+def _print_header(title):
+    print("=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def _check(condition, message):
+    print(f"   {'✅' if condition else '❌'} {message}")
+    return bool(condition)
+
+
+# ---------------------------------------------------------------------------
+# Buffers de secuencia
+# ---------------------------------------------------------------------------
+
+def _buffer_backends(args):
+    from api.services.buffer_backends import InProcessBackend, RedisBackend, SharedMemoryBackend
+
+    backends = [("memory", lambda: InProcessBackend(max_sessions=args.sessions, ttl=300))]
+
+    shm_name = f"gesture_buffers_bench_{os.getpid()}"
+    backends.append(("shared_memory", lambda: SharedMemoryBackend(
+        name=shm_name, max_sessions=args.sessions, ttl=300
+    )))
+
+    if args.redis_url:
+        backends.append(("redis", lambda: RedisBackend(url=args.redis_url, prefix=f"bench{os.getpid()}:")))
+    else:
+        try:
+            import fakeredis
+            backends.append(("redis (fakeredis)", lambda: RedisBackend(client=fakeredis.FakeRedis())))
+        except ImportError:
+            print("⚠️  redis omitido: usa --redis-url o instala fakeredis\n")
+
+    return backends
+
+
+def _buffer_throughput(backend, sessions, frames_per_session):
+    frame = np.random.rand(NUM_FEATURES).astype(np.float32)
+    session_ids = [f"s{i}" for i in range(sessions)]
+
+    start = time.perf_counter()
+    for _ in range(frames_per_session):
+        for session_id in session_ids:
+            backend.add_landmarks(session_id, frame)
+    append_elapsed = time.perf_counter() - start
+    appends = sessions * frames_per_session
+
+    start = time.perf_counter()
+    for session_id in session_ids:
+        backend.get_sequence(session_id)
+    read_elapsed = time.perf_counter() - start
+
+    for session_id in session_ids:
+        backend.clear_buffer(session_id)
+
+    print(f"   append:       {appends / append_elapsed:12,.0f} frames/s "
+          f"({append_elapsed / appends * 1e6:.1f} µs/frame)")
+    print(f"   get_sequence: {sessions / read_elapsed:12,.0f} secuencias/s "
+          f"({read_elapsed / sessions * 1e6:.1f} µs/secuencia)")
+
+
+def benchmark_buffers(args):
+    """Throughput de los backends de buffers por sesión (la conformidad está en api/tests.py)"""
+    _print_header("BACKENDS DE BUFFERS DE SECUENCIA")
+
+    for name, factory in _buffer_backends(args):
+        backend = factory()
+        print(f"\n📦 {name}")
+        _buffer_throughput(backend, args.sessions, args.frames)
+        if hasattr(backend, "unlink"):
+            backend.close()
+            backend.unlink()
+
+    print()
+
+
+# ---------------------------------------------------------------------------
+# Pool de intérpretes
+# ---------------------------------------------------------------------------
+
+def benchmark_interpreter_pool(args):
+    """Escalamiento del throughput de inferencia según el tamaño del pool"""
+    from concurrent.futures import ThreadPoolExecutor
+    from api.services.interpreter_pool import InterpreterPool
+    from api.services.predictor import MODEL_TFLITE
+
+    _print_header("POOL DE INTÉRPRETES TFLITE")
+    print(f"   clientes concurrentes: {args.clients}, invocaciones: {args.requests}, "
+          f"num_threads por intérprete: {args.num_threads}\n")
+
+    baseline = None
+    for size in args.sizes:
+        pool = InterpreterPool(MODEL_TFLITE, size=size, num_threads=args.num_threads)
+        input_data = np.random.rand(*pool.input_details[0]["shape"]).astype(np.float32)
+        pool.run(input_data)  # warm-up
+
+        with ThreadPoolExecutor(max_workers=args.clients) as executor:
+            start = time.perf_counter()
+            list(executor.map(lambda _: pool.run(input_data), range(args.requests)))
+            elapsed = time.perf_counter() - start
+
+        throughput = args.requests / elapsed
+        baseline = baseline or throughput
+        print(f"   pool={size:<3} {throughput:8.1f} invokes/s  "
+              f"{throughput * input_data.shape[0]:9.1f} secuencias/s  "
+              f"x{throughput / baseline:.2f}")
+
+    print()
+
+
+# ---------------------------------------------------------------------------
+# Camino de inferencia
+# ---------------------------------------------------------------------------
+
+def _measure(func, repeats):
+    import tracemalloc
+
+    func()  # warm-up
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    elapsed = (time.perf_counter() - start) / repeats
+    return elapsed, peak - before
+
+
+def benchmark_inference_path(args):
+    """Latencia y memoria asignada: camino con copias vs vistas de tensores"""
+    import logging
+    from api.services.predictor import GesturePredictor
+
+    logging.disable(logging.WARNING)
+    _print_header("CAMINO DE INFERENCIA")
+
+    predictor = GesturePredictor()
+    sequence = np.random.rand(NUM_FRAMES, NUM_FEATURES).astype(np.float32)
+
+    results = {}
+    for name, func in [
+        ("con copias", lambda: predictor._predict_with_copies(sequence)),
+        ("zero-copy", lambda: predictor._predict_zero_copy(sequence)),
+    ]:
+        elapsed, allocated = _measure(func, args.repeats)
+        results[name] = func()
+        print(f"   {name:<12} {elapsed * 1000:8.2f} ms/predicción  {allocated / 1024:9.1f} KiB asignados (pico)")
+
+    same = all(
+        a["gesto"] == b["gesto"] and abs(a["probabilidad"] - b["probabilidad"]) < 1e-5
+        for a, b in zip(results["con copias"]["top_3"], results["zero-copy"]["top_3"])
+    )
+    print()
+    return _check(same, "ambos caminos dan el mismo resultado")
+
+
+# ---------------------------------------------------------------------------
+# Carga: POST /api/predict/ vs WebSocket /ws/predict/
+# ---------------------------------------------------------------------------
+
+def _post_loop(base_url, session_id, frames):
+    import http.client
+    import json
+    from urllib.parse import urlparse
+
+    url = urlparse(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80)
+    headers = {"Content-Type": "application/json"}
+    for frame in frames:
+        body = json.dumps({"landmarks": frame.tolist(), "session_id": session_id})
+        connection.request("POST", "/api/predict/", body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"POST /api/predict/ respondió {response.status}")
+    connection.close()
+
+
+async def _websocket_loop(base_url, session_id, frames, binary):
+    import json
+    import websockets
+
+    url = base_url.replace("http", "ws", 1).rstrip("/") + f"/ws/predict/?session_id={session_id}"
+    async with websockets.connect(url) as websocket:
+        for frame in frames:
+            if binary:
+                await websocket.send(frame.astype("<f4").tobytes())
+            else:
+                await websocket.send(json.dumps({"landmarks": frame.tolist()}))
+            await websocket.recv()
+
+
+def benchmark_websocket(args):
+    """Frames/s por core: POST /api/predict/ vs WebSocket (servidor ya corriendo)"""
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    _print_header("CARGA: POST vs WEBSOCKET")
+    print(f"   servidor: {args.url}, clientes: {args.clients}, frames por cliente: {args.frames}, "
+          f"cores del servidor: {args.server_cores}\n")
+    frames = np.random.rand(args.frames, NUM_FEATURES).astype(np.float32)
+    total = args.clients * args.frames
+
+    def report(name, elapsed):
+        rate = total / elapsed
+        print(f"   {name:<18} {rate:9.1f} frames/s  {rate / args.server_cores:9.1f} frames/s/core")
+
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda i: _post_loop(args.url, f"bench-post-{i}", frames), range(args.clients)))
+        report("POST JSON", time.perf_counter() - start)
+
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        print("\n⚠️  WebSocket omitido: instala el paquete websockets")
+        return
+
+    for name, binary in [("WebSocket JSON", False), ("WebSocket binario", True)]:
+        async def run():
+            await asyncio.gather(*[
+                _websocket_loop(args.url, f"bench-ws-{i}", frames, binary) for i in range(args.clients)
+            ])
+
+        start = time.perf_counter()
+        asyncio.run(run())
+        report(name, time.perf_counter() - start)
+
+    print()
+
+
+# ---------------------------------------------------------------------------
+# Formato de transporte
+# ---------------------------------------------------------------------------
+
+def benchmark_wire_format(args):
+    """Tamaño y costo de parseo de una secuencia: JSON vs formato binario"""
+    import json
+    from api.services.wire_format import FLOAT16, FLOAT32, INT16, decode_landmarks, encode_landmarks
+
+    _print_header("FORMATO DE TRANSPORTE (65 × 243)")
+    sequence = np.random.rand(NUM_FRAMES, NUM_FEATURES).astype(np.float32)
+
+    formats = [("JSON", json.dumps({"frames": sequence.tolist()}).encode(),
+                lambda body: np.asarray(json.loads(body)["frames"], dtype=np.float32))]
+    for name, dtype in [("binario float32", FLOAT32), ("binario float16", FLOAT16), ("binario int16", INT16)]:
+        formats.append((name, encode_landmarks(sequence, dtype), decode_landmarks))
+
+    baseline = None
+    for name, body, parse in formats:
+        parse(body)
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            parsed = parse(body)
+        elapsed = (time.perf_counter() - start) / args.repeats
+        baseline = baseline or elapsed
+        error = float(np.abs(parsed - sequence).max())
+        print(f"   {name:<16} {len(body) / 1024:8.1f} KiB  {elapsed * 1e6:9.1f} µs/parseo  "
+              f"x{baseline / elapsed:7.1f}  error máx {error:.1e}")
+
+    print()
+
+
+# ---------------------------------------------------------------------------
+# Extracción de keypoints
+# ---------------------------------------------------------------------------
+
+def _synthetic_holistic_results(hands=True):
+    """Resultados con la forma de Holistic.process() sin correr MediaPipe"""
+    from types import SimpleNamespace
+    from mediapipe.framework.formats import landmark_pb2
+
+    rng = np.random.default_rng(0)
+
+    def landmark_list(count, visibility=False):
+        landmarks = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z in rng.random((count, 3), dtype=np.float32):
+            landmark = landmarks.landmark.add(x=x, y=y, z=z)
+            if visibility:
+                landmark.visibility = 0.9
+                landmark.presence = 0.9
+        return landmarks
+
+    return SimpleNamespace(
+        pose_landmarks=landmark_list(33, visibility=True),
+        face_landmarks=landmark_list(468),
+        left_hand_landmarks=landmark_list(21) if hands else None,
+        right_hand_landmarks=landmark_list(21) if hands else None,
+    )
+
+
+def _extract_keypoints_list(results):
+    """Implementación anterior: lista de 243 floats punto por punto"""
+    keypoints = []
+    parts = [
+        (results.pose_landmarks, None, 99),
+        (results.face_landmarks, [1, 33, 263, 61, 291, 199], 18),
+        (results.left_hand_landmarks, None, 63),
+        (results.right_hand_landmarks, None, 63),
+    ]
+    for part, indices, size in parts:
+        if part:
+            landmarks = part.landmark if indices is None else [part.landmark[i] for i in indices]
+            for lm in landmarks:
+                keypoints.extend([lm.x, lm.y, lm.z])
+        else:
+            keypoints.extend([0.0] * size)
+    return keypoints
+
+
+def benchmark_extraction(args):
+    """Costo por frame de convertir los resultados de MediaPipe en keypoints"""
+    from api.services.mediapipe_extractor import MediaPipeExtractor
+
+    _print_header("EXTRACCIÓN DE KEYPOINTS")
+    # Sin __init__: solo se mide la conversión, no Holistic
+    extractor = MediaPipeExtractor.__new__(MediaPipeExtractor)
+
+    ok = True
+    for name, results in [("con manos", _synthetic_holistic_results()),
+                          ("sin manos", _synthetic_holistic_results(hands=False))]:
+        implementations = [
+            ("lista + np.asarray", lambda: np.asarray(_extract_keypoints_list(results), dtype=np.float32)),
+            ("array (81, 3)", lambda: extractor._extract_keypoints(results)),
+        ]
+        print(f"   {name}:")
+        baseline = None
+        for label, func in implementations:
+            elapsed, allocated = _measure(func, args.repeats)
+            baseline = baseline or elapsed
+            print(f"      {label:<20} {elapsed * 1e6:8.1f} µs/frame  x{baseline / elapsed:5.1f}  "
+                  f"{allocated / 1024:6.1f} KiB asignados (pico)")
+        expected, actual = (func().reshape(-1) for _, func in implementations)
+        ok &= _check(np.array_equal(expected, actual), "mismos 243 valores")
+
+    print()
+    if args.workers:
+        ok &= _benchmark_extraction_pool(args)
+    return ok
+
+
+def _benchmark_extraction_pool(args):
+    """Frames/s del pool de procesos con imágenes sin session_id (sesión 'default')"""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    _setup_django()
+    from api.services.extraction_pool import ExtractionPool
+    from api.services.mediapipe_extractor import extractor_options_from_settings
+
+    image = _synthetic_jpeg(640, 480)
+    print(f"   Pool de extracción, JPEG 640×480 sin session_id, {args.frames} frames ({os.cpu_count()} cores):")
+    throughputs = {}
+    for workers in args.workers:
+        pool = ExtractionPool(workers, max_pending=4 * workers, timeout=60,
+                              extractor_options=extractor_options_from_settings())
+        pool.warm_up()
+        busiest = [0] * workers
+        lock = threading.Lock()
+
+        def extract(_):
+            keypoints = pool.extract(image)
+            with lock:
+                for index, pending in enumerate(pool._pending_by_worker):
+                    busiest[index] = max(busiest[index], pending)
+            return keypoints
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(2 * workers) as clients:
+            list(clients.map(extract, range(args.frames)))
+        throughputs[workers] = args.frames / (time.perf_counter() - start)
+        pool.shutdown()
+        print(f"      {workers} procesos: {throughputs[workers]:7.1f} frames/s  "
+              f"procesos usados: {sum(1 for pending in busiest if pending)}/{workers}")
+
+    print()
+    single = throughputs.get(min(throughputs))
+    best = max(throughputs, key=throughputs.get)
+    print(f"   x{throughputs[best] / single:.1f} con {best} procesos respecto de {min(throughputs)}\n")
+    return True
+
+
+def _synthetic_jpeg(width, height):
+    """JPEG con bordes y textura, para que el costo de decodificar sea realista"""
+    import io
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    image = np.stack([(x * 255 // width), (y * 255 // height), ((x + y) % 256)], axis=-1)
+    image = (image + rng.integers(0, 40, image.shape)).clip(0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _decode_legacy(image_bytes):
+    """Pipeline anterior: PIL + thumbnail LANCZOS + np.array"""
+    import io
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_bytes))
+    image.thumbnail((640, 640), Image.Resampling.LANCZOS)
+    return np.array(image)
+
+
+def benchmark_decode(args):
+    """Tiempo de decodificación por frame para cada opción del pipeline de imágenes"""
+    import base64
+    from api.services.image_decoding import decode_image
+
+    _print_header("DECODIFICACIÓN DE IMÁGENES")
+    for width, height in args.resolutions:
+        image_bytes = _synthetic_jpeg(width, height)
+        image_base64 = base64.b64encode(image_bytes).decode()
+        print(f"   JPEG {width}×{height} ({len(image_bytes) / 1024:.0f} KiB, "
+              f"base64 {len(image_base64) / 1024:.0f} KiB):")
+
+        options = [("anterior (pil lanczos 640)", lambda: _decode_legacy(base64.b64decode(image_base64)))]
+        for max_size in args.max_sizes:
+            for decoder, resize_filter in [("pil", "lanczos"), ("pil", "bilinear"), ("cv2", "area"), ("cv2", "bilinear")]:
+                options.append((
+                    f"{decoder} {resize_filter} {max_size}",
+                    lambda d=decoder, f=resize_filter, m=max_size: decode_image(
+                        base64.b64decode(image_base64), decoder=d, max_size=m, resize_filter=f
+                    ),
+                ))
+        options.append(("cv2 area 640 (multipart)",
+                        lambda: decode_image(image_bytes, decoder="cv2", max_size=640, resize_filter="area")))
+
+        baseline = None
+        for name, func in options:
+            func()
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                image = func()
+            elapsed = (time.perf_counter() - start) / args.repeats
+            baseline = baseline or elapsed
+            print(f"      {name:<28} {elapsed * 1000:7.2f} ms/frame  x{baseline / elapsed:5.1f}  "
+                  f"-> {image.shape[1]}×{image.shape[0]}")
+        print()
+
+
+def _load_video_frames(path, max_frames):
+    """Frames RGB de un video grabado (cv2.VideoCapture)"""
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    capture.release()
+    return frames
+
+
+def benchmark_holistic_tracking(args):
+    """Latencia por frame y diferencia de landmarks: static_image_mode vs tracking por sesión"""
+    from api.services.mediapipe_extractor import FACE, LEFT_HAND, POSE, RIGHT_HAND, MediaPipeExtractor
+
+    _print_header("MEDIAPIPE: IMAGEN ESTÁTICA vs TRACKING")
+    if args.video:
+        frames = _load_video_frames(args.video, args.frames)
+        if not frames:
+            print(f"❌ No se pudieron leer frames de {args.video}")
+            return False
+    else:
+        print("⚠️  Sin --video: frames sintéticos sin persona, solo sirve para la latencia\n")
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(args.frames)]
+    print(f"   frames: {len(frames)}, model_complexity: {args.model_complexity}\n")
+
+    modes = [
+        ("static_image_mode", MediaPipeExtractor(tracking=False, model_complexity=args.model_complexity)),
+        ("tracking", MediaPipeExtractor(tracking=True, model_complexity=args.model_complexity)),
+    ]
+    keypoints = {}
+    for name, extractor in modes:
+        extractor.extract_keypoints(frames[0], session_id="warm-up")
+        extractor.end_session("warm-up")
+
+        latencies = []
+        keypoints[name] = []
+        for frame in frames:
+            start = time.perf_counter()
+            keypoints[name].append(extractor.extract_keypoints(frame, session_id="bench"))
+            latencies.append(time.perf_counter() - start)
+        extractor.close()
+
+        latencies = np.array(latencies) * 1000
+        print(f"   {name:<18} media {latencies.mean():7.1f} ms  p50 {np.percentile(latencies, 50):7.1f} ms  "
+              f"p95 {np.percentile(latencies, 95):7.1f} ms  {1000 / latencies.mean():6.1f} fps")
+
+    print()
+    static, tracked = np.stack(keypoints["static_image_mode"]), np.stack(keypoints["tracking"])
+    for part, rows in [("pose", POSE), ("cara", FACE), ("mano izq.", LEFT_HAND), ("mano der.", RIGHT_HAND)]:
+        static_found = static[:, rows].any(axis=(1, 2))
+        tracked_found = tracked[:, rows].any(axis=(1, 2))
+        both = static_found & tracked_found
+        error = np.abs(static[both, rows] - tracked[both, rows]).mean() if both.any() else float("nan")
+        print(f"   {part:<10} detectada {static_found.mean():6.1%} (estático) vs {tracked_found.mean():6.1%} "
+              f"(tracking)  error medio {error:.4f}")
+    print()
+
+
+# ---------------------------------------------------------------------------
+# Predicción por lotes
+# ---------------------------------------------------------------------------
+
+def benchmark_predict_batch(args):
+    """Secuencias/s: predict() una por una vs predict_batch() con N secuencias"""
+    import logging
+    from api.services.predictor import GesturePredictor
+
+    logging.disable(logging.WARNING)
+    _print_header("PREDICCIÓN POR LOTES")
+
+    predictor = GesturePredictor()
+    print(f"   batch del modelo: {predictor.batch_size}\n")
+
+    ok = True
+    for count in args.sizes:
+        sequences = np.random.rand(count, NUM_FRAMES, NUM_FEATURES).astype(np.float32)
+
+        start = time.perf_counter()
+        single = [predictor.predict(sequence) for sequence in sequences]
+        single_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = predictor.predict_batch(sequences)
+        batch_elapsed = time.perf_counter() - start
+
+        print(f"   N={count:<5} una por una {count / single_elapsed:9.1f} seq/s   "
+              f"batch {count / batch_elapsed:9.1f} seq/s   x{single_elapsed / batch_elapsed:5.1f}")
+        ok &= all(a["gesto"] == b["gesto"] for a, b in zip(single, batched))
+
+    print()
+    return _check(ok, "mismo gesto en ambos caminos")
+
+
+def _format_result_argsort(classes, probabilities, top_k):
+    """Formato anterior: argsort completo, argmax y max por separado"""
+    top_k_indices = np.argsort(probabilities)[-top_k:][::-1]
+    top = [
+        {"gesto": label, "probabilidad": float(prob)}
+        for label, prob in zip(classes[top_k_indices], probabilities[top_k_indices])
+    ]
+    pred_index = np.argmax(probabilities)
+    return {"gesto": classes[pred_index], "confianza": float(np.max(probabilities)), f"top_{top_k}": top}
+
+
+def benchmark_top_k(args):
+    """Armado de resultados: argsort fila por fila vs argpartition vectorizado sobre (B, C)"""
+    import logging
+    from api.services.predictor import GesturePredictor
+
+    logging.disable(logging.WARNING)
+    _print_header("TOP-K DE LOS RESULTADOS")
+
+    predictor = GesturePredictor()
+    rng = np.random.default_rng(0)
+
+    ok = True
+    for count in args.sizes:
+        outputs = rng.dirichlet(np.ones(len(predictor.classes)), size=count).astype(np.float32)
+
+        def per_row():
+            return [_format_result_argsort(predictor.classes, row, args.top_k) for row in outputs]
+
+        def vectorized():
+            return predictor.format_results(outputs, args.top_k)
+
+        print(f"   B={count}")
+        for name, func in [("argsort por fila", per_row), ("vectorizado", vectorized)]:
+            elapsed, allocated = _measure(func, args.repeats)
+            print(f"      {name:<18} {elapsed * 1e6 / count:8.2f} µs/fila  {allocated / 1024:9.1f} KiB asignados (pico)")
+
+        key = f"top_{args.top_k}"
+        ok &= all(
+            a["gesto"] == b["gesto"] and [t["gesto"] for t in a[key]] == [t["gesto"] for t in b[key]]
+            for a, b in zip(per_row(), vectorized())
+        )
+
+    print()
+    return _check(ok, "mismo gesto y mismo top-k en ambos")
+
+
+# ---------------------------------------------------------------------------
+# Costo por request: DRF + middlewares completos vs rutas livianas
+# ---------------------------------------------------------------------------
+
+def _wsgi_call(application, path, body, content_type, session_id):
+    """Un POST en proceso contra la aplicación WSGI; retorna (status, cuerpo)"""
+    import io
+
+    environ = {
+        "REQUEST_METHOD": "POST", "PATH_INFO": path, "QUERY_STRING": "", "SCRIPT_NAME": "",
+        "SERVER_NAME": "testserver", "SERVER_PORT": "80", "HTTP_HOST": "testserver",
+        "CONTENT_TYPE": content_type, "CONTENT_LENGTH": str(len(body)), "HTTP_X_SESSION_ID": session_id,
+        "wsgi.input": io.BytesIO(body), "wsgi.url_scheme": "http", "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False, "wsgi.multiprocess": False, "wsgi.run_once": False,
+    }
+    status = []
+    response = application(environ, lambda code, headers, exc_info=None: status.append(int(code.split()[0])))
+    try:
+        content = b"".join(response)
+    finally:
+        getattr(response, "close", lambda: None)()
+    return status[0], content
+
+
+def benchmark_routes(args):
+    """µs por request de landmarks: /api/predict/ (DRF) vs /api/fast/predict/, en proceso"""
+    import json
+    import logging
+
+    # Solo el costo de atender el request
+    logging.disable(logging.WARNING)
+    _setup_django()
+    from drf.wsgi import application
+    from drf.lean import lean_prefix
+    from api.services import json_codec
+    from api.services.wire_format import encode_landmarks
+
+    _print_header("COSTO POR REQUEST (landmarks, sin inferencia)")
+    print(f"   JSON: {'orjson' if json_codec.orjson is not None else 'json (stdlib)'}\n")
+
+    frame = np.random.rand(NUM_FEATURES).astype(np.float32)
+    bodies = {
+        "JSON": (json.dumps({"landmarks": frame.tolist()}).encode(), "application/json"),
+        "binario": (encode_landmarks(frame), "application/x-landmarks"),
+    }
+    routes = [("DRF", "/api/predict/"), ("liviana", f"{lean_prefix()}predict/")]
+
+    for body_name, (body, content_type) in bodies.items():
+        print(f"   {body_name} ({len(body)} bytes)")
+        for route_name, path in routes:
+            counter = iter(range(10 ** 9))
+
+            def call():
+                # Menos de 65 frames por sesión: nunca llega a invocar el modelo
+                session_id = f"bench-{route_name}-{body_name}-{next(counter) // (NUM_FRAMES - 1)}"
+                return _wsgi_call(application, path, body, content_type, session_id)
+
+            elapsed, allocated = _measure(call, args.requests)
+            print(f"      {route_name:<8} {path:<22} {elapsed * 1e6:8.1f} µs/request  "
+                  f"{allocated / 1024:8.1f} KiB asignados (pico)")
+
+    # Que ambas rutas respondan igual lo cubre api.tests.LeanRoutesTests
+    print()
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Memoria por worker
+# ---------------------------------------------------------------------------
+
+def _memory_usage():
+    """RSS, PSS (RSS repartiendo las páginas compartidas) y privada, en MiB"""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f.readlines()[1:]:
+            name, value = line.split(":")
+            values[name] = int(value.split()[0]) / 1024
+    return values["Rss"], values["Pss"], values["Private_Clean"] + values["Private_Dirty"]
+
+
+def _memory_probe(environment, results):
+    """Corre en un proceso nuevo: mide la memoria en cada etapa del arranque de un worker"""
+    os.environ.update(environment)
+    import logging
+    logging.disable(logging.WARNING)
+
+    stages = [("proceso vacío", _memory_usage())]
+    _setup_django()
+    import api.urls  # noqa: F401  (vistas y servicios, como al recibir el primer request)
+    stages.append(("django + vistas", _memory_usage()))
+
+    from api.services.predictor import get_predictor
+    get_predictor().predict(np.zeros((NUM_FRAMES, NUM_FEATURES), dtype=np.float32))
+    stages.append(("predictor + inferencia", _memory_usage()))
+
+    if environment.get("_IMAGEN") == "True":
+        from api.services.image_decoding import decode_image  # noqa: F401
+        from api.services.mediapipe_extractor import get_mediapipe_extractor
+        extractor = get_mediapipe_extractor()
+        extractor.extract_keypoints(np.zeros((240, 320, 3), dtype=np.uint8), session_id="probe")
+        stages.append(("MediaPipe + un frame", _memory_usage()))
+
+    loaded = [name for name in ("sklearn", "mediapipe", "cv2", "PIL", "tflite_runtime") if name in sys.modules]
+    results.put((stages, loaded))
+
+
+def benchmark_memory(args):
+    """Memoria de un worker por etapa: perfil por defecto vs GESTURE_LOW_MEMORY"""
+    import multiprocessing
+
+    _print_header("MEMORIA POR WORKER (MiB)")
+    profiles = [
+        ("por defecto", {}),
+        ("bajo consumo", {"GESTURE_LOW_MEMORY": "True"}),
+    ]
+    if args.image:
+        profiles.append(("bajo consumo + imagen", {
+            "GESTURE_LOW_MEMORY": "True", "_IMAGEN": "True",
+            "GESTURE_MEDIAPIPE_MODEL_COMPLEXITY": str(args.model_complexity),
+        }))
+
+    context = multiprocessing.get_context("spawn")
+    for name, environment in profiles:
+        results = context.Queue()
+        process = context.Process(target=_memory_probe, args=(environment, results))
+        process.start()
+        stages, loaded = results.get()
+        process.join()
+
+        print(f"   {name}:")
+        for stage, (rss, pss, private) in stages:
+            print(f"      {stage:<24} RSS {rss:7.1f}  PSS {pss:7.1f}  privada {private:7.1f}")
+        print(f"      módulos cargados: {', '.join(loaded) or 'ninguno'}\n")
+
+
+BENCHMARKS = {
+    "buffers": (benchmark_buffers, [
+        (("--sessions",), {"type": int, "default": 100, "help": "sesiones concurrentes"}),
+        (("--frames",), {"type": int, "default": 65, "help": "frames por sesión"}),
+        (("--redis-url",), {"default": None, "help": "servidor Redis real para el backend redis"}),
+    ]),
+    "interpreter_pool": (benchmark_interpreter_pool, [
+        (("--sizes",), {"type": int, "nargs": "+", "default": [1, 2, 4], "help": "tamaños de pool"}),
+        (("--clients",), {"type": int, "default": 8, "help": "threads cliente"}),
+        (("--requests",), {"type": int, "default": 200, "help": "invocaciones por tamaño"}),
+        (("--num-threads",), {"type": int, "default": 1, "help": "num_threads de cada intérprete"}),
+    ]),
+    "inference_path": (benchmark_inference_path, [
+        (("--repeats",), {"type": int, "default": 50, "help": "predicciones por camino"}),
+    ]),
+    "wire_format": (benchmark_wire_format, [
+        (("--repeats",), {"type": int, "default": 200, "help": "parseos por formato"}),
+    ]),
+    "decode": (benchmark_decode, [
+        (("--resolutions",), {"type": lambda value: tuple(int(v) for v in value.split("x")), "nargs": "+",
+                              "default": [(1280, 720), (1920, 1080)], "help": "resoluciones, p. ej. 1280x720"}),
+        (("--max-sizes",), {"type": int, "nargs": "+", "default": [640, 320], "help": "lado máximo a decodificar"}),
+        (("--repeats",), {"type": int, "default": 20, "help": "decodificaciones por opción"}),
+    ]),
+    "extraction": (benchmark_extraction, [
+        (("--repeats",), {"type": int, "default": 5000, "help": "frames por implementación"}),
+        (("--workers",), {"type": int, "nargs": "*", "default": [],
+                          "help": "además, frames/s del pool de procesos con estos tamaños (p. ej. 1 2 4)"}),
+        (("--frames",), {"type": int, "default": 200, "help": "imágenes por tamaño de pool"}),
+    ]),
+    "holistic_tracking": (benchmark_holistic_tracking, [
+        (("--video",), {"default": None, "help": "video grabado de una persona haciendo señas"}),
+        (("--frames",), {"type": int, "default": 100, "help": "frames a procesar"}),
+        (("--model-complexity",), {"type": int, "default": 0, "help": "model_complexity de Holistic"}),
+    ]),
+    "memory": (benchmark_memory, [
+        (("--image",), {"action": "store_true", "help": "incluir la carga de MediaPipe con un frame"}),
+        (("--model-complexity",), {"type": int, "default": 0, "help": "model_complexity de Holistic"}),
+    ]),
+    "predict_batch": (benchmark_predict_batch, [
+        (("--sizes",), {"type": int, "nargs": "+", "default": [1, 16, 64, 256], "help": "secuencias por lote"}),
+    ]),
+    "top_k": (benchmark_top_k, [
+        (("--sizes",), {"type": int, "nargs": "+", "default": [1, 16, 256], "help": "filas (B) por llamada"}),
+        (("--top-k",), {"type": int, "default": 3, "help": "k del top-k"}),
+        (("--repeats",), {"type": int, "default": 200, "help": "llamadas por implementación"}),
+    ]),
+    "routes": (benchmark_routes, [
+        (("--requests",), {"type": int, "default": 2000, "help": "requests por ruta y formato"}),
+    ]),
+    "websocket": (benchmark_websocket, [
+        (("--url",), {"default": "http://127.0.0.1:8000", "help": "servidor ASGI (uvicorn drf.asgi:application)"}),
+        (("--clients",), {"type": int, "default": 4, "help": "personas concurrentes"}),
+        (("--frames",), {"type": int, "default": 64, "help": "frames por cliente"}),
+        (("--server-cores",), {"type": int, "default": 1, "help": "cores del servidor, para normalizar"}),
+    ]),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de la API de gestos")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    for name, (func, arguments) in BENCHMARKS.items():
+        subparser = subparsers.add_parser(name, help=func.__doc__)
+        for flags, kwargs in arguments:
+            subparser.add_argument(*flags, **kwargs)
+
+    args = parser.parse_args()
+    func, _ = BENCHMARKS[args.benchmark]
+    if func(args) is False:
+        sys.exit(1)
@@ -1,15 +1,71 @@
 """
 Script para convertir el modelo Keras a TFLite
 Esto reduce el uso de RAM de ~2GB a ~200MB
+
+Con --variantes genera además las versiones cuantizadas (int8 de rango
+dinámico, int8 completo y float16) y un reporte de tamaño, latencia y
+coincidencia del top-1 con el modelo Keras. El int8 completo se calibra
+con secuencias de landmarks grabadas (--secuencias, array (N, 65, 243)
+sin normalizar en .npy/.npz); sin ellas se omite.
+
+También exporta el label encoder y el normalizer (pickles de scikit-learn)
+a api/ml/artefactos.npz, para que el servidor no importe scikit-learn:
+
+    python convert_to_tflite.py                   # modelo + artefactos
+    python convert_to_tflite.py --solo-artefactos # sin TensorFlow
+    python convert_to_tflite.py --variantes --secuencias grabaciones.npy
 """
-import tensorflow as tf
+import argparse
+import json
 import os
+import pickle
+import time
 
 # Rutas
 KERAS_MODEL_PATH = "api/ml/best_model_sin_patron_ceros.keras"
 TFLITE_MODEL_PATH = "api/ml/modelo.tflite"
-
-def convert_keras_to_tflite():
+LABEL_ENCODER_PATH = "api/ml/label_encoder.pkl"
+NORMALIZER_PATH = "api/ml/normalizacion_sin_patron.pkl"
+ARTIFACTS_PATH = "api/ml/artefactos.npz"
+REPORT_PATH = "api/ml/reporte_variantes.json"
+
+# Mismos nombres que api/services/predictor.py (GESTURE_MODEL_VARIANT)
+VARIANT_PATHS = {
+    "float32": TFLITE_MODEL_PATH,
+    "dynamic_int8": "api/ml/modelo_dynamic_int8.tflite",
+    "int8": "api/ml/modelo_int8.tflite",
+    "float16": "api/ml/modelo_float16.tflite",
+}
+
+NUM_FRAMES = 65
+
+# Secuencias usadas para calibrar el int8 completo
+NUM_CALIBRATION_SEQUENCES = 200
+
+def make_converter(model, dynamic_batch=True, dynamic_length=False):
+    """
+    Converter TFLite para el modelo Keras. Con dynamic_batch la dimensión de
+    batch queda en -1: el servidor redimensiona el input al batch real en vez
+    de completar un batch fijo (con dynamic_length, también el largo de la
+    secuencia).
+    """
+    import tensorflow as tf
+
+    if not dynamic_batch and not dynamic_length:
+        return tf.lite.TFLiteConverter.from_keras_model(model)
+
+    input_shape = list(model.input_shape)
+    if dynamic_batch:
+        input_shape[0] = None
+    if dynamic_length:
+        input_shape[1] = None
+    spec = tf.TensorSpec(input_shape, tf.float32)
+    function = tf.function(lambda sequences: model(sequences, training=False), input_signature=[spec])
+    # Solo ops builtin: tflite_runtime no incluye el delegate de ops de TensorFlow
+    return tf.lite.TFLiteConverter.from_concrete_functions([function.get_concrete_function()], model)
+
+
+def convert_keras_to_tflite(dynamic_batch=True, dynamic_length=False):
     """Convierte el modelo Keras a TFLite"""
 
     print("=" * 60)
@@ -24,6 +80,8 @@ def convert_keras_to_tflite():
     print(f"\n📂 Cargando modelo Keras desde: {KERAS_MODEL_PATH}")
 
     try:
+        import tensorflow as tf
+
         # Cargar modelo Keras
         model = tf.keras.models.load_model(KERAS_MODEL_PATH)
         print("✅ Modelo Keras cargado exitosamente")
@@ -35,8 +93,8 @@ def convert_keras_to_tflite():
         print(f"   - Número de parámetros: {model.count_params():,}")
 
         # Convertir a TFLite
-        print(f"\n🔄 Convirtiendo a TFLite...")
-        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        print(f"\n🔄 Convirtiendo a TFLite (batch {'dinámico' if dynamic_batch else 'fijo'})...")
+        converter = make_converter(model, dynamic_batch, dynamic_length)
 
         # Optimizaciones opcionales (descomenta si quieres modelo más pequeño)
         # converter.optimizations = [tf.lite.Optimize.DEFAULT]
@@ -78,6 +136,228 @@ def convert_keras_to_tflite():
         return False
 
 
+def export_runtime_artifacts():
+    """Exporta clases y normalización de los pickles a un .npz sin objetos de Python"""
+
+    print("\n" + "=" * 60)
+    print("EXPORTANDO ARTEFACTOS DE RUNTIME")
+    print("=" * 60)
+
+    try:
+        import numpy as np
+
+        # Los pickles necesitan scikit-learn solo aquí, no en el servidor
+        with open(LABEL_ENCODER_PATH, "rb") as f:
+            label_encoder = pickle.load(f)
+        with open(NORMALIZER_PATH, "rb") as f:
+            normalizer = pickle.load(f)
+
+        if not isinstance(normalizer, dict):
+            print("❌ ERROR: el normalizer no es un diccionario con 'mean' y 'std'")
+            return False
+
+        classes = np.asarray(label_encoder.classes_).astype(str)
+        np.savez(
+            ARTIFACTS_PATH,
+            classes=classes,
+            mean=np.float64(normalizer["mean"]),
+            std=np.float64(normalizer["std"]),
+            num_frames=np.int64(normalizer.get("num_frames", 65)),
+            num_features=np.int64(normalizer.get("num_features", 243)),
+        )
+
+        # Verificar que se lee sin pickle y coincide con los originales
+        with np.load(ARTIFACTS_PATH, allow_pickle=False) as data:
+            assert list(data["classes"]) == list(label_encoder.classes_)
+            assert float(data["mean"]) == float(normalizer["mean"])
+            assert float(data["std"]) == float(normalizer["std"])
+
+        print(f"💾 {ARTIFACTS_PATH}: {len(classes)} clases, "
+              f"mean={normalizer['mean']:.4f}, std={normalizer['std']:.4f} "
+              f"({os.path.getsize(ARTIFACTS_PATH)} bytes)")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ ERROR exportando artefactos: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def load_sequences(path):
+    """Secuencias grabadas (N, 65, 243) sin normalizar, normalizadas como en el servidor"""
+    import numpy as np
+
+    data = np.load(path, allow_pickle=False)
+    if isinstance(data, np.lib.npyio.NpzFile):
+        with data:
+            data = data[data.files[0]]
+    sequences = np.asarray(data, dtype=np.float32)
+    if sequences.ndim != 3:
+        raise ValueError(f"Se esperaba un array (N, 65, 243), se recibió {sequences.shape}")
+
+    with open(NORMALIZER_PATH, "rb") as f:
+        normalizer = pickle.load(f)
+    return (sequences - normalizer["mean"]) / normalizer["std"]
+
+
+def _batches(sequences, batch_size):
+    """Batches de `batch_size` secuencias; el último se completa repitiendo la primera"""
+    import numpy as np
+
+    for start in range(0, len(sequences), batch_size):
+        batch = sequences[start:start + batch_size]
+        if len(batch) < batch_size:
+            padding = np.repeat(sequences[:1], batch_size - len(batch), axis=0)
+            batch = np.concatenate((batch, padding))
+        yield batch
+
+
+def convert_variant(model, variant, sequences=None, dynamic_batch=True, dynamic_length=False):
+    """Convierte el modelo Keras a una variante cuantizada y retorna los bytes TFLite"""
+    import tensorflow as tf
+
+    converter = make_converter(model, dynamic_batch, dynamic_length)
+
+    if variant == "dynamic_int8":
+        # Pesos en int8, activaciones en float: no necesita datos de calibración
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif variant == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        if sequences is None:
+            raise ValueError("El int8 completo requiere secuencias de calibración (--secuencias)")
+        batch_size = 1 if dynamic_batch else (model.input_shape[0] or 1)
+        calibration = sequences[:NUM_CALIBRATION_SEQUENCES]
+
+        def representative_dataset():
+            for batch in _batches(calibration, batch_size):
+                yield [batch.astype("float32")]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        # Entrada y salida siguen en float32 (quantize/dequantize dentro del modelo),
+        # así el predictor escribe la secuencia normalizada igual que con float32
+    elif variant != "float32":
+        raise ValueError(f"Variante desconocida: {variant}")
+
+    return converter.convert()
+
+
+def _tflite_outputs(model_path, sequences, repeats=50):
+    """Latencia media por invoke y salidas de la variante para `sequences`"""
+    import numpy as np
+    import tensorflow as tf
+
+    interpreter = tf.lite.Interpreter(model_path=model_path)
+    input_details = interpreter.get_input_details()[0]
+    output_details = interpreter.get_output_details()[0]
+    # Dimensiones dinámicas: batch de 1 (un request) y secuencias de 65 frames
+    shape = [1 if dim == -1 else int(dim) for dim in input_details["shape_signature"]]
+    shape[1] = NUM_FRAMES
+    interpreter.resize_tensor_input(input_details["index"], shape)
+    interpreter.allocate_tensors()
+    batch_size = shape[0]
+
+    batch = np.zeros(shape, dtype=np.float32)
+    interpreter.set_tensor(input_details["index"], batch)
+    interpreter.invoke()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        interpreter.invoke()
+    latency = (time.perf_counter() - start) / repeats
+
+    outputs = None
+    if sequences is not None:
+        outputs = []
+        for batch in _batches(sequences, batch_size):
+            interpreter.set_tensor(input_details["index"], batch)
+            interpreter.invoke()
+            outputs.append(interpreter.get_tensor(output_details["index"]))
+        outputs = np.concatenate(outputs)[:len(sequences)]
+
+    return latency, batch_size, outputs
+
+
+def build_variants(sequences_path=None, variants=None, dynamic_batch=True, dynamic_length=False):
+    """Genera las variantes cuantizadas y escribe el reporte de comparación"""
+
+    print("\n" + "=" * 60)
+    print("VARIANTES CUANTIZADAS")
+    print("=" * 60)
+
+    if not os.path.exists(KERAS_MODEL_PATH):
+        print(f"❌ ERROR: No se encontró el modelo en {KERAS_MODEL_PATH}")
+        return False
+
+    try:
+        import numpy as np
+        import tensorflow as tf
+
+        model = tf.keras.models.load_model(KERAS_MODEL_PATH)
+        sequences = load_sequences(sequences_path) if sequences_path else None
+        if sequences is None:
+            print("⚠️  Sin --secuencias: se omite el int8 completo y la coincidencia con Keras")
+
+        reference = None
+        if sequences is not None:
+            batch_size = model.input_shape[0] or len(sequences)
+            outputs = [model.predict(batch, verbose=0) for batch in _batches(sequences, batch_size)]
+            reference = np.argmax(np.concatenate(outputs)[:len(sequences)], axis=1)
+
+        report = {}
+        for variant in variants or list(VARIANT_PATHS):
+            path = VARIANT_PATHS[variant]
+            if variant == "int8" and sequences is None:
+                continue
+            if variant != "float32" or not os.path.exists(path):
+                print(f"\n🔄 Convirtiendo variante {variant}...")
+                try:
+                    tflite_model = convert_variant(model, variant, sequences, dynamic_batch, dynamic_length)
+                except Exception as e:
+                    # Algunas capas (p. ej. LSTM) pueden no tener kernels int8
+                    print(f"❌ No se pudo convertir {variant}: {e}")
+                    report[variant] = {"error": str(e)}
+                    continue
+                with open(path, "wb") as f:
+                    f.write(tflite_model)
+
+            latency, batch_size, outputs = _tflite_outputs(path, sequences)
+            entry = {
+                "archivo": path,
+                "tamano_mb": round(os.path.getsize(path) / (1024 * 1024), 3),
+                "latencia_ms_por_invoke": round(latency * 1000, 3),
+                "batch_size": batch_size,
+            }
+            if outputs is not None:
+                entry["coincidencia_top1"] = round(float(np.mean(np.argmax(outputs, axis=1) == reference)), 4)
+            report[variant] = entry
+
+        with open(REPORT_PATH, "w") as f:
+            json.dump({"secuencias": len(sequences) if sequences is not None else 0, "variantes": report},
+                      f, indent=2, ensure_ascii=False)
+
+        print(f"\n📊 {'variante':<14}{'MB':>8}{'ms/invoke':>12}{'top-1 = Keras':>16}")
+        for variant, entry in report.items():
+            if "error" in entry:
+                print(f"   {variant:<14}{'error':>8}")
+                continue
+            agreement = entry.get("coincidencia_top1")
+            agreement = f"{agreement * 100:.1f}%" if agreement is not None else "-"
+            print(f"   {variant:<14}{entry['tamano_mb']:>8.2f}{entry['latencia_ms_por_invoke']:>12.2f}{agreement:>16}")
+        print(f"\n💾 Reporte guardado en {REPORT_PATH}")
+        print("   Elige la variante en el servidor con GESTURE_MODEL_VARIANT")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ ERROR generando variantes: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
 def test_tflite_model():
     """Prueba que el modelo TFLite funciona correctamente"""
 
@@ -104,11 +384,14 @@ def test_tflite_model():
 
         print("✅ Modelo TFLite cargado exitosamente")
         print(f"\n📊 Detalles del modelo:")
-        print(f"   - Input shape:  {input_details[0]['shape']}")
-        print(f"   - Output shape: {output_details[0]['shape']}")
+        print(f"   - Input shape:  {input_details[0]['shape_signature']} (-1 = dinámico)")
+        print(f"   - Output shape: {output_details[0]['shape_signature']}")
 
-        # Crear datos de prueba
-        input_shape = input_details[0]['shape']
+        # Crear datos de prueba; las dimensiones dinámicas se fijan con resize_tensor_input
+        input_shape = [4 if dim == -1 else int(dim) for dim in input_details[0]['shape_signature']]
+        input_shape[1] = NUM_FRAMES
+        interpreter.resize_tensor_input(input_details[0]['index'], input_shape)
+        interpreter.allocate_tensors()
         test_data = np.random.random(input_shape).astype(np.float32)
 
         # Hacer predicción de prueba
@@ -141,14 +424,35 @@ def test_tflite_model():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte el modelo Keras a TFLite")
+    parser.add_argument("--solo-artefactos", action="store_true",
+                        help="solo exportar artefactos.npz (no requiere TensorFlow)")
+    parser.add_argument("--variantes", nargs="*", choices=list(VARIANT_PATHS), default=None,
+                        help="generar variantes cuantizadas y el reporte (sin valores: todas)")
+    parser.add_argument("--batch-fijo", action="store_true",
+                        help="exportar con el batch fijo del modelo Keras (por defecto: batch dinámico)")
+    parser.add_argument("--largo-dinamico", action="store_true",
+                        help="exportar también el largo de la secuencia como dimensión dinámica")
+    parser.add_argument("--secuencias", default=None,
+                        help="secuencias grabadas (N, 65, 243) en .npy/.npz para calibrar int8 y comparar")
+    args = parser.parse_args()
+
+    if args.solo_artefactos:
+        exit(0 if export_runtime_artifacts() else 1)
+
+    if args.variantes is not None:
+        exit(0 if build_variants(args.secuencias, args.variantes or None,
+                                 not args.batch_fijo, args.largo_dinamico) else 1)
+
     print("\n🚀 Iniciando conversión de modelo Keras a TFLite\n")
 
     # Convertir modelo
-    success = convert_keras_to_tflite()
+    success = convert_keras_to_tflite(not args.batch_fijo, args.largo_dinamico)
 
     if success:
         # Probar modelo
         test_tflite_model()
+        export_runtime_artifacts()
     else:
         print("\n❌ La conversión falló. Revisa los errores arriba.")
         exit(1)
@@ -3,6 +3,12 @@ ASGI config for drf project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+HTTP requests go to Django; WebSocket connections to /ws/predict/ go to the
+frame-by-frame streaming endpoint in api.websocket. Paths under
+GESTURE_LEAN_PREFIX (/api/fast/) go to the lean inference routes, and
+/api/predict/ and /api/predict-frames/ to their async versions (drf.lean).
+Run with an ASGI server, e.g. ``uvicorn drf.asgi:application``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +19,20 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'drf.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importar después de inicializar Django
+from api.websocket import WEBSOCKET_PATH, predict_websocket  # noqa: E402
+from drf.lean import lean_asgi  # noqa: E402
+
+http_application = lean_asgi(django_application)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        if scope['path'] == WEBSOCKET_PATH:
+            return await predict_websocket(scope, receive, send)
+        # Ruta WebSocket desconocida: rechazar el handshake
+        await receive()
+        return await send({'type': 'websocket.close', 'code': 4404})
+    return await http_application(scope, receive, send)
@@ -0,0 +1,158 @@
+"""
+Handlers de Django para las rutas livianas de inferencia (api.lean_urls).
+
+Los requests cuyo path empieza con GESTURE_LEAN_PREFIX los atiende un
+segundo handler, que carga solo GESTURE_LEAN_MIDDLEWARE (por defecto CORS)
+en vez de la cadena completa de settings.MIDDLEWARE (sesiones, CSRF, auth,
+mensajes, whitenoise...) y resuelve contra api.lean_urls. El resto del
+sitio (admin, /api/ con DRF) sigue pasando por el handler normal.
+
+Bajo ASGI, con GESTURE_ASYNC_VIEWS, /api/predict/ y /api/predict-frames/
+también van a este handler, a las vistas async de api.lean_views
+(api.lean_async_urls): DRF solo tiene vistas sync, que Django corre de a
+una en un único thread, y así un proceso atiende muchos clientes a la vez.
+"""
+import logging
+
+from django.conf import settings
+from django.core.asgi import ASGIHandler
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.urls import set_urlconf
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+LEAN_URLCONF = 'api.lean_urls'
+ASYNC_URLCONF = 'api.lean_async_urls'
+ASYNC_PATHS = ('/api/predict/', '/api/predict-frames/')
+
+
+def lean_routes_enabled():
+    return getattr(settings, 'GESTURE_LEAN_ROUTES', True)
+
+
+def async_views_enabled():
+    return getattr(settings, 'GESTURE_ASYNC_VIEWS', True)
+
+
+def lean_prefix():
+    return '/' + getattr(settings, 'GESTURE_LEAN_PREFIX', '/api/fast/').strip('/') + '/'
+
+
+class LeanHandlerMixin:
+    urlconf = LEAN_URLCONF
+
+    def middleware_paths(self):
+        return getattr(settings, 'GESTURE_LEAN_MIDDLEWARE', ['corsheaders.middleware.CorsMiddleware'])
+
+    def load_middleware(self, is_async=False):
+        """
+        Como BaseHandler.load_middleware, pero con la lista de
+        middleware_paths() en vez de settings.MIDDLEWARE (que no se toca:
+        la comparten el handler normal y el resto de la app)
+        """
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        get_response = self._get_response_async if is_async else self._get_response
+        handler = convert_exception_to_response(get_response)
+        handler_is_async = is_async
+        for middleware_path in reversed(self.middleware_paths()):
+            middleware = import_string(middleware_path)
+            middleware_can_sync = getattr(middleware, 'sync_capable', True)
+            middleware_can_async = getattr(middleware, 'async_capable', False)
+            if not middleware_can_sync and not middleware_can_async:
+                raise RuntimeError(
+                    f'Middleware {middleware_path} must have at least one of sync_capable/async_capable set to True.'
+                )
+            elif not handler_is_async and middleware_can_sync:
+                middleware_is_async = False
+            else:
+                middleware_is_async = middleware_can_async
+            try:
+                adapted_handler = self.adapt_method_mode(
+                    middleware_is_async, handler, handler_is_async,
+                    debug=settings.DEBUG, name=f'middleware {middleware_path}',
+                )
+                mw_instance = middleware(adapted_handler)
+            except MiddlewareNotUsed as exc:
+                logger.debug(f"MiddlewareNotUsed({middleware_path!r}): {exc}")
+                continue
+            handler = adapted_handler
+
+            if mw_instance is None:
+                raise ImproperlyConfigured(f'Middleware factory {middleware_path} returned None.')
+
+            if hasattr(mw_instance, 'process_view'):
+                self._view_middleware.insert(0, self.adapt_method_mode(is_async, mw_instance.process_view))
+            if hasattr(mw_instance, 'process_template_response'):
+                self._template_response_middleware.append(
+                    self.adapt_method_mode(is_async, mw_instance.process_template_response)
+                )
+            if hasattr(mw_instance, 'process_exception'):
+                # Como en Django, las excepciones siempre se manejan en modo sync
+                self._exception_middleware.append(self.adapt_method_mode(False, mw_instance.process_exception))
+
+            handler = convert_exception_to_response(mw_instance)
+            handler_is_async = middleware_is_async
+
+        handler = self.adapt_method_mode(is_async, handler, handler_is_async)
+        self._middleware_chain = handler
+
+    def resolve_request(self, request):
+        request.urlconf = self.urlconf
+        set_urlconf(self.urlconf)
+        return super().resolve_request(request)
+
+
+class LeanWSGIHandler(LeanHandlerMixin, WSGIHandler):
+    pass
+
+
+class LeanASGIHandler(LeanHandlerMixin, ASGIHandler):
+
+    def __init__(self):
+        if async_views_enabled():
+            self.urlconf = ASYNC_URLCONF
+        super().__init__()
+
+
+def lean_wsgi(application):
+    """`application` con las rutas livianas delante (o tal cual si GESTURE_LEAN_ROUTES=False)"""
+    if not lean_routes_enabled():
+        return application
+
+    prefix = lean_prefix()
+    lean_application = LeanWSGIHandler()
+
+    def router(environ, start_response):
+        if environ.get('PATH_INFO', '').startswith(prefix):
+            return lean_application(environ, start_response)
+        return application(environ, start_response)
+
+    return router
+
+
+def lean_asgi(application):
+    """
+    Como lean_wsgi() para ASGI (solo scopes 'http'), más /api/predict/ y
+    /api/predict-frames/ si GESTURE_ASYNC_VIEWS
+    """
+    prefix = lean_prefix() if lean_routes_enabled() else None
+    async_paths = ASYNC_PATHS if async_views_enabled() else ()
+    if prefix is None and not async_paths:
+        return application
+
+    lean_application = LeanASGIHandler()
+
+    async def router(scope, receive, send):
+        if scope['type'] == 'http':
+            path = scope['path']
+            if path in async_paths or (prefix is not None and path.startswith(prefix)):
+                return await lean_application(scope, receive, send)
+        return await application(scope, receive, send)
+
+    return router
@@ -166,6 +166,7 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-session-id',
 ]
 
 REST_FRAMEWORK = {
@@ -173,6 +174,7 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
+        'api.parsers.LandmarksBinaryParser',  # application/x-landmarks (float32/float16/int16)
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -190,7 +192,133 @@ CSRF_TRUSTED_ORIGINS = os.environ.get('CSRF_TRUSTED_ORIGINS', '').split(',') if
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# ✅ Configuración del reconocimiento de gestos
+# Perfil de bajo consumo (instancias chicas): baja los valores por defecto de sesiones,
+# cachés y threads de abajo; cada variable sigue pudiendo fijarse por separado
+GESTURE_LOW_MEMORY = os.environ.get('GESTURE_LOW_MEMORY', 'False') == 'True'
+
+# Buffers de secuencia por sesión (session_id / header X-Session-ID)
+# Backends: 'memory' (por worker), 'shared_memory' (todos los workers de la máquina), 'redis'
+GESTURE_BUFFER_BACKEND = os.environ.get('GESTURE_BUFFER_BACKEND', 'memory')
+GESTURE_BUFFER_SHM_NAME = os.environ.get('GESTURE_BUFFER_SHM_NAME', 'gesture_buffers')
+GESTURE_BUFFER_REDIS_URL = os.environ.get('GESTURE_BUFFER_REDIS_URL', 'redis://localhost:6379/0')
+GESTURE_BUFFER_MAX_SESSIONS = int(os.environ.get('GESTURE_BUFFER_MAX_SESSIONS', '200' if GESTURE_LOW_MEMORY else '1000'))
+GESTURE_BUFFER_SESSION_TTL = int(os.environ.get('GESTURE_BUFFER_SESSION_TTL', '300'))  # segundos
+
+# Micro-batching: agrupa predicciones concurrentes en un solo invoke del modelo
+GESTURE_BATCHING_ENABLED = os.environ.get('GESTURE_BATCHING_ENABLED', 'False') == 'True'
+GESTURE_BATCH_MAX_LATENCY_MS = float(os.environ.get('GESTURE_BATCH_MAX_LATENCY_MS', '5'))
+GESTURE_BATCH_MAX_SIZE = int(os.environ.get('GESTURE_BATCH_MAX_SIZE', '0'))  # 0 = batch del modelo
+# Segundos que un request espera su resultado además de GESTURE_BATCH_MAX_LATENCY_MS
+GESTURE_BATCH_TIMEOUT = float(os.environ.get('GESTURE_BATCH_TIMEOUT', '10'))
+
+# Modo continuo ('mode': 'stream'): predicción cada STRIDE frames sobre los últimos 65,
+# probabilidades suavizadas (media exponencial) y umbrales de inicio/fin de gesto
+GESTURE_STREAM_STRIDE = int(os.environ.get('GESTURE_STREAM_STRIDE', '5'))
+GESTURE_STREAM_SMOOTHING = float(os.environ.get('GESTURE_STREAM_SMOOTHING', '0.5'))
+GESTURE_STREAM_ON_THRESHOLD = float(os.environ.get('GESTURE_STREAM_ON_THRESHOLD', '0.6'))
+GESTURE_STREAM_OFF_THRESHOLD = float(os.environ.get('GESTURE_STREAM_OFF_THRESHOLD', '0.4'))
+
+# Pool de intérpretes TFLite (inferencia concurrente segura entre threads)
+GESTURE_INTERPRETER_POOL_SIZE = int(os.environ.get('GESTURE_INTERPRETER_POOL_SIZE', '1'))
+GESTURE_INTERPRETER_NUM_THREADS = int(os.environ['GESTURE_INTERPRETER_NUM_THREADS']) if os.environ.get('GESTURE_INTERPRETER_NUM_THREADS') else (1 if GESTURE_LOW_MEMORY else None)
+# Modelos con batch dinámico: batches con intérpretes ya dimensionados, p. ej. '1,16,64'
+# (sin definir: 1 y GESTURE_MAX_BATCH_SIZE); los demás tamaños redimensionan al cambiar
+GESTURE_INTERPRETER_BATCH_SIZES = tuple(int(size) for size in os.environ['GESTURE_INTERPRETER_BATCH_SIZES'].split(',')) if os.environ.get('GESTURE_INTERPRETER_BATCH_SIZES') else None
+
+# Variante del modelo TFLite: 'float32', 'dynamic_int8', 'int8' o 'float16'
+# (generadas con 'python convert_to_tflite.py --variantes'; si falta el archivo se usa float32)
+GESTURE_MODEL_VARIANT = os.environ.get('GESTURE_MODEL_VARIANT', 'float32')
+
+# /api/predict-batch/: secuencias por request y por invocación (modelos con batch dinámico)
+GESTURE_BATCH_MAX_SEQUENCES = int(os.environ.get('GESTURE_BATCH_MAX_SEQUENCES', '1024'))
+GESTURE_MAX_BATCH_SIZE = int(os.environ.get('GESTURE_MAX_BATCH_SIZE', '16' if GESTURE_LOW_MEMORY else '64'))
+
+# MediaPipe Holistic: por defecto una instancia global en static_image_mode (~150 MB). Con
+# GESTURE_MEDIAPIPE_TRACKING=True (opcional) además una instancia en modo video por sesión, acotada
+# con LRU y TTL; la sesión 'default' siempre usa la estática. El total por proceso, incluida la
+# estática, no supera GESTURE_MEDIAPIPE_MEMORY_BUDGET_MB: 300 MB = estática + 1 sesión con tracking
+# (150 MB con GESTURE_LOW_MEMORY: solo la estática). En 512 MB no conviene activar el tracking
+GESTURE_MEDIAPIPE_TRACKING = os.environ.get('GESTURE_MEDIAPIPE_TRACKING', 'False') == 'True'
+GESTURE_MEDIAPIPE_MODEL_COMPLEXITY = int(os.environ.get('GESTURE_MEDIAPIPE_MODEL_COMPLEXITY', '0'))
+GESTURE_MEDIAPIPE_MAX_SESSIONS = int(os.environ.get('GESTURE_MEDIAPIPE_MAX_SESSIONS', '1'))
+GESTURE_MEDIAPIPE_MEMORY_BUDGET_MB = int(os.environ.get('GESTURE_MEDIAPIPE_MEMORY_BUDGET_MB', '150' if GESTURE_LOW_MEMORY else '300'))
+GESTURE_MEDIAPIPE_SESSION_TTL = int(os.environ.get('GESTURE_MEDIAPIPE_SESSION_TTL', '30'))  # segundos
+
+# Decodificación de imágenes: 'pil' (draft = escalado DCT del JPEG + resize) o 'cv2' (imdecode reducido);
+# lado máximo en píxeles y filtro del resize ('area', 'bilinear', 'nearest', 'lanczos')
+GESTURE_IMAGE_DECODER = os.environ.get('GESTURE_IMAGE_DECODER', 'pil')
+GESTURE_IMAGE_MAX_SIZE = int(os.environ.get('GESTURE_IMAGE_MAX_SIZE', '640'))
+GESTURE_IMAGE_RESIZE_FILTER = os.environ.get('GESTURE_IMAGE_RESIZE_FILTER', 'bilinear')
+
+# Pool de procesos para la extracción de landmarks (0 = en el thread del request).
+# Con la cola llena se responde 503 con Retry-After; pasado el timeout, 504
+GESTURE_EXTRACTION_WORKERS = int(os.environ.get('GESTURE_EXTRACTION_WORKERS', '0'))
+GESTURE_EXTRACTION_MAX_PENDING = int(os.environ.get('GESTURE_EXTRACTION_MAX_PENDING', '16'))
+GESTURE_EXTRACTION_TIMEOUT = float(os.environ.get('GESTURE_EXTRACTION_TIMEOUT', '5'))  # segundos
+GESTURE_EXTRACTION_RETRY_AFTER = int(os.environ.get('GESTURE_EXTRACTION_RETRY_AFTER', '1'))  # segundos
+
+# Caché de keypoints por hash de la imagen: 'memory' (por worker), 'redis' (compartida) o 'none'
+GESTURE_KEYPOINT_CACHE = os.environ.get('GESTURE_KEYPOINT_CACHE', 'memory')
+GESTURE_KEYPOINT_CACHE_MAX_ENTRIES = int(os.environ.get('GESTURE_KEYPOINT_CACHE_MAX_ENTRIES', '512' if GESTURE_LOW_MEMORY else '4096'))
+GESTURE_KEYPOINT_CACHE_TTL = int(os.environ.get('GESTURE_KEYPOINT_CACHE_TTL', '60'))  # segundos
+GESTURE_KEYPOINT_CACHE_REDIS_URL = os.environ.get('GESTURE_KEYPOINT_CACHE_REDIS_URL', GESTURE_BUFFER_REDIS_URL)
+
+# Warm-up al arrancar: precarga antes del fork (gunicorn preload_app) e inferencia de prueba
+# en cada worker; /api/ready/ responde 200 al terminar
+GESTURE_WARMUP = os.environ.get('GESTURE_WARMUP', 'True') == 'True'
+GESTURE_WARMUP_MEDIAPIPE = os.environ.get('GESTURE_WARMUP_MEDIAPIPE', str(not GESTURE_LOW_MEMORY)) == 'True'
+# Intentos por componente (espera de 1, 2, 4... s entre ellos); después /api/ready/ lo relanza cada INTERVAL s
+GESTURE_WARMUP_RETRIES = int(os.environ.get('GESTURE_WARMUP_RETRIES', '3'))
+GESTURE_WARMUP_RETRY_INTERVAL = int(os.environ.get('GESTURE_WARMUP_RETRY_INTERVAL', '30'))
+
+# Métricas de latencia por etapa y por endpoint en /api/metrics (formato de Prometheus, por worker)
+GESTURE_METRICS = os.environ.get('GESTURE_METRICS', 'True') == 'True'
+
+# Rutas livianas de inferencia (api.lean_views): /api/fast/predict/, predict-frames/ y predict-batch/
+# con las mismas respuestas que /api/, sin DRF y solo con GESTURE_LEAN_MIDDLEWARE (drf.lean).
+# JSON con orjson si está instalado (pip install orjson)
+GESTURE_LEAN_ROUTES = os.environ.get('GESTURE_LEAN_ROUTES', 'True') == 'True'
+GESTURE_LEAN_PREFIX = os.environ.get('GESTURE_LEAN_PREFIX', '/api/fast/')
+GESTURE_LEAN_MIDDLEWARE = [
+    'corsheaders.middleware.CorsMiddleware',
+]
+# Tope del cuerpo JSON/binario de las rutas livianas (413 si lo supera): por defecto alcanza para
+# GESTURE_BATCH_MAX_SEQUENCES secuencias en binario (application/x-landmarks, float32)
+GESTURE_LEAN_MAX_BODY_BYTES = int(os.environ.get(
+    'GESTURE_LEAN_MAX_BODY_BYTES', str(GESTURE_BATCH_MAX_SEQUENCES * 65 * 243 * 4 + 65536)
+))
+
+# Bajo ASGI (uvicorn, o gunicorn con GESTURE_ASGI=True): /api/predict/ y /api/predict-frames/ con
+# vistas async que esperan la extracción y la inferencia en un executor de GESTURE_ASYNC_WORKERS threads
+GESTURE_ASYNC_VIEWS = os.environ.get('GESTURE_ASYNC_VIEWS', 'True') == 'True'
+GESTURE_ASYNC_WORKERS = int(os.environ.get('GESTURE_ASYNC_WORKERS', '2' if GESTURE_LOW_MEMORY else '4'))
+
+# Control de admisión por endpoint y proceso (api.services.admission): requests en curso y en cola
+# antes de rechazar con 429 (cola llena) o 503 (sin turno en GESTURE_ADMISSION_QUEUE_TIMEOUT s),
+# con Retry-After. Límites por defecto en DEFAULT_LIMITS; se cambian con, p. ej.,
+# GESTURE_ADMISSION_LIMITS='predict_image=2:8,predict_batch=1:4' (en curso:en cola).
+# Útil con workers async (GESTURE_ASGI=True) o con threads; un worker sync atiende de a uno
+GESTURE_ADMISSION_ENABLED = os.environ.get('GESTURE_ADMISSION_ENABLED', 'True') == 'True'
+GESTURE_ADMISSION_LIMITS = {
+    endpoint: tuple(int(value) for value in limits.split(':'))
+    for endpoint, limits in (item.split('=') for item in os.environ.get('GESTURE_ADMISSION_LIMITS', '').split(',') if item)
+}
+GESTURE_ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('GESTURE_ADMISSION_QUEUE_TIMEOUT', '2'))  # segundos
+GESTURE_ADMISSION_RETRY_AFTER = int(os.environ.get('GESTURE_ADMISSION_RETRY_AFTER', '1'))  # segundos
+# Modo degradado: con las imágenes saturadas, los frames se procesan con sus 'landmarks' (sin
+# extracción) o se rechazan al instante si solo traen 'image'
+GESTURE_DEGRADE_IMAGES = os.environ.get('GESTURE_DEGRADE_IMAGES', 'True') == 'True'
+
 # Logging Configuration
+# Los handlers reales (consola, archivo) escriben desde un thread: los requests solo encolan
+# (api.log_handlers). Las líneas por request van en DEBUG; en INFO queda una línea de resumen
+# por request (logger api.requests, muestreada con GESTURE_LOG_SUMMARY_SAMPLE) y los mensajes
+# repetidos se limitan a GESTURE_LOG_RATE por segundo por lugar del código
+GESTURE_LOG_LEVEL = os.environ.get('GESTURE_LOG_LEVEL', 'INFO')
+GESTURE_LOG_RATE = int(os.environ.get('GESTURE_LOG_RATE', '5'))
+GESTURE_LOG_SUMMARY_SAMPLE = float(os.environ.get('GESTURE_LOG_SUMMARY_SAMPLE', '1.0'))  # 0..1; errores siempre
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -211,44 +339,45 @@ LOGGING = {
         'require_debug_true': {
             '()': 'django.utils.log.RequireDebugTrue',
         },
+        'rate_limit': {
+            '()': 'api.log_handlers.RateLimitFilter',
+            'rate': GESTURE_LOG_RATE,
+            'exempt': ['api.requests'],
+        },
     },
     'handlers': {
         'console': {
-            'level': 'INFO',
+            'level': 'DEBUG',
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
         'file': {
-            'level': 'INFO',
+            'level': 'DEBUG',
             'class': 'logging.FileHandler',
             'filename': os.path.join(BASE_DIR, 'django_api.log'),
             'formatter': 'verbose',
         },
+        # Después de 'console' y 'file' en orden alfabético: los recibe ya configurados
+        'queue': {
+            '()': 'api.log_handlers.AsyncQueueHandler',
+            'handlers': ['cfg://handlers.console', 'cfg://handlers.file'],
+            'filters': ['rate_limit'],
+        },
     },
     'loggers': {
         'django': {
-            'handlers': ['console'],
+            'handlers': ['queue'],
             'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
             'propagate': False,
         },
         'api': {
-            'handlers': ['console', 'file'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        'api.views': {
-            'handlers': ['console', 'file'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        'api.services': {
-            'handlers': ['console', 'file'],
-            'level': 'INFO',
+            'handlers': ['queue'],
+            'level': GESTURE_LOG_LEVEL,
             'propagate': False,
         },
     },
     'root': {
-        'handlers': ['console'],
+        'handlers': ['queue'],
         'level': 'INFO',
     },
-}
\ No newline at end of file
+}
@@ -3,6 +3,9 @@ WSGI config for drf project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
+Paths under GESTURE_LEAN_PREFIX (/api/fast/) go to the lean inference routes
+in api.lean_views, with a minimal middleware stack (see drf.lean).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
@@ -14,3 +17,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'drf.settings')
 
 application = get_wsgi_application()
+
+# Importar después de inicializar Django
+from drf.lean import lean_wsgi  # noqa: E402
+
+application = lean_wsgi(application)
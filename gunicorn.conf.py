@@ -0,0 +1,50 @@
+"""
+Configuración de gunicorn (se carga sola desde el directorio del proyecto).
+
+preload_app: el maestro importa la app una vez, y AppConfig.ready precarga
+las clases y la normalización antes del fork; los workers las comparten
+copy-on-write, y el modelo (mapeado con mmap) vía el page cache. Los
+intérpretes TFLite y MediaPipe (con threads y estado propio) se crean en
+cada worker después del fork, con una inferencia de prueba. /api/ready/ responde 200 cuando termina.
+
+GESTURE_ASGI=True: workers de uvicorn sobre drf.asgi (vistas async para
+/api/predict/ y /api/predict-frames/, WebSocket /ws/predict/); cada proceso
+atiende muchos clientes a la vez mientras la extracción y la inferencia
+corren en su executor. Si no, workers sync sobre drf.wsgi.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+preload_app = True
+
+if os.environ.get('GESTURE_ASGI', 'False') == 'True':
+    wsgi_app = 'drf.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'drf.wsgi:application'
+accesslog = '-'
+errorlog = '-'
+
+# El warm-up de cada worker corre en los hooks de abajo, no en AppConfig.ready
+os.environ.setdefault('GESTURE_WARMUP_POST_FORK', 'True')
+
+
+def _start_warm_up():
+    from django.conf import settings
+
+    if getattr(settings, 'GESTURE_WARMUP', True):
+        from api.services.warmup import start_warm_up
+        start_warm_up()
+
+
+def post_fork(server, worker):
+    # Con preload_app la app ya está cargada en el maestro: el worker solo crea sus intérpretes
+    if server.cfg.preload_app:
+        _start_warm_up()
+
+
+def post_worker_init(worker):
+    # Sin preload_app (--no-preload) la app se carga en cada worker antes de este hook
+    if not worker.cfg.preload_app:
+        _start_warm_up()